@@ -40,12 +40,17 @@ LOCAL_APPS = [
     "cycle_invoice.common.apps.CommonConfig",  # for common utilities
     "cycle_invoice.emails.apps.EmailsConfig",  # for email management
     "cycle_invoice.party.apps.ContactConfig",  # for contact management,
+    "cycle_invoice.payment.apps.PaymentConfig",  # for payment reconciliation
     "cycle_invoice.product.apps.ProductConfig",  # for product management
     "cycle_invoice.sale.apps.SaleConfig",  # for sale management
     "cycle_invoice.subscription.apps.SubscriptionConfig",  # for subscription management
     "cycle_invoice.work.apps.WorkConfig",  # for work management
 ]
 
+# Only include the development tools, which seed data with the test factories, in debug and test runs
+if DEBUG or "pytest" in sys.modules or "test" in sys.argv:
+    LOCAL_APPS.append("cycle_invoice.devtools.apps.DevtoolsConfig")  # for benchmarks
+
 THIRD_PARTY_APPS = [
     "simple_history",  # for history tracking
     "storages",  # for S3 storage
@@ -188,7 +193,9 @@ if not SECRET_KEY and not DEBUG:
 
 from config.settings.celery import *  # noqa: E402, F403
 from config.settings.constance import *  # noqa: E402, F403
+from config.settings.document_number import *  # noqa: E402, F403
 from config.settings.email import *  # noqa: E402, F403
+from config.settings.invoice_pdf import *  # noqa: E402, F403
 from config.settings.jwt import *  # noqa: E402, F403
 from config.settings.logging import *  # noqa: E402, F403
 from config.settings.storage import *  # noqa: E402, F403
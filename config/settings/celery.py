@@ -13,9 +13,18 @@ CELERY_TASK_TRACK_STARTED = True
 
 CELERY_TASK_TIME_LIMIT = 300  # 5 minutes
 
+# CPU-heavy tasks run on workers of their own queue, so they cannot delay the other tasks
+CELERY_TASK_ROUTES = {
+    "cycle_invoice.sale.tasks.invoice_pdf_generate": {"queue": "pdf"},
+}
+
 CELERY_BEAT_SCHEDULE = {
     "process-subscriptions-daily": {
         "task": "cycle_invoice.sale.tasks.subscription_processing_to_document_items",
         "schedule": crontab(hour=0, minute=0),
     },
+    "assemble-invoices-daily": {
+        "task": "cycle_invoice.sale.tasks.invoice_assembly_from_open_items",
+        "schedule": crontab(hour=1, minute=0),
+    },
 }
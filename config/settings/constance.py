@@ -20,6 +20,12 @@ CONSTANCE_CONFIG = {
                            _("The email address to send emails from."), str),
     "COMPANY_EMAIL_REPLY_TO": ("CycleInvoice Support <support@cycleinvoice.local>",
                                _("The email address to reply to emails from."), str),
+
+    "INVOICE_NUMBER_PREFIX": ("RE-", _("The prefix of invoice numbers."), str),
+    "INVOICE_NUMBER_PADDING": (6, _("The number of digits invoice numbers are padded to with zeros."), int),
+    "INVOICE_NUMBER_YEARLY": (True, _("Include the year in invoice numbers and restart them every year."), bool),
+    "INVOICE_NUMBER_GAPLESS": (True, _("Allocate invoice numbers without gaps, one transaction at a time."), bool),
+    "INVOICE_PAYMENT_TERM_DAYS": (30, _("The number of days after which assembled invoices are due."), int),
 }
 
 # Ordering the Fields to sets
@@ -36,4 +42,11 @@ CONSTANCE_CONFIG_FIELDSETS = (
             "fields": ("COMPANY_EMAIL_SEND", "COMPANY_EMAIL_REPLY_TO"),
         }
     ),
+    (
+        _("Invoice Settings"),
+        {
+            "fields": ("INVOICE_NUMBER_PREFIX", "INVOICE_NUMBER_PADDING", "INVOICE_NUMBER_YEARLY",
+                       "INVOICE_NUMBER_GAPLESS", "INVOICE_PAYMENT_TERM_DAYS"),
+        }
+    ),
 )
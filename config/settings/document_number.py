@@ -0,0 +1,8 @@
+"""Settings for the allocation of document numbers."""
+import os
+
+# Numbers a worker process reserves at once for document number sequences that may have gaps
+DOCUMENT_NUMBER_BLOCK_SIZE = int(os.getenv("DOCUMENT_NUMBER_BLOCK_SIZE", "100"))
+
+# Seconds a worker process waits for the counter row when it reserves a block inside a transaction
+DOCUMENT_NUMBER_BLOCK_LOCK_TIMEOUT = float(os.getenv("DOCUMENT_NUMBER_BLOCK_LOCK_TIMEOUT", "5"))
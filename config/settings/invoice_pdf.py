@@ -0,0 +1,11 @@
+"""Settings for the invoice PDF generation."""
+import os
+
+# Base URL the invoices are rendered with, static and media URLs below it are read from local storage
+INVOICE_PDF_BASE_URL = os.getenv("INVOICE_PDF_BASE_URL", "http://localhost:8000/")
+
+# Number of worker processes for batch PDF generation, defaults to the number of CPUs
+INVOICE_PDF_BATCH_WORKERS = int(os.getenv("INVOICE_PDF_BATCH_WORKERS", str(os.cpu_count() or 1)))
+
+# Dotted path to a callable receiving a PDFStageMetric for every stage of the PDF generation
+INVOICE_PDF_METRICS_SINK = os.getenv("INVOICE_PDF_METRICS_SINK", "")
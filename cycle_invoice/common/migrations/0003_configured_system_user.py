@@ -0,0 +1,41 @@
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import migrations
+
+
+def create_configured_system_user(apps, schema_editor):
+    """Create the system user with the email `SYSTEM_USER_EMAIL` if it is configured to another address."""
+    User = apps.get_model("common", "User")
+
+    email = settings.SYSTEM_USER_EMAIL
+
+    if User.objects.filter(email=email).exists():
+        return
+
+    system_uuid = uuid.uuid4()
+
+    User.objects.create(
+        uuid=system_uuid,
+        email=email,
+        first_name="System",
+        last_name="User",
+        is_active=True,
+        is_staff=False,
+        is_superuser=False,
+        password=make_password(None),  # unusable password
+        created_by_id=system_uuid,
+        updated_by_id=system_uuid,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0002_alter_user_groups'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_configured_system_user, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,20 @@
 """Base models for the Cycle Invoice application."""
 from __future__ import annotations
 
+import copy
 import logging
+import threading
 import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
 from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from polymorphic.managers import PolymorphicManager
@@ -17,14 +22,216 @@ from polymorphic.models import PolymorphicModel
 from polymorphic.query import PolymorphicQuerySet
 from simple_history.admin import SimpleHistoryAdmin
 from simple_history.models import HistoricalRecords
+from simple_history.utils import get_history_manager_for_model
 
 from cycle_invoice.common.selectors import get_system_user
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
     from django.http import HttpRequest
 
 logger = logging.getLogger(__name__)
 
+# Number of rows written per statement by the audited bulk operations
+AUDITED_BULK_BATCH_SIZE = 1000
+
+
+class AuditedBulkManagerMixin:
+    """
+    Manager methods writing many objects with their audit fields and history in a few statements.
+
+    Like `bulk_create` and `bulk_update`, they skip `save` and the model signals. Models overriding
+    `save` are therefore rejected, unless their manager sets `bulk_maintains_save` and maintains the
+    same in its bulk operations. Multi-table inherited models can be bulk updated, but only bulk
+    created if their manager overrides `_bulk_insert`.
+    """
+
+    # Set by managers whose bulk operations maintain what the `save` override of their model does
+    bulk_maintains_save = False
+
+    def bulk_create_audited(self, objs: Iterable[BaseModel], user: User, *,
+                            batch_size: int = AUDITED_BULK_BATCH_SIZE) -> list[BaseModel]:
+        """
+        Insert many new objects created by the user, with one history record each.
+
+        :param objs: The new objects
+        :param user: User creating the objects
+        :param batch_size: Number of objects inserted per statement
+        :return: The created objects
+        """
+        self._bulk_audited_check(user)
+        objs = list(objs)
+        for obj in objs:
+            obj.created_by = user
+            obj.updated_by = user
+            if isinstance(obj, PolymorphicModel):
+                obj.pre_save_polymorphic()
+
+        with transaction.atomic():
+            objs = self._bulk_insert(objs, batch_size)
+            get_history_manager_for_model(self.model).bulk_history_create(objs, batch_size=batch_size,
+                                                                          default_user=user)
+        return objs
+
+    def bulk_update_audited(self, objs: Iterable[BaseModel], fields: list[str], user: User, *,
+                            batch_size: int = AUDITED_BULK_BATCH_SIZE) -> int:
+        """
+        Update fields of many objects by the user, with one history record each.
+
+        Objects loaded soft-deleted are rejected, rows soft-deleted concurrently are not updated.
+
+        :param objs: The changed objects
+        :param fields: Names of the changed fields, the audit fields are added
+        :param user: User updating the objects
+        :param batch_size: Number of objects updated per statement
+        :return: The number of rows updated
+        """
+        self._bulk_audited_check(user)
+        objs = list(objs)
+        if any(obj._db_soft_deleted for obj in objs):  # noqa: SLF001
+            error_message = "Cannot update a soft-deleted object."
+            raise ValueError(error_message)
+
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_by = user
+            obj.updated_at = now
+
+        with transaction.atomic():
+            updated = self.bulk_update(objs, [*dict.fromkeys([*fields, "updated_by", "updated_at"])],
+                                       batch_size=batch_size)
+            get_history_manager_for_model(self.model).bulk_history_create(objs, batch_size=batch_size, update=True,
+                                                                          default_user=user)
+        return updated
+
+    def _bulk_insert(self, objs: list[BaseModel], batch_size: int) -> list[BaseModel]:
+        """Insert the objects with `bulk_create`, which cannot insert multi-table inherited models."""
+        if self.model._meta.parents:  # noqa: SLF001
+            error_message = f"{self.model.__name__} is a multi-table inherited model, which cannot be bulk created."
+            raise ValueError(error_message)
+        return self.bulk_create(objs, batch_size=batch_size)
+
+    def _bulk_audited_check(self, user: User) -> None:
+        """Check the user and that the bulk operations do not skip a `save` override of the model."""
+        _validate_audit_user(user)
+        mro = self.model.__mro__
+        overrides_save = any("save" in vars(cls) for cls in mro[:mro.index(BaseModel)] if issubclass(cls, BaseModel))
+        if overrides_save and not self.bulk_maintains_save:
+            error_message = f"{self.model.__name__} overrides save(), which the audited bulk operations would skip."
+            raise ValueError(error_message)
+
+
+class _SavepointMarker:
+    """
+    No-op `on_commit` callback registered while the savepoints in `savepoint_ids` were active.
+
+    Django discards the `on_commit` callbacks registered inside a savepoint when it is rolled back, so
+    a marker that is no longer registered tags records of saves that were rolled back.
+    """
+
+    def __init__(self, using: str | None) -> None:
+        """Register the marker with the savepoints active on the connection now."""
+        self.using = using
+        self.savepoint_ids = tuple(transaction.get_connection(using).savepoint_ids)
+        transaction.on_commit(self, using=using)
+
+    def __call__(self) -> None:
+        """Do nothing after the commit."""
+
+
+@dataclass
+class _DeferredRecord:
+    """Historical record buffered by `deferred_history` until the end of its block."""
+
+    model: type[models.Model]
+    history_type: str
+    # Copy of the instance when it was saved, with the date, user and change reason of the record
+    snapshot: models.Model
+    # Marker registered with the savepoints active when the instance was saved
+    marker: _SavepointMarker
+
+
+class _DeferredHistory(threading.local):
+    """Historical records buffered in the current thread, None outside `deferred_history`."""
+
+    records: list[_DeferredRecord] | None = None
+    # Marker of the last buffered record, reused while the same savepoints are active
+    marker: _SavepointMarker | None = None
+
+
+_deferred_history = _DeferredHistory()
+
+
+@contextmanager
+def deferred_history() -> Iterator[None]:
+    """
+    Run the block in a transaction and write the historical records of its saves at its end.
+
+    The records are inserted with `bulk_history_create`, one bulk statement per historical model and
+    type of change, just before the block commits, so the history of the block is only visible after
+    it. Like with `bulk_history_create`, the history signals are not sent for them. Deletions and
+    models with historical many-to-many fields are recorded right away.
+
+    Each record is tagged with the savepoints active at its save. Records of saves inside a savepoint
+    that is rolled back, e.g. an inner `atomic` block whose exception is caught, are discarded. A
+    nested block runs in a savepoint of its own and writes its records with the outer block.
+    """
+    if _deferred_history.records is not None:
+        with transaction.atomic():
+            yield
+        return
+
+    with transaction.atomic():
+        _deferred_history.records = records = []
+        try:
+            yield
+        finally:
+            _deferred_history.records = None
+            _deferred_history.marker = None
+        _deferred_history_write(records)
+
+
+def _deferred_history_marker(using: str | None) -> _SavepointMarker:
+    """Return a marker registered with the savepoints active now, reusing the last one if they are the same."""
+    marker = _deferred_history.marker
+    if (marker is None or marker.using != using
+            or marker.savepoint_ids != tuple(transaction.get_connection(using).savepoint_ids)):
+        marker = _deferred_history.marker = _SavepointMarker(using)
+    return marker
+
+
+def _deferred_history_write(records: list[_DeferredRecord]) -> None:
+    """Insert the buffered records not rolled back, with one bulk statement per historical model and type of change."""
+    registered = {id(func) for using in {record.marker.using for record in records}
+                  for _, func, _ in transaction.get_connection(using).run_on_commit}
+    snapshots: dict[tuple[type[models.Model], str], list[models.Model]] = defaultdict(list)
+    for record in records:
+        if id(record.marker) in registered:
+            snapshots[record.model, record.history_type].append(record.snapshot)
+
+    for (model, history_type), model_snapshots in snapshots.items():
+        get_history_manager_for_model(model).bulk_history_create(
+            model_snapshots, batch_size=AUDITED_BULK_BATCH_SIZE, update=history_type == "~")
+
+
+class DeferrableHistoricalRecords(HistoricalRecords):
+    """Historical records that are buffered inside `deferred_history` instead of being inserted one by one."""
+
+    def create_historical_record(self, instance: models.Model, history_type: str, using: str | None = None) -> None:
+        """Create the historical record of a change, buffered inside `deferred_history`."""
+        records = _deferred_history.records
+        if records is None or history_type == "-" or self.m2m_fields:
+            super().create_historical_record(instance, history_type, using=using)
+            return
+
+        # Later saves in the block change the instance, the record keeps its values of this save
+        snapshot = copy.copy(instance)
+        snapshot._history_date = getattr(instance, "_history_date", timezone.now())  # noqa: SLF001
+        snapshot._history_user = self.get_history_user(instance)  # noqa: SLF001
+        snapshot._change_reason = self.get_change_reason_for_object(instance, history_type, using)  # noqa: SLF001
+        records.append(_DeferredRecord(type(instance), history_type, snapshot, _deferred_history_marker(using)))
+
 
 class BaseModel(models.Model):
     """Base model to inherit from for common fields."""
@@ -62,7 +269,7 @@ class BaseModel(models.Model):
         default=False,
         db_index=True,
     )
-    history = HistoricalRecords(
+    history = DeferrableHistoricalRecords(
         inherit=True
     )
 
@@ -73,8 +280,8 @@ class BaseModel(models.Model):
             """Return only active records."""
             return self.filter(soft_deleted=False)
 
-    class ActiveManager(models.Manager.from_queryset(ActiveQuerySet)):
-        """Custom Manager to return active records."""
+    class ActiveManager(AuditedBulkManagerMixin, models.Manager.from_queryset(ActiveQuerySet)):
+        """Custom Manager to return active records, with the audited bulk operations."""
 
         def get_queryset(self) -> models.QuerySet:
             """Return the active records."""
@@ -83,6 +290,11 @@ class BaseModel(models.Model):
     objects_with_deleted = models.Manager()
     objects = ActiveManager()
 
+    # Whether the object was soft-deleted when it was loaded or last written
+    _db_soft_deleted = False
+    # Set while `save` runs, restricting its UPDATE to rows that are not soft-deleted
+    _reject_soft_deleted = False
+
     class Meta:
         """Meta options for BaseModel."""
 
@@ -99,18 +311,11 @@ class BaseModel(models.Model):
                 error_message = "You must provide a user to save the model."
                 raise ValueError(error_message)
 
-        if user._state.adding:  # noqa: SLF001 because this is encouraged by django
-            error_message = "User must be saved before saving the model."
-            raise ValueError(error_message)
+        _validate_audit_user(user)
 
-        if self.pk:
-            db_soft_deleted = (self.__class__.objects_with_deleted
-                               .filter(pk=self.pk)
-                               .values_list("soft_deleted", flat=True)
-                               .first())
-            if db_soft_deleted:
-                error_message = "Cannot update a soft-deleted object."
-                raise ValueError(error_message)
+        if self._db_soft_deleted:
+            error_message = "Cannot update a soft-deleted object."
+            raise ValueError(error_message)
 
         if self._state.adding:
             self.created_by = user
@@ -118,7 +323,39 @@ class BaseModel(models.Model):
         self.updated_by = user
         self.updated_at = timezone.now()
 
-        super().save(*args, **kwargs)
+        # Rows soft-deleted since the object was loaded are rejected by the UPDATE itself, see `_do_update`
+        self._reject_soft_deleted = True
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            self._reject_soft_deleted = False
+        self._db_soft_deleted = self.soft_deleted
+
+    @classmethod
+    def from_db(cls, db: str | None, field_names: list[str], values: list) -> BaseModel:
+        """Override from_db to remember whether the object was loaded soft-deleted."""
+        instance = super().from_db(db, field_names, values)
+        instance._db_soft_deleted = instance.__dict__.get("soft_deleted", False)  # noqa: SLF001
+        return instance
+
+    def _do_update(self, base_qs: models.QuerySet, using: str, pk_val: object, values: list, *args) -> list:
+        """
+        Override _do_update to only update rows that are not soft-deleted while saving.
+
+        Objects loaded soft-deleted are rejected by `save` up front. The UPDATE is restricted to active
+        rows as well, which rejects rows soft-deleted concurrently without an extra query to check the
+        row first. Only if no row was updated, the row is looked up to tell a soft-deleted row from a
+        missing one. Soft deletes and recoveries save without this restriction, also on polymorphic
+        models, whose base manager hides soft-deleted rows.
+        """
+        if not self._reject_soft_deleted:
+            return super()._do_update(base_qs.model.objects_with_deleted.using(using), using, pk_val, values, *args)
+
+        updated = super()._do_update(base_qs.filter(soft_deleted=False), using, pk_val, values, *args)
+        if not updated and self.__class__.objects_with_deleted.using(using).filter(pk=pk_val).exists():
+            error_message = "Cannot update a soft-deleted object."
+            raise ValueError(error_message)
+        return updated
 
     def delete(self, *args, **kwargs) -> None:
         """Override delete method to implement soft delete."""
@@ -138,6 +375,7 @@ class BaseModel(models.Model):
         self.soft_deleted = True
 
         super().save(*args, **kwargs)
+        self._db_soft_deleted = True
 
     def recover(self, user: User) -> None:
         """Recover a soft-deleted object."""
@@ -151,6 +389,18 @@ class BaseModel(models.Model):
         self.soft_deleted = False
 
         super().save()
+        self._db_soft_deleted = False
+
+
+def _validate_audit_user(user: User | None) -> None:
+    """Check that the user recorded in the audit fields is given and saved."""
+    if not user:
+        error_message = "You must provide a user to save the model."
+        raise ValueError(error_message)
+
+    if user._state.adding:  # noqa: SLF001 because this is encouraged by django
+        error_message = "User must be saved before saving the model."
+        raise ValueError(error_message)
 
 
 class BasePolymorphicModel(BaseModel, PolymorphicModel):
@@ -163,8 +413,9 @@ class BasePolymorphicModel(BaseModel, PolymorphicModel):
             """Return only active records."""
             return self.filter(soft_deleted=False)
 
-    class PolymorphicActiveManager(PolymorphicManager.from_queryset(PolymorphicActiveQuerySet)):
-        """Custom Manager to return active records and retain polymorphic behavior."""
+    class PolymorphicActiveManager(AuditedBulkManagerMixin,
+                                   PolymorphicManager.from_queryset(PolymorphicActiveQuerySet)):
+        """Custom Manager to return active records and retain polymorphic behavior, with the audited bulk operations."""
 
         def get_queryset(self) -> models.QuerySet:
             """Return the active records."""
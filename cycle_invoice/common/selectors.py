@@ -1,11 +1,16 @@
 """Common selectors for Django models."""
 
+from functools import cache
 from typing import TYPE_CHECKING, TypeVar, cast
 from uuid import UUID
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.signals import setting_changed
 from django.db import models
 from django.db.models import Model, QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.http import Http404
 from django.shortcuts import get_object_or_404
 
@@ -69,11 +74,30 @@ def get_object[T](model_or_queryset: type[T] | QuerySet, *, include_deleted: boo
         return None
 
 
+@cache
 def get_system_user() -> "User":
     """
     Return the system user used for automated/system tasks.
 
+    The user with the email `SYSTEM_USER_EMAIL` is loaded once per process, it is reloaded after it was
+    saved or deleted and after the setting changed, e.g. by `override_settings` in tests.
+
     :return: A User instance representing the system user.
     """
     user_model = get_user_model()
-    return cast("User", user_model.objects.get(email="system@cycleinvoice.local"))
+    return cast("User", user_model.objects.get(email=settings.SYSTEM_USER_EMAIL))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def clear_system_user(sender: type[Model], instance: "User", **kwargs) -> None:  # noqa: ARG001
+    """Reload the system user after it was saved or deleted."""
+    if instance.email == settings.SYSTEM_USER_EMAIL:
+        get_system_user.cache_clear()
+
+
+@receiver(setting_changed)
+def clear_system_user_setting(sender: object, setting: str, **kwargs) -> None:  # noqa: ARG001
+    """Reload the system user after the setting `SYSTEM_USER_EMAIL` changed."""
+    if setting == "SYSTEM_USER_EMAIL":
+        get_system_user.cache_clear()
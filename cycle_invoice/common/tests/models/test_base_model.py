@@ -1,10 +1,19 @@
 """Tests for the common model BaseModel."""
 
+from unittest.mock import patch
+
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-from cycle_invoice.common.models import BaseModel, User
+from cycle_invoice.accounting.tests.factories import AccountFactory
+from cycle_invoice.common.models import BaseModel, User, deferred_history
 from cycle_invoice.common.selectors import get_system_user
 from cycle_invoice.common.tests.factories import UserFactory
+from cycle_invoice.party.models import Organization
+from cycle_invoice.party.tests.factories import OrganizationFactory
+from cycle_invoice.sale.models import DocumentItem
+from cycle_invoice.sale.tests.factories import DocumentItemFactory
 
 
 class TestBaseModel(TestCase):
@@ -42,6 +51,23 @@ class TestBaseModel(TestCase):
         with self.assertRaises(ValueError):
             self.user2.save(user=self.user)
 
+    def test_base_model_save_rejects_stale_deleted(self) -> None:
+        """save() should reject objects that were soft-deleted after they were loaded."""
+        stale_user = User.objects.get(pk=self.user1.pk)
+        self.user1.delete(user=self.user)
+
+        stale_user.first_name = "Stale"
+        with self.assertRaisesMessage(ValueError, "Cannot update a soft-deleted object."), transaction.atomic():
+            stale_user.save(user=self.user)
+        self.assertNotEqual(User.objects_with_deleted.get(pk=self.user1.pk).first_name, "Stale")
+
+    def test_base_model_save_without_select(self) -> None:
+        """save() should update an active object without reading it first."""
+        with CaptureQueriesContext(connection) as queries:
+            self.user1.save(user=self.user)
+
+        self.assertFalse([query for query in queries if query["sql"].startswith("SELECT")])
+
     def test_base_model_save_user_is_required(self) -> None:
         """save() should raise an error if a user is not provided."""
         with self.assertRaises(ValueError):
@@ -90,3 +116,174 @@ class TestBaseModel(TestCase):
         """recover() should raise an error for an active object."""
         with self.assertRaises(ValueError):
             self.user1.recover(user=self.user)
+
+
+class TestAuditedBulkManager(TestCase):
+    """Tests for the audited bulk operations of the BaseModel managers."""
+
+    def setUp(self) -> None:
+        """Set up the test environment."""
+        self.user = get_system_user()
+
+    def test_bulk_create_audited(self) -> None:
+        """bulk_create_audited() should insert the objects and their history in batches."""
+        with self.assertNumQueries(6):
+            users = User.objects.bulk_create_audited(UserFactory.build_batch(3), self.user, batch_size=2)
+
+        for created_user in User.objects.filter(pk__in=[created_user.pk for created_user in users]):
+            self.assertEqual((created_user.created_by, created_user.updated_by), (self.user, self.user))
+            self.assertEqual(list(created_user.history.values_list("history_type", "history_user")),
+                             [("+", self.user.pk)])
+
+    def test_bulk_create_audited_polymorphic(self) -> None:
+        """bulk_create_audited() should set the content type of polymorphic objects."""
+        items = DocumentItemFactory.build_batch(2, party=OrganizationFactory.create(), account=AccountFactory.create())
+
+        DocumentItem.objects.bulk_create_audited(items, self.user)
+
+        self.assertEqual(DocumentItem.objects.filter(pk__in=[item.pk for item in items]).count(), 2)
+        self.assertEqual(DocumentItem.history.filter(uuid__in=[item.pk for item in items]).count(), 2)
+
+    def test_bulk_update_audited(self) -> None:
+        """bulk_update_audited() should update the fields and the audit fields and record the history."""
+        users = UserFactory.create_batch(2)
+        for changed_user in users:
+            changed_user.first_name = "Bulk"
+
+        updated = User.objects.bulk_update_audited(users, ["first_name"], self.user)
+
+        self.assertEqual(updated, 2)
+        for changed_user in User.objects.filter(pk__in=[changed_user.pk for changed_user in users]):
+            self.assertEqual((changed_user.first_name, changed_user.updated_by), ("Bulk", self.user))
+            self.assertEqual(changed_user.history.first().history_type, "~")
+            self.assertEqual(changed_user.history.first().first_name, "Bulk")
+
+    def test_bulk_update_audited_rejects_deleted(self) -> None:
+        """bulk_update_audited() should reject objects loaded soft-deleted."""
+        deleted_user = UserFactory.create()
+        deleted_user.delete(user=self.user)
+
+        with self.assertRaisesMessage(ValueError, "Cannot update a soft-deleted object."):
+            User.objects.bulk_update_audited([deleted_user], ["first_name"], self.user)
+
+    def test_bulk_create_audited_rejects_inherited(self) -> None:
+        """bulk_create_audited() should reject multi-table inherited models."""
+        with self.assertRaisesMessage(ValueError, "Organization is a multi-table inherited model"):
+            Organization.objects.bulk_create_audited([OrganizationFactory.build()], self.user)
+
+    def test_bulk_audited_rejects_save_override(self) -> None:
+        """The audited bulk operations should reject models whose save() override they would skip."""
+        item = DocumentItemFactory.create(party=OrganizationFactory.create())
+
+        with (patch.object(DocumentItem.DocumentItemManager, "bulk_maintains_save", new=False),
+              self.assertRaisesMessage(ValueError, "DocumentItem overrides save()")):
+            DocumentItem.objects.bulk_update_audited([item], ["title"], self.user)
+
+    def test_bulk_audited_user_is_required(self) -> None:
+        """The audited bulk operations should require a saved user."""
+        with self.assertRaisesMessage(ValueError, "You must provide a user to save the model."):
+            User.objects.bulk_create_audited(UserFactory.build_batch(1), None)
+        with self.assertRaisesMessage(ValueError, "User must be saved before saving the model."):
+            User.objects.bulk_update_audited([self.user], ["first_name"], UserFactory.build())
+
+
+class TestDeferredHistory(TestCase):
+    """Tests for deferred_history()."""
+
+    def setUp(self) -> None:
+        """Set up the test environment."""
+        self.user = get_system_user()
+
+    def _change(self) -> list[User]:
+        """Create, change and delete a user."""
+        changed_user = UserFactory.create(first_name="Created")
+        changed_user.first_name = "Changed"
+        changed_user.save(user=self.user)
+        changed_user.delete(user=self.user)
+        return [changed_user]
+
+    @staticmethod
+    def _history(changed_user: User) -> list[tuple]:
+        """Return the audited values of the history of a user from the oldest record."""
+        return list(User.history.filter(uuid=changed_user.pk).order_by("history_date", "history_id").values_list(
+            "history_type", "history_user", "first_name", "soft_deleted", "updated_by"))
+
+    def test_deferred_history_identical(self) -> None:
+        """deferred_history() should record the same history, written at the end of the block."""
+        [immediate_user] = self._change()
+        with deferred_history():
+            [deferred_user] = self._change()
+            self.assertFalse(User.history.filter(uuid=deferred_user.pk).exists())
+
+        self.assertEqual(self._history(deferred_user), self._history(immediate_user))
+        self.assertEqual([history_type for history_type, *_ in self._history(deferred_user)], ["+", "~", "~"])
+
+    def test_deferred_history_bulk_insert(self) -> None:
+        """deferred_history() should insert the records of a historical model with one statement."""
+        with CaptureQueriesContext(connection) as queries, deferred_history():
+            UserFactory.create_batch(3)
+            OrganizationFactory.create()
+
+        history_tables = [query["sql"].split('"')[1] for query in queries.captured_queries
+                          if query["sql"].startswith("INSERT") and "historical" in query["sql"]]
+        self.assertIn("common_historicaluser", history_tables)
+        self.assertEqual(len(history_tables), len(set(history_tables)))
+
+    def test_deferred_history_savepoint_rollback(self) -> None:
+        """A nested deferred_history() block that raises should discard its records and keep the outer ones."""
+        with deferred_history():
+            kept_user = UserFactory.create()
+            with self.assertRaises(RuntimeError), deferred_history():
+                rolled_back_user = UserFactory.create()
+                raise RuntimeError
+            [nested_user] = self._change()
+
+        self.assertEqual(User.history.filter(uuid=kept_user.pk).count(), 1)
+        self.assertFalse(User.objects_with_deleted.filter(pk=rolled_back_user.pk).exists())
+        self.assertFalse(User.history.filter(uuid=rolled_back_user.pk).exists())
+        self.assertEqual(User.history.filter(uuid=nested_user.pk).count(), 3)
+
+    def test_deferred_history_atomic_rollback(self) -> None:
+        """Records of a rolled back inner atomic() block should be discarded, down to its deepest savepoint."""
+        with deferred_history():
+            kept_user = UserFactory.create()
+            with transaction.atomic():
+                released_user = UserFactory.create()
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                rolled_back_user = UserFactory.create()
+                with transaction.atomic():
+                    deeper_user = UserFactory.create()
+                raise RuntimeError
+            kept_user.first_name = "Changed"
+            kept_user.save(user=self.user)
+
+        self.assertEqual(User.history.filter(uuid=kept_user.pk).count(), 2)
+        self.assertEqual(User.history.filter(uuid=released_user.pk).count(), 1)
+        self.assertFalse(User.history.filter(uuid__in=[rolled_back_user.pk, deeper_user.pk]).exists())
+
+    def test_deferred_history_exception(self) -> None:
+        """deferred_history() should roll back the block with its records and stop buffering."""
+        with self.assertRaises(RuntimeError), deferred_history():
+            failed_user = UserFactory.create()
+            raise RuntimeError
+
+        self.assertFalse(User.objects.filter(pk=failed_user.pk).exists())
+        self.assertFalse(User.history.filter(uuid=failed_user.pk).exists())
+        self.assertEqual(UserFactory.create().history.count(), 1)
+
+    def test_deferred_history_nested(self) -> None:
+        """Nested deferred_history() blocks should write the records at the end of the outer block."""
+        with deferred_history():
+            with deferred_history():
+                nested_user = UserFactory.create()
+            self.assertFalse(User.history.filter(uuid=nested_user.pk).exists())
+
+        self.assertEqual(User.history.filter(uuid=nested_user.pk).count(), 1)
+
+    def test_deferred_history_hard_delete(self) -> None:
+        """deferred_history() should record hard deletions right away."""
+        deleted_user = UserFactory.create()
+        deleted_uuid = deleted_user.pk
+        with deferred_history():
+            deleted_user.delete(hard_delete=True)
+            self.assertTrue(User.history.filter(uuid=deleted_uuid, history_type="-").exists())
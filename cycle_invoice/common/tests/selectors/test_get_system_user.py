@@ -1,8 +1,10 @@
 """Tests for the common selector method get_system_user()."""
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
+from cycle_invoice.common.models import User
 from cycle_invoice.common.selectors import get_system_user
+from cycle_invoice.common.tests.factories import UserFactory
 
 
 class TestGetSystemUser(TestCase):
@@ -23,3 +25,55 @@ class TestGetSystemUser(TestCase):
         user1 = get_system_user()
         user2 = get_system_user()
         self.assertEqual(user1, user2)
+
+    def test_get_system_user_cached(self) -> None:
+        """Test get_system_user() loads the system user only once."""
+        get_system_user.cache_clear()
+        user = get_system_user()
+        with self.assertNumQueries(0):
+            self.assertIs(get_system_user(), user)
+
+    def test_get_system_user_reloaded_after_save(self) -> None:
+        """Test get_system_user() reloads the system user after it was saved."""
+        # The change is rolled back after the test, so the cached user must be too
+        self.addCleanup(get_system_user.cache_clear)
+        user = get_system_user()
+        system_user = User.objects.get(pk=user.pk)
+        system_user.first_name = "Automation"
+        system_user.save(user=user)
+
+        self.assertEqual(get_system_user().first_name, "Automation")
+
+    def test_get_system_user_reloaded_after_delete(self) -> None:
+        """Test get_system_user() reloads the system user after it was deleted."""
+        self.addCleanup(get_system_user.cache_clear)
+        user = get_system_user()
+        system_user = User.objects.get(pk=user.pk)
+        system_user.delete(user=user)
+
+        with self.assertRaises(User.DoesNotExist):
+            get_system_user()
+
+    def test_get_system_user_reloaded_after_hard_delete(self) -> None:
+        """Test get_system_user() reloads the system user after it was hard deleted."""
+        other_user = UserFactory.create()
+        with override_settings(SYSTEM_USER_EMAIL=other_user.email):
+            self.assertEqual(get_system_user(), other_user)
+            other_user.delete(hard_delete=True)
+
+            with self.assertRaises(User.DoesNotExist):
+                get_system_user()
+
+    def test_get_system_user_setting(self) -> None:
+        """Test get_system_user() honours the setting SYSTEM_USER_EMAIL."""
+        other_user = UserFactory.create()
+        with override_settings(SYSTEM_USER_EMAIL=other_user.email):
+            self.assertEqual(get_system_user(), other_user)
+        self.assertEqual(get_system_user().email, "system@cycleinvoice.local")
+
+    def test_get_system_user_other_user_saved(self) -> None:
+        """Test get_system_user() stays cached when other users are saved."""
+        user = get_system_user()
+        UserFactory.create()
+        with self.assertNumQueries(0):
+            self.assertIs(get_system_user(), user)
@@ -0,0 +1,35 @@
+"""Tests for the common utility timed_cache."""
+from unittest.mock import Mock, patch
+
+from django.test import SimpleTestCase
+
+from cycle_invoice.common.utils import timed_cache
+
+
+class TestTimedCache(SimpleTestCase):
+    """Tests for the common utility timed_cache."""
+
+    def setUp(self) -> None:
+        """Cache a function counting its calls for ten seconds."""
+        self.function = Mock(side_effect=lambda: self.function.call_count, __name__="load")
+        self.cached = timed_cache(10)(self.function)
+        self.monotonic = self.enterContext(patch("cycle_invoice.common.utils.time.monotonic", return_value=100.0))
+
+    def test_timed_cache_reuses_result(self) -> None:
+        """The result is loaded on the first call and reused until it expires."""
+        self.assertEqual(self.cached(), 1)
+        self.monotonic.return_value = 109.9
+        self.assertEqual(self.cached(), 1)
+        self.assertEqual(self.cached.__name__, "load")
+
+    def test_timed_cache_expires(self) -> None:
+        """The result is loaded again once it expired."""
+        self.cached()
+        self.monotonic.return_value = 110.0
+        self.assertEqual(self.cached(), 2)
+
+    def test_timed_cache_clear(self) -> None:
+        """Clearing the cache loads the result again on the next call."""
+        self.cached()
+        self.cached.cache_clear()
+        self.assertEqual(self.cached(), 2)
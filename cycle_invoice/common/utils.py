@@ -0,0 +1,45 @@
+"""Utilities shared by the apps."""
+import time
+from collections.abc import Callable
+from functools import update_wrapper
+
+
+class TimedCache[T]:
+    """
+    Cache of the result of a function without arguments, which expires after a number of seconds.
+
+    Unlike `functools.cache`, a result loaded from shared state, e.g. constance, is loaded again after
+    a while, so every process picks up changes made by other processes. `cache_clear` drops the
+    result right away.
+    """
+
+    def __init__(self, function: Callable[[], T], seconds: float) -> None:
+        """Wrap the function, nothing is loaded before the first call."""
+        self._function = function
+        self._seconds = seconds
+        self._entry: tuple[float, T] | None = None
+        update_wrapper(self, function)
+
+    def __call__(self) -> T:
+        """Return the cached result, loading it again if it expired."""
+        entry = self._entry
+        if entry is None or time.monotonic() >= entry[0]:
+            entry = (time.monotonic() + self._seconds, self._function())
+            self._entry = entry
+        return entry[1]
+
+    def cache_clear(self) -> None:
+        """Drop the cached result, the next call loads it again."""
+        self._entry = None
+
+
+def timed_cache[T](seconds: float) -> Callable[[Callable[[], T]], TimedCache[T]]:
+    """
+    Cache the result of a function without arguments for the given number of seconds.
+
+    :param seconds: Number of seconds the result is reused
+    :return: A decorator wrapping the function in a `TimedCache`
+    """
+    def decorator(function: Callable[[], T]) -> TimedCache[T]:
+        return TimedCache(function, seconds)
+    return decorator
@@ -0,0 +1,10 @@
+"""Devtools app config."""
+
+from django.apps import AppConfig
+
+
+class DevtoolsConfig(AppConfig):
+    """Devtools app config."""
+
+    name = "cycle_invoice.devtools"
+    label = "devtools"
@@ -0,0 +1,122 @@
+"""
+Benchmark for the invoice PDF generation.
+
+Invoices with a growing number of items, half of them subscription items, are seeded with the
+factories and rendered end to end. Each size reports the render times, the mean time per pipeline
+stage, the peak memory, the number of queries and the size of the PDF. The seeded invoices are rolled
+back and the PDFs are written to a temporary `FileSystemStorage`, so the benchmark runs locally
+without S3 and leaves no data behind.
+"""
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from dataclasses import dataclass, field
+from uuid import UUID
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from cycle_invoice.sale.tests.factories import DocumentItemFactory, InvoiceFactory
+from cycle_invoice.sale.utils.invoice_pdf_generation import add_pdf_to_storage, build_invoice_pdf
+from cycle_invoice.sale.utils.pdf_metrics import PDFStageMetric
+from cycle_invoice.subscription.tests.factories import SubscriptionDocumentItemFactory, SubscriptionFactory
+
+# Numbers of document items of the benchmarked invoices
+BENCHMARK_ITEM_COUNTS = (1, 10, 100, 1000)
+
+# Seconds spent per stage during the current benchmark run, filled by `record_benchmark_stage`
+_stage_seconds: dict[str, float] = defaultdict(float)
+
+
+@dataclass
+class InvoicePDFBenchmarkResult:
+    """Measurements of rendering an invoice with a given number of items."""
+
+    items: int
+    seconds: list[float] = field(default_factory=list)
+    stages: dict[str, float] = field(default_factory=dict)
+    peak_memory: int = 0
+    queries: int = 0
+    pdf_size: int = 0
+
+    @property
+    def median_seconds(self) -> float:
+        """Median end-to-end time of the runs."""
+        return statistics.median(self.seconds)
+
+
+def record_benchmark_stage(metric: PDFStageMetric) -> None:
+    """Metrics sink adding the duration of a stage to the current benchmark run."""
+    _stage_seconds[metric.stage] += metric.duration
+
+
+def run_invoice_pdf_benchmark(item_counts: tuple[int, ...] = BENCHMARK_ITEM_COUNTS, *,
+                              runs: int = 3) -> list[InvoicePDFBenchmarkResult]:
+    """
+    Benchmark the PDF generation of invoices with the given numbers of items.
+
+    :param item_counts: Numbers of document items to benchmark
+    :param runs: Number of timed runs per invoice size
+    :return: One result per invoice size
+    """
+    with (tempfile.TemporaryDirectory() as media_root,
+          override_settings(STORAGES={**settings.STORAGES, "default": {
+              "BACKEND": "django.core.files.storage.FileSystemStorage",
+              "OPTIONS": {"location": media_root},
+          }}, INVOICE_PDF_METRICS_SINK=f"{__name__}.record_benchmark_stage"),
+          transaction.atomic()):
+        results = [benchmark_invoice_pdf(seed_benchmark_invoice(item_count), item_count, runs=runs)
+                   for item_count in item_counts]
+        # Discard the seeded invoices
+        transaction.set_rollback(True)
+    return results
+
+
+def seed_benchmark_invoice(item_count: int) -> UUID:
+    """Create an invoice with the given number of items, half of them subscription items, and return its UUID."""
+    invoice = InvoiceFactory.create(party__address__country="CH", party__address__zip_code="8000")
+    DocumentItemFactory.create_batch(item_count - item_count // 2, document=invoice, party=invoice.party)
+    subscription = SubscriptionFactory.create(party=invoice.party)
+    SubscriptionDocumentItemFactory.create_batch(item_count // 2, document=invoice, party=invoice.party,
+                                                 subscription=subscription)
+    return invoice.uuid
+
+
+def benchmark_invoice_pdf(invoice_id: UUID, item_count: int, *, runs: int) -> InvoicePDFBenchmarkResult:
+    """
+    Render and store the PDF of an invoice several times and measure each run.
+
+    The timed runs are followed by one run under `tracemalloc` for the peak memory and the number of
+    queries, as tracing slows the rendering down too much to be timed.
+
+    :param invoice_id: UUID of the seeded invoice
+    :param item_count: Number of document items of the invoice
+    :param runs: Number of timed runs
+    :return: The measurements of the invoice
+    """
+    result = InvoicePDFBenchmarkResult(items=item_count)
+    stage_totals: dict[str, float] = defaultdict(float)
+    for _ in range(runs):
+        _stage_seconds.clear()
+        start = time.perf_counter()
+        pdf_file = add_pdf_to_storage(build_invoice_pdf(invoice_id))
+        result.seconds.append(time.perf_counter() - start)
+        for stage, seconds in _stage_seconds.items():
+            stage_totals[stage] += seconds
+        result.pdf_size = default_storage.size(pdf_file)
+        default_storage.delete(pdf_file)
+    result.stages = {stage: seconds / runs for stage, seconds in stage_totals.items()}
+
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            default_storage.delete(add_pdf_to_storage(build_invoice_pdf(invoice_id)))
+        result.peak_memory = tracemalloc.get_traced_memory()[1]
+        result.queries = len(queries)
+    finally:
+        tracemalloc.stop()
+    return result
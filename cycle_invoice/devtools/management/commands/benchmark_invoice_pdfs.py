@@ -0,0 +1,47 @@
+"""Command to benchmark the PDF generation of invoices."""
+import json
+import platform
+from dataclasses import asdict
+from pathlib import Path
+
+from django.core.management import CommandParser
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from cycle_invoice.devtools.invoice_pdf_benchmark import BENCHMARK_ITEM_COUNTS, run_invoice_pdf_benchmark
+
+
+class Command(BaseCommand):
+    """Command to benchmark the PDF generation of invoices."""
+
+    help = ("Render seeded invoices of growing size and save the timings, peak memory, queries and PDF sizes "
+            "as JSON")
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Add custom arguments to the command."""
+        parser.add_argument("--items", nargs="+", type=int, default=list(BENCHMARK_ITEM_COUNTS),
+                            help="Numbers of document items of the benchmarked invoices")
+        parser.add_argument("--runs", type=int, default=3, help="Number of timed runs per invoice size")
+        parser.add_argument("--output", type=Path, default=Path("invoice_pdf_benchmark.json"),
+                            help="JSON file the results are written to")
+        parser.add_argument("--label", default="", help="Label of the results, e.g. the commit hash")
+
+    def handle(self, *args, **options) -> None:
+        """Run the benchmark, print a summary and save the results."""
+        results = run_invoice_pdf_benchmark(tuple(options["items"]), runs=options["runs"])
+
+        for result in results:
+            stages = ", ".join(f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in result.stages.items())
+            self.stdout.write(f"{result.items} items: {result.median_seconds * 1000:.1f} ms, "
+                              f"{result.peak_memory / 1024 / 1024:.1f} MiB peak, {result.queries} queries, "
+                              f"{result.pdf_size} bytes ({stages})")
+
+        report = {
+            "label": options["label"],
+            "created_at": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "runs": options["runs"],
+            "results": [{**asdict(result), "median_seconds": result.median_seconds} for result in results],
+        }
+        options["output"].write_text(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Saved the benchmark results to {options['output']}"))
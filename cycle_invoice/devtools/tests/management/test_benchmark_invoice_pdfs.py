@@ -0,0 +1,76 @@
+"""Tests for the management command benchmark_invoice_pdfs."""
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from typing import IO, Any
+from unittest.mock import NonCallableMock, patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from cycle_invoice.sale.models import Invoice
+from cycle_invoice.sale.utils.company_profile import CompanyProfile
+
+
+def write_pdf(_html_content: str, target: IO[bytes]) -> None:
+    """Pretend to render a PDF into the target stream."""
+    target.write(b"%PDF")
+
+
+def add_qr_bill(context_data: dict[str, Any], _company: CompanyProfile) -> dict[str, Any]:
+    """Pretend to generate the QR bill."""
+    context_data["qr_bill_svg"] = "<svg>QR</svg>"
+    return context_data
+
+
+@override_settings(STORAGES={
+    "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}
+})
+@patch("cycle_invoice.sale.utils.invoice_pdf_generation.generate_pdf_from_html", side_effect=write_pdf)
+@patch("cycle_invoice.sale.utils.invoice_pdf_generation.generate_swiss_qr", side_effect=add_qr_bill)
+class TestBenchmarkInvoicePdfs(TestCase):
+    """Tests for the management command `benchmark_invoice_pdfs`."""
+
+    def setUp(self) -> None:
+        """Write the results to a temporary directory."""
+        output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(output_dir.cleanup)
+        self.output = Path(output_dir.name) / "benchmark.json"
+
+    def test_benchmark(self, mock_generate_swiss_qr: NonCallableMock,
+                       mock_generate_pdf_from_html: NonCallableMock) -> None:
+        """Command should render each invoice size and save the measurements as JSON."""
+        out = StringIO()
+        call_command("benchmark_invoice_pdfs", "--items", "1", "3", "--runs", "2", "--label", "abc123",
+                     "--output", str(self.output), stdout=out)
+
+        # Two timed runs and one traced run per invoice size
+        self.assertEqual(mock_generate_swiss_qr.call_count, 6)
+        self.assertEqual(mock_generate_pdf_from_html.call_count, 6)
+        report = json.loads(self.output.read_text())
+        self.assertEqual(report["label"], "abc123")
+        self.assertEqual([result["items"] for result in report["results"]], [1, 3])
+        for result in report["results"]:
+            self.assertEqual(len(result["seconds"]), 2)
+            self.assertEqual(set(result["stages"]), {"content", "qr", "html", "storage"})
+            self.assertGreater(result["peak_memory"], 0)
+            self.assertEqual(result["pdf_size"], 4)
+        # Mixing item types costs no extra queries, and neither do more items
+        self.assertEqual(report["results"][0]["queries"], report["results"][1]["queries"])
+        self.assertIn("3 items:", out.getvalue())
+        self.assertIn(f"Saved the benchmark results to {self.output}", out.getvalue())
+
+    def test_benchmark_discards_seeded_invoices(self, mock_generate_swiss_qr: NonCallableMock,
+                                                mock_generate_pdf_from_html: NonCallableMock) -> None:
+        """Command should leave neither invoices nor PDFs behind."""
+        with patch("cycle_invoice.devtools.invoice_pdf_benchmark.default_storage") as mock_default_storage:
+            mock_default_storage.size.return_value = 4
+            call_command("benchmark_invoice_pdfs", "--items", "2", "--runs", "1", "--output", str(self.output),
+                         stdout=StringIO())
+
+        mock_generate_swiss_qr.assert_called()
+        mock_generate_pdf_from_html.assert_called()
+        self.assertEqual(mock_default_storage.delete.call_count, 2)
+        self.assertFalse(Invoice.objects.exists())
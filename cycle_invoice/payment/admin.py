@@ -0,0 +1,9 @@
+"""Admin configuration for payment app."""
+
+from django.contrib import admin
+
+from cycle_invoice.common.models import BaseModelAdmin
+from cycle_invoice.payment.models import BankStatement, Payment
+
+admin.site.register(BankStatement, BaseModelAdmin)
+admin.site.register(Payment, BaseModelAdmin)
@@ -0,0 +1,10 @@
+"""Payment app config."""
+
+from django.apps import AppConfig
+
+
+class PaymentConfig(AppConfig):
+    """Payment app config."""
+
+    name = "cycle_invoice.payment"
+    label = "payment"
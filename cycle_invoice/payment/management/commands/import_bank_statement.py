@@ -0,0 +1,30 @@
+"""Command to import camt.053 and camt.054 bank files."""
+from pathlib import Path
+
+from django.core.management import CommandError, CommandParser
+from django.core.management.base import BaseCommand
+
+from cycle_invoice.common.selectors import get_system_user
+from cycle_invoice.payment.services import bank_statement_import
+
+
+class Command(BaseCommand):
+    """Command to import camt.053 and camt.054 bank files."""
+
+    help = "Import camt.053 or camt.054 bank files and reconcile their QR bill payments with the invoices"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Add custom arguments to the command."""
+        parser.add_argument("files", nargs="+", type=Path, help="Paths of the bank files")
+
+    def handle(self, *args, **options) -> None:
+        """Import the bank files one after the other."""
+        for path in options["files"]:
+            if not path.is_file():
+                error_message = f"Bank file {path} does not exist"
+                raise CommandError(error_message)
+            with path.open("rb") as file:
+                statement = bank_statement_import(file, file_name=path.name, user=get_system_user())
+            self.stdout.write(self.style.SUCCESS(
+                f"{path.name}: {statement.matched_count} matched, {statement.partial_count} partial, "
+                f"{statement.unmatched_count} unmatched payments"))
@@ -0,0 +1,125 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:33
+
+import django.db.models.deletion
+import django.db.models.manager
+import simple_history.models
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('sale', '0003_invoice_pdf_fingerprint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankStatement',
+            fields=[
+                ('uuid', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True, verbose_name='UUID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('soft_deleted', models.BooleanField(db_index=True, default=False, verbose_name='soft deleted')),
+                ('file_name', models.CharField(max_length=255, verbose_name='file name')),
+                ('matched_count', models.PositiveIntegerField(default=0, verbose_name='matched payments')),
+                ('partial_count', models.PositiveIntegerField(default=0, verbose_name='partial payments')),
+                ('unmatched_count', models.PositiveIntegerField(default=0, verbose_name='unmatched payments')),
+                ('created_by', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_created_by', to=settings.AUTH_USER_MODEL)),
+                ('updated_by', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_updated_by', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+            managers=[
+                ('objects_with_deleted', django.db.models.manager.Manager()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='HistoricalBankStatement',
+            fields=[
+                ('uuid', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, verbose_name='UUID')),
+                ('created_at', models.DateTimeField(blank=True, editable=False, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(blank=True, editable=False, verbose_name='updated at')),
+                ('soft_deleted', models.BooleanField(db_index=True, default=False, verbose_name='soft deleted')),
+                ('file_name', models.CharField(max_length=255, verbose_name='file name')),
+                ('matched_count', models.PositiveIntegerField(default=0, verbose_name='matched payments')),
+                ('partial_count', models.PositiveIntegerField(default=0, verbose_name='partial payments')),
+                ('unmatched_count', models.PositiveIntegerField(default=0, verbose_name='unmatched payments')),
+                ('history_id', models.AutoField(primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('created_by', models.ForeignKey(blank=True, db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('updated_by', models.ForeignKey(blank=True, db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical bank statement',
+                'verbose_name_plural': 'historical bank statements',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='HistoricalPayment',
+            fields=[
+                ('uuid', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, verbose_name='UUID')),
+                ('created_at', models.DateTimeField(blank=True, editable=False, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(blank=True, editable=False, verbose_name='updated at')),
+                ('soft_deleted', models.BooleanField(db_index=True, default=False, verbose_name='soft deleted')),
+                ('status', models.CharField(choices=[('MATCHED', 'Matched'), ('PARTIAL', 'Partial'), ('UNMATCHED', 'Unmatched')], db_index=True, max_length=10, verbose_name='status')),
+                ('reference', models.CharField(blank=True, db_index=True, max_length=35, verbose_name='reference')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='amount')),
+                ('currency', models.CharField(max_length=3, verbose_name='currency')),
+                ('booking_date', models.DateField(blank=True, null=True, verbose_name='booking date')),
+                ('bank_reference', models.CharField(blank=True, max_length=255, verbose_name='bank reference')),
+                ('history_id', models.AutoField(primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('created_by', models.ForeignKey(blank=True, db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('invoice', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='sale.invoice', verbose_name='invoice')),
+                ('statement', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='payment.bankstatement', verbose_name='bank statement')),
+                ('updated_by', models.ForeignKey(blank=True, db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical payment',
+                'verbose_name_plural': 'historical payments',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('uuid', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True, verbose_name='UUID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('soft_deleted', models.BooleanField(db_index=True, default=False, verbose_name='soft deleted')),
+                ('status', models.CharField(choices=[('MATCHED', 'Matched'), ('PARTIAL', 'Partial'), ('UNMATCHED', 'Unmatched')], db_index=True, max_length=10, verbose_name='status')),
+                ('reference', models.CharField(blank=True, db_index=True, max_length=35, verbose_name='reference')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='amount')),
+                ('currency', models.CharField(max_length=3, verbose_name='currency')),
+                ('booking_date', models.DateField(blank=True, null=True, verbose_name='booking date')),
+                ('bank_reference', models.CharField(blank=True, max_length=255, verbose_name='bank reference')),
+                ('created_by', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_created_by', to=settings.AUTH_USER_MODEL)),
+                ('invoice', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='payments', to='sale.invoice', verbose_name='invoice')),
+                ('statement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='payment.bankstatement', verbose_name='bank statement')),
+                ('updated_by', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_updated_by', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+            managers=[
+                ('objects_with_deleted', django.db.models.manager.Manager()),
+            ],
+        ),
+    ]
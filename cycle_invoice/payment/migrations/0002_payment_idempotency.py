@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0001_initial'),
+        ('sale', '0007_fill_document_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bankstatement',
+            name='message_id',
+            field=models.CharField(blank=True, max_length=35, verbose_name='message id'),
+        ),
+        migrations.AddField(
+            model_name='historicalbankstatement',
+            name='message_id',
+            field=models.CharField(blank=True, max_length=35, verbose_name='message id'),
+        ),
+        migrations.AddConstraint(
+            model_name='bankstatement',
+            constraint=models.UniqueConstraint(condition=models.Q(('message_id', ''), _negated=True), fields=('message_id',), name='unique_bank_statement_message_id'),
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(condition=models.Q(('bank_reference', ''), _negated=True), fields=('bank_reference',), name='unique_payment_bank_reference'),
+        ),
+    ]
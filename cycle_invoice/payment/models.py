@@ -0,0 +1,111 @@
+"""Models for payment app."""
+
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from cycle_invoice.common.models import BaseModel
+
+
+class BankStatement(BaseModel):
+    """Model representing an imported camt.053 or camt.054 bank file."""
+
+    file_name = models.CharField(
+        max_length=255,
+        verbose_name=_("file name")
+    )
+    message_id = models.CharField(
+        max_length=35,
+        blank=True,
+        verbose_name=_("message id")
+    )
+    matched_count = models.PositiveIntegerField(
+        verbose_name=_("matched payments"),
+        default=0
+    )
+    partial_count = models.PositiveIntegerField(
+        verbose_name=_("partial payments"),
+        default=0
+    )
+    unmatched_count = models.PositiveIntegerField(
+        verbose_name=_("unmatched payments"),
+        default=0
+    )
+
+    class Meta:
+        """Meta-options for the BankStatement model."""
+
+        # A bank file is imported only once
+        constraints = [models.UniqueConstraint(fields=["message_id"], condition=~models.Q(message_id=""),
+                                               name="unique_bank_statement_message_id")]
+
+    def __str__(self) -> str:
+        """Return a string representation of the BankStatement."""
+        return self.file_name
+
+
+class Payment(BaseModel):
+    """Model representing an incoming payment read from a bank statement."""
+
+    class Status(models.TextChoices):
+        """Status choices for the Payment model."""
+
+        MATCHED = "MATCHED", "Matched"
+        PARTIAL = "PARTIAL", "Partial"
+        UNMATCHED = "UNMATCHED", "Unmatched"
+
+    statement = models.ForeignKey(
+        BankStatement,
+        on_delete=models.CASCADE,
+        related_name="payments",
+        verbose_name=_("bank statement")
+    )
+    invoice = models.ForeignKey(
+        "sale.Invoice",
+        on_delete=models.PROTECT,
+        related_name="payments",
+        verbose_name=_("invoice"),
+        null=True,
+        blank=True
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        db_index=True,
+        verbose_name=_("status")
+    )
+    reference = models.CharField(
+        max_length=35,
+        blank=True,
+        db_index=True,
+        verbose_name=_("reference")
+    )
+    amount = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        verbose_name=_("amount")
+    )
+    currency = models.CharField(
+        max_length=3,
+        verbose_name=_("currency")
+    )
+    booking_date = models.DateField(
+        verbose_name=_("booking date"),
+        null=True,
+        blank=True
+    )
+    bank_reference = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_("bank reference")
+    )
+
+    class Meta:
+        """Meta-options for the Payment model."""
+
+        # A payment booked by the bank is imported only once, even if it is part of several bank files
+        constraints = [models.UniqueConstraint(fields=["bank_reference"], condition=~models.Q(bank_reference=""),
+                                               name="unique_payment_bank_reference")]
+
+    def __str__(self) -> str:
+        """Return a string representation of the Payment."""
+        return f"{self.amount} {self.currency} - {self.reference or self.bank_reference}"
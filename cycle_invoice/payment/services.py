@@ -0,0 +1,123 @@
+"""Services for payment app."""
+from collections.abc import Sequence
+from decimal import Decimal
+from itertools import batched
+from os import PathLike
+from typing import IO
+from uuid import UUID
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Sum
+
+from cycle_invoice.common.services import model_update
+from cycle_invoice.payment.models import BankStatement, Payment
+from cycle_invoice.payment.utils.camt import CamtTransaction, camt_message_id, iter_camt_transactions
+from cycle_invoice.sale.selectors.invoice import invoice_ids_by_qr_reference, invoice_totals
+from cycle_invoice.sale.utils.swiss_qr import validate_qr_reference
+
+# Number of bank file transactions reconciled and saved together
+RECONCILIATION_BATCH_SIZE = 1000
+
+
+@transaction.atomic
+def bank_statement_import(source: str | PathLike | IO[bytes], *, file_name: str,
+                          user: get_user_model) -> BankStatement:
+    """
+    Import a camt.053 or camt.054 bank file and reconcile its payments with the invoices.
+
+    The file is parsed as a stream and reconciled in batches: the invoices of the QR references, their
+    totals and their earlier payments are loaded with one query each per batch, and the payments of a
+    batch are saved with one bulk insert.
+
+    A payment is matched if it settles the open amount of its invoice, partial if an open amount
+    remains, and unmatched if its reference belongs to no invoice.
+
+    Imports are idempotent: a bank file whose message id was imported before is not imported again,
+    and payments whose bank reference was imported before, e.g. from the camt.053 statement of a day
+    after its camt.054 notifications, are skipped.
+
+    :param source: Path or binary file of the bank file
+    :param file_name: Name of the bank file
+    :param user: User importing the bank file
+    :return: The bank statement with the number of matched, partial and unmatched payments, or the
+        statement of the earlier import of the bank file
+    """
+    message_id = camt_message_id(source)
+    if message_id:
+        imported = BankStatement.objects_with_deleted.filter(message_id=message_id).first()
+        if imported is not None:
+            return imported
+    statement = BankStatement(file_name=file_name, message_id=message_id)
+    statement.save(user=user)
+
+    open_amounts: dict[UUID, Decimal] = {}
+    counts = dict.fromkeys(Payment.Status, 0)
+    for transactions in batched(iter_camt_transactions(source), RECONCILIATION_BATCH_SIZE):
+        payments = _reconcile(statement, _new_transactions(transactions), open_amounts)
+        Payment.objects.bulk_create_audited(payments, user, batch_size=RECONCILIATION_BATCH_SIZE)
+        for payment in payments:
+            counts[payment.status] += 1
+
+    statement, _ = model_update(
+        instance=statement,
+        fields=["matched_count", "partial_count", "unmatched_count"],
+        data={"matched_count": counts[Payment.Status.MATCHED], "partial_count": counts[Payment.Status.PARTIAL],
+              "unmatched_count": counts[Payment.Status.UNMATCHED]},
+        user=user,
+    )
+    return statement
+
+
+def _new_transactions(transactions: Sequence[CamtTransaction]) -> list[CamtTransaction]:
+    """Drop the transactions whose bank reference was imported before, in an earlier batch or bank file."""
+    bank_references = {bank_transaction.bank_reference for bank_transaction in transactions} - {""}
+    seen = set(Payment.objects_with_deleted.filter(bank_reference__in=bank_references)
+               .values_list("bank_reference", flat=True))
+    new_transactions = []
+    for bank_transaction in transactions:
+        if bank_transaction.bank_reference in seen:
+            continue
+        if bank_transaction.bank_reference:
+            seen.add(bank_transaction.bank_reference)
+        new_transactions.append(bank_transaction)
+    return new_transactions
+
+
+def _reconcile(statement: BankStatement, transactions: Sequence[CamtTransaction],
+               open_amounts: dict[UUID, Decimal]) -> list[Payment]:
+    """
+    Match a batch of transactions to invoices and build their payments.
+
+    `open_amounts` holds the amount still owed per invoice and is updated with every payment, so
+    several payments of the same invoice within one bank file are reconciled in order.
+    """
+    # Malformed references, e.g. SCOR creditor references, are not looked up
+    invoice_ids = invoice_ids_by_qr_reference(bank_transaction.reference for bank_transaction in transactions
+                                              if validate_qr_reference(bank_transaction.reference))
+    matches = [(bank_transaction, invoice_ids.get(bank_transaction.reference)) for bank_transaction in transactions]
+    _load_open_amounts(set(invoice_ids.values()) - open_amounts.keys(), open_amounts)
+
+    payments = []
+    for bank_transaction, invoice_id in matches:
+        if invoice_id is None:
+            status = Payment.Status.UNMATCHED
+        else:
+            open_amounts[invoice_id] -= bank_transaction.amount
+            status = Payment.Status.MATCHED if open_amounts[invoice_id] <= 0 else Payment.Status.PARTIAL
+        payments.append(Payment(statement=statement, invoice_id=invoice_id, status=status,
+                                reference=bank_transaction.reference, amount=bank_transaction.amount,
+                                currency=bank_transaction.currency, booking_date=bank_transaction.booking_date,
+                                bank_reference=bank_transaction.bank_reference))
+    return payments
+
+
+def _load_open_amounts(invoice_ids: set[UUID], open_amounts: dict[UUID, Decimal]) -> None:
+    """Add the totals of the given invoices minus their earlier payments to `open_amounts`."""
+    if not invoice_ids:
+        return
+    open_amounts.update(invoice_totals(invoice_ids))
+    paid_amounts = (Payment.objects.filter(invoice__in=invoice_ids).exclude(status=Payment.Status.UNMATCHED)
+                    .values_list("invoice").annotate(paid=Sum("amount")))
+    for invoice_id, paid in paid_amounts:
+        open_amounts[invoice_id] -= paid
@@ -0,0 +1,79 @@
+"""Factories for payment app models and bank files."""
+from decimal import Decimal
+
+from factory import LazyAttribute, SubFactory
+
+from cycle_invoice.common.tests.factories import BaseFactory
+from cycle_invoice.common.tests.faker import faker
+from cycle_invoice.payment.models import BankStatement, Payment
+
+CAMT054_NAMESPACE = "urn:iso:std:iso:20022:tech:xsd:camt.054.001.08"
+
+
+class BankStatementFactory(BaseFactory):
+    """Factory for the BankStatement model."""
+
+    class Meta:
+        """Metaclass for BankStatementFactory."""
+
+        model = BankStatement
+
+    file_name = LazyAttribute(lambda _: f"{faker.uuid4()}.xml")
+
+
+class PaymentFactory(BaseFactory):
+    """Factory for the Payment model."""
+
+    class Meta:
+        """Metaclass for PaymentFactory."""
+
+        model = Payment
+
+    statement = SubFactory(BankStatementFactory)
+    status = Payment.Status.UNMATCHED
+    amount = LazyAttribute(lambda _: faker.pydecimal(left_digits=3, right_digits=2, positive=True))
+    currency = "CHF"
+
+
+def camt_transaction(reference: str, amount: Decimal | str, *, indicator: str = "CRDT",
+                     bank_reference: str = "") -> str:
+    """Return the XML of a transaction of a camt.054 entry."""
+    return f"""
+        <TxDtls>
+            <Refs><AcctSvcrRef>{bank_reference}</AcctSvcrRef></Refs>
+            <Amt Ccy="CHF">{amount}</Amt>
+            <CdtDbtInd>{indicator}</CdtDbtInd>
+            <RmtInf><Strd><CdtrRefInf>
+                <Tp><CdOrPrtry><Prtry>QRR</Prtry></CdOrPrtry></Tp>
+                <Ref>{reference}</Ref>
+            </CdtrRefInf></Strd></RmtInf>
+        </TxDtls>"""
+
+
+def camt_entry(*transactions: str, amount: Decimal | str = "0.00", indicator: str = "CRDT",
+               booking_date: str = "<Dt>2026-03-02</Dt>", extra: str = "") -> str:
+    """Return the XML of a booking entry of a camt.054 notification."""
+    details = f"<NtryDtls>{''.join(transactions)}</NtryDtls>" if transactions else ""
+    return f"""
+    <Ntry>
+        <Amt Ccy="CHF">{amount}</Amt>
+        <CdtDbtInd>{indicator}</CdtDbtInd>
+        {extra}
+        <BookgDt>{booking_date}</BookgDt>
+        <AcctSvcrRef>ENTRY-REF</AcctSvcrRef>
+        {details}
+    </Ntry>"""
+
+
+def camt_document(*entries: str) -> bytes:
+    """Return a camt.054 bank file with the given booking entries."""
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<Document xmlns="{CAMT054_NAMESPACE}">
+    <BkToCstmrDbtCdtNtfctn>
+        <GrpHdr><MsgId>MSG-1</MsgId></GrpHdr>
+        <Ntfctn>
+            <Id>NTF-1</Id>
+            {''.join(entries)}
+        </Ntfctn>
+    </BkToCstmrDbtCdtNtfctn>
+</Document>""".encode()
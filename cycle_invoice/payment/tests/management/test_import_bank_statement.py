@@ -0,0 +1,36 @@
+"""Tests for the management command import_bank_statement."""
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from cycle_invoice.payment.models import BankStatement
+from cycle_invoice.payment.tests.factories import camt_document, camt_entry, camt_transaction
+
+
+class TestImportBankStatement(TestCase):
+    """Tests for the management command `import_bank_statement`."""
+
+    def setUp(self) -> None:
+        """Write the bank files to a temporary directory."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def test_imports_bank_files(self) -> None:
+        """Command should import every bank file and report its payments."""
+        path = self.directory / "camt054.xml"
+        path.write_bytes(camt_document(camt_entry(camt_transaction("210000000003139471430009017", "10.00"))))
+
+        out = StringIO()
+        call_command("import_bank_statement", str(path), stdout=out)
+
+        self.assertIn("camt054.xml: 0 matched, 0 partial, 1 unmatched payments", out.getvalue())
+        self.assertEqual(BankStatement.objects.get().file_name, "camt054.xml")
+
+    def test_requires_existing_files(self) -> None:
+        """Command should fail for missing bank files."""
+        with self.assertRaisesMessage(CommandError, "does not exist"):
+            call_command("import_bank_statement", str(self.directory / "missing.xml"), stdout=StringIO())
@@ -0,0 +1 @@
+"""Tests for models of the payment app."""
@@ -0,0 +1,13 @@
+"""Tests for the payment model BankStatement."""
+
+from django.test import TestCase
+
+from cycle_invoice.payment.tests.factories import BankStatementFactory
+
+
+class TestBankStatement(TestCase):
+    """Tests for the payment model BankStatement."""
+
+    def test_bank_statement_str(self) -> None:
+        """Test BankStatement.__str__()."""
+        self.assertEqual(str(BankStatementFactory.build(file_name="camt054.xml")), "camt054.xml")
@@ -0,0 +1,20 @@
+"""Tests for the payment model Payment."""
+from decimal import Decimal
+
+from django.test import TestCase
+
+from cycle_invoice.payment.tests.factories import PaymentFactory
+
+
+class TestPayment(TestCase):
+    """Tests for the payment model Payment."""
+
+    def test_payment_str(self) -> None:
+        """Test Payment.__str__()."""
+        payment = PaymentFactory.build(amount=Decimal("12.50"), reference="210000000003139471430009017")
+        self.assertEqual(str(payment), "12.50 CHF - 210000000003139471430009017")
+
+    def test_payment_without_reference_str(self) -> None:
+        """Test Payment.__str__() of a payment without a QR reference."""
+        payment = PaymentFactory.build(amount=Decimal("12.50"), bank_reference="ZKB-4711")
+        self.assertEqual(str(payment), "12.50 CHF - ZKB-4711")
@@ -0,0 +1,105 @@
+"""Tests for the bank_statement_import service."""
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from cycle_invoice.common.selectors import get_system_user
+from cycle_invoice.payment.models import Payment
+from cycle_invoice.payment.services import bank_statement_import
+from cycle_invoice.payment.tests.factories import PaymentFactory, camt_document, camt_entry, camt_transaction
+from cycle_invoice.sale.tests.factories import DocumentItemFactory, InvoiceFactory
+from cycle_invoice.sale.utils.swiss_qr import generate_qr_reference, invoice_qr_reference
+
+
+class TestBankStatementImport(TestCase):
+    """Tests for the bank_statement_import service."""
+
+    def setUp(self) -> None:
+        """Create two invoices of 100.00 each."""
+        self.user = get_system_user()
+        self.invoices = InvoiceFactory.create_batch(2)
+        for invoice in self.invoices:
+            DocumentItemFactory.create(document=invoice, party=invoice.party, price=Decimal("50.00"), quantity=2)
+        self.references = [invoice_qr_reference(invoice.uuid) for invoice in self.invoices]
+
+    def _import(self, *transactions: str) -> tuple:
+        """Import a bank file with one batch booking of the given transactions."""
+        bank_file = camt_document(camt_entry(*transactions))
+        statement = bank_statement_import(BytesIO(bank_file), file_name="camt054.xml", user=self.user)
+        return statement, list(statement.payments.order_by("bank_reference"))
+
+    def test_bank_statement_import(self) -> None:
+        """Payments are matched, partial or unmatched depending on their reference and amount."""
+        statement, payments = self._import(
+            camt_transaction(self.references[0], "100.00", bank_reference="1"),
+            camt_transaction(self.references[1], "60.00", bank_reference="2"),
+            camt_transaction(generate_qr_reference("42"), "10.00", bank_reference="3"),
+            camt_transaction("RF18539007547034", "10.00", bank_reference="4"),
+        )
+
+        self.assertEqual(statement.file_name, "camt054.xml")
+        self.assertEqual((statement.matched_count, statement.partial_count, statement.unmatched_count), (1, 1, 2))
+        self.assertEqual([(payment.invoice_id, payment.status) for payment in payments], [
+            (self.invoices[0].uuid, Payment.Status.MATCHED),
+            (self.invoices[1].uuid, Payment.Status.PARTIAL),
+            (None, Payment.Status.UNMATCHED),
+            (None, Payment.Status.UNMATCHED),
+        ])
+        self.assertEqual(payments[1].amount, Decimal("60.00"))
+        self.assertEqual(payments[1].created_by, self.user)
+        self.assertEqual(payments[1].history.count(), 1)
+
+    def test_bank_statement_import_settles_in_installments(self) -> None:
+        """Several payments of an invoice are reconciled in order, also across batches and bank files."""
+        PaymentFactory.create(invoice=self.invoices[0], status=Payment.Status.PARTIAL, amount=Decimal("30.00"))
+        PaymentFactory.create(invoice=self.invoices[0], status=Payment.Status.UNMATCHED, amount=Decimal("70.00"))
+
+        with patch("cycle_invoice.payment.services.RECONCILIATION_BATCH_SIZE", 1):
+            statement, payments = self._import(
+                camt_transaction(self.references[0], "40.00", bank_reference="1"),
+                camt_transaction(self.references[0], "30.00", bank_reference="2"),
+                camt_transaction(self.references[0], "5.00", bank_reference="3"),
+            )
+
+        self.assertEqual([payment.status for payment in payments],
+                         [Payment.Status.PARTIAL, Payment.Status.MATCHED, Payment.Status.MATCHED])
+        self.assertEqual((statement.matched_count, statement.partial_count, statement.unmatched_count), (2, 1, 0))
+
+    def test_bank_statement_import_empty(self) -> None:
+        """A bank file without incoming payments creates an empty statement."""
+        statement = bank_statement_import(BytesIO(camt_document()), file_name="camt054.xml", user=self.user)
+
+        self.assertFalse(statement.payments.exists())
+        self.assertEqual((statement.matched_count, statement.partial_count, statement.unmatched_count), (0, 0, 0))
+
+    def test_bank_statement_import_same_file_twice(self) -> None:
+        """A bank file imported again returns the statement of its first import without new payments."""
+        bank_file = camt_document(camt_entry(camt_transaction(self.references[0], "100.00", bank_reference="1")))
+        statement = bank_statement_import(BytesIO(bank_file), file_name="camt054.xml", user=self.user)
+
+        with self.assertNumQueries(3):
+            again = bank_statement_import(BytesIO(bank_file), file_name="camt054-copy.xml", user=self.user)
+
+        self.assertEqual(again, statement)
+        self.assertEqual(statement.message_id, "MSG-1")
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_bank_statement_import_skips_imported_payments(self) -> None:
+        """Payments already imported from another bank file or earlier in the file are skipped."""
+        PaymentFactory.create(invoice=self.invoices[0], status=Payment.Status.PARTIAL, amount=Decimal("40.00"),
+                              bank_reference="1")
+
+        with patch("cycle_invoice.payment.services.RECONCILIATION_BATCH_SIZE", 2):
+            statement, payments = self._import(
+                camt_transaction(self.references[0], "40.00", bank_reference="1"),
+                camt_transaction(self.references[0], "60.00", bank_reference="2"),
+                camt_transaction(self.references[0], "60.00", bank_reference="2"),
+                camt_transaction(self.references[1], "100.00", bank_reference="2"),
+                camt_transaction(generate_qr_reference("42"), "10.00"),
+            )
+
+        self.assertEqual([(payment.bank_reference, payment.status) for payment in payments],
+                         [("2", Payment.Status.MATCHED), ("ENTRY-REF/5", Payment.Status.UNMATCHED)])
+        self.assertEqual((statement.matched_count, statement.partial_count, statement.unmatched_count), (1, 0, 1))
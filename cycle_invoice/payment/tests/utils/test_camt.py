@@ -0,0 +1,132 @@
+"""Tests for the camt bank file parser."""
+import datetime
+from collections.abc import Iterator
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+from xml.etree.ElementTree import Element
+
+from defusedxml import EntitiesForbidden
+from defusedxml.ElementTree import iterparse
+from django.test import SimpleTestCase
+
+from cycle_invoice.payment.tests.factories import camt_document, camt_entry, camt_transaction
+from cycle_invoice.payment.utils.camt import CamtTransaction, camt_message_id, iter_camt_transactions
+
+REFERENCE = "210000000003139471430009017"
+
+
+class TestIterCamtTransactions(SimpleTestCase):
+    """Tests behavior of the streaming camt parser."""
+
+    def test_iter_camt_transactions(self) -> None:
+        """Every credit transaction of a batch booking is read with its QR reference."""
+        bank_file = camt_document(camt_entry(
+            camt_transaction(REFERENCE, "100.00", bank_reference="TX-1"),
+            camt_transaction("21 00000 00003 13947 14300 09017", "20.50"),
+            amount="120.50",
+        ))
+
+        transactions = list(iter_camt_transactions(BytesIO(bank_file)))
+
+        self.assertEqual(transactions, [
+            CamtTransaction(REFERENCE, Decimal("100.00"), "CHF", datetime.date(2026, 3, 2), "TX-1"),
+            CamtTransaction(REFERENCE, Decimal("20.50"), "CHF", datetime.date(2026, 3, 2), "ENTRY-REF/2"),
+        ])
+
+    def test_iter_camt_transactions_batch_without_references(self) -> None:
+        """Transactions of a batch booking without references of their own get the entry reference and position."""
+        bank_file = camt_document(camt_entry(
+            camt_transaction(REFERENCE, "10.00"),
+            camt_transaction(REFERENCE, "10.00"),
+        ))
+
+        transactions = list(iter_camt_transactions(BytesIO(bank_file)))
+
+        self.assertEqual([transaction.bank_reference for transaction in transactions], ["ENTRY-REF/1", "ENTRY-REF/2"])
+
+    def test_iter_camt_transactions_skips_debits(self) -> None:
+        """Debits, debit transactions and reversals are no incoming payments."""
+        bank_file = camt_document(
+            camt_entry(camt_transaction(REFERENCE, "10.00"), indicator="DBIT"),
+            camt_entry(camt_transaction(REFERENCE, "10.00", indicator="DBIT")),
+            camt_entry(camt_transaction(REFERENCE, "10.00"), extra="<RvslInd>true</RvslInd>"),
+        )
+
+        self.assertEqual(list(iter_camt_transactions(BytesIO(bank_file))), [])
+
+    def test_iter_camt_transactions_entry_amount(self) -> None:
+        """Entries without transaction details or amounts use the amount of the entry."""
+        without_amount = """
+        <TxDtls>
+            <RmtInf><Strd><CdtrRefInf><Ref>210000000003139471430009017</Ref></CdtrRefInf></Strd></RmtInf>
+        </TxDtls>"""
+        with_amount_details = """
+        <TxDtls><AmtDtls><TxAmt><Amt Ccy="EUR">7.00</Amt></TxAmt></AmtDtls></TxDtls>"""
+        bank_file = camt_document(
+            camt_entry(amount="30.00", booking_date="<DtTm>2026-03-03T10:00:00</DtTm>"),
+            camt_entry(without_amount, amount="40.00"),
+            camt_entry(with_amount_details, amount="7.00", booking_date=""),
+        )
+
+        transactions = list(iter_camt_transactions(BytesIO(bank_file)))
+
+        self.assertEqual(transactions, [
+            CamtTransaction("", Decimal("30.00"), "CHF", datetime.date(2026, 3, 3), "ENTRY-REF"),
+            CamtTransaction(REFERENCE, Decimal("40.00"), "CHF", datetime.date(2026, 3, 2), "ENTRY-REF"),
+            CamtTransaction("", Decimal("7.00"), "EUR", None, "ENTRY-REF"),
+        ])
+
+    def test_iter_camt_transactions_without_booking_date(self) -> None:
+        """Entries without a booking date are read without a date."""
+        bank_file = camt_document(camt_entry(amount="5.00").replace("<BookgDt><Dt>2026-03-02</Dt></BookgDt>", ""))
+
+        self.assertIsNone(next(iter_camt_transactions(BytesIO(bank_file))).booking_date)
+
+    def test_iter_camt_transactions_missing_amount(self) -> None:
+        """A transaction whose amount cannot be determined is an error."""
+        bank_file = camt_document(camt_entry("<TxDtls/>", "<TxDtls/>"))
+
+        with self.assertRaisesMessage(ValueError, "has no amount"):
+            list(iter_camt_transactions(BytesIO(bank_file)))
+
+    def test_iter_camt_transactions_detaches_entries(self) -> None:
+        """Entries are removed from the tree once read, so large files are parsed in constant memory."""
+        bank_file = camt_document(*(camt_entry(camt_transaction(REFERENCE, "1.00")) for _ in range(1000)))
+        parsers = []
+
+        def keep_parser(*args, **kwargs) -> Iterator[tuple[str, Element]]:
+            """Keep the parser to inspect the parsed tree."""
+            parsers.append(iterparse(*args, **kwargs))
+            return parsers[-1]
+
+        with patch("cycle_invoice.payment.utils.camt.iterparse", side_effect=keep_parser):
+            self.assertEqual(sum(1 for _ in iter_camt_transactions(BytesIO(bank_file))), 1000)
+
+        self.assertEqual(parsers[0].root.findall(".//{*}Ntry"), [])
+        self.assertIsNotNone(parsers[0].root.find(".//{*}Ntfctn/{*}Id"))
+
+    def test_iter_camt_transactions_forbids_entities(self) -> None:
+        """Bank files declaring entities are refused instead of expanded."""
+        bank_file = camt_document(camt_entry(amount="&amount;")).replace(
+            b"<Document", b'<!DOCTYPE Document [<!ENTITY amount "1.00">]>\n<Document', 1)
+
+        with self.assertRaises(EntitiesForbidden):
+            list(iter_camt_transactions(BytesIO(bank_file)))
+
+
+class TestCamtMessageId(SimpleTestCase):
+    """Tests behavior of camt_message_id."""
+
+    def test_camt_message_id(self) -> None:
+        """The message id is read from the group header and the file is rewound."""
+        bank_file = BytesIO(camt_document(camt_entry(amount="5.00")))
+
+        self.assertEqual(camt_message_id(bank_file), "MSG-1")
+        self.assertEqual(bank_file.tell(), 0)
+
+    def test_camt_message_id_missing(self) -> None:
+        """A bank file without a message id in its group header has none."""
+        bank_file = camt_document().replace(b"<MsgId>MSG-1</MsgId>", b"<CreDtTm>2026-03-02T10:00:00</CreDtTm>")
+
+        self.assertEqual(camt_message_id(BytesIO(bank_file)), "")
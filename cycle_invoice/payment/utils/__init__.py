@@ -0,0 +1 @@
+"""Utilities for the payment app."""
@@ -0,0 +1,124 @@
+"""
+Streaming parser for ISO 20022 camt.053 and camt.054 bank files.
+
+The file is read with the `iterparse` of defusedxml, which refuses entity declarations, and every
+booking entry (`Ntry`) is detached from the tree as soon as its transactions were read, so memory
+stays constant however many entries a bank file contains.
+Any version of the camt.053 and camt.054 namespaces is accepted.
+"""
+import datetime
+from collections.abc import Iterator
+from dataclasses import dataclass
+from decimal import Decimal
+from os import PathLike
+from typing import IO
+from xml.etree.ElementTree import Element
+
+from defusedxml.ElementTree import iterparse
+
+# Credit/debit indicator of incoming payments
+CREDIT = "CRDT"
+
+
+@dataclass(frozen=True)
+class CamtTransaction:
+    """Incoming payment read from a bank file."""
+
+    reference: str
+    amount: Decimal
+    currency: str
+    booking_date: datetime.date | None
+    bank_reference: str
+
+
+def iter_camt_transactions(source: str | PathLike | IO[bytes]) -> Iterator[CamtTransaction]:
+    """
+    Stream the incoming payments of a camt.053 or camt.054 bank file.
+
+    Debits and reversals are skipped. Batch bookings yield one payment per transaction.
+
+    :param source: Path or binary file of the bank file
+    :return: An iterator over the incoming payments in the order of the file
+    """
+    parents: list[Element] = []
+    for event, element in iterparse(source, events=("start", "end")):
+        if event == "start":
+            parents.append(element)
+            continue
+        parents.pop()
+        if _local_name(element.tag) == "Ntry":
+            yield from _entry_transactions(element)
+            parents[-1].remove(element)
+
+
+def camt_message_id(source: str | PathLike | IO[bytes]) -> str:
+    """
+    Read the message id of a camt.053 or camt.054 bank file from its group header.
+
+    Only the file up to the group header is read, and a file object is rewound afterwards.
+
+    :param source: Path or binary file of the bank file
+    :return: The message id, or an empty string if the file has none
+    """
+    message_id = ""
+    for _, element in iterparse(source):
+        if _local_name(element.tag) == "MsgId":
+            message_id = (element.text or "").strip()
+            break
+        if _local_name(element.tag) == "GrpHdr":
+            break
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return message_id
+
+
+def _entry_transactions(entry: Element) -> Iterator[CamtTransaction]:
+    """Read the incoming payments of a booking entry."""
+    if entry.findtext("{*}CdtDbtInd") != CREDIT or entry.findtext("{*}RvslInd") == "true":
+        return
+
+    booking_date = _date(entry.find("{*}BookgDt"))
+    entry_reference = entry.findtext("{*}AcctSvcrRef", "")
+    details = entry.findall("{*}NtryDtls/{*}TxDtls")
+    if not details:
+        yield _transaction(entry.find("{*}Amt"), "", booking_date, entry_reference)
+        return
+
+    for position, detail in enumerate(details, start=1):
+        if detail.findtext("{*}CdtDbtInd", CREDIT) != CREDIT:
+            continue
+        amount = detail.find("{*}Amt")
+        if amount is None:
+            amount = detail.find("{*}AmtDtls/{*}TxAmt/{*}Amt")
+        if amount is None and len(details) == 1:
+            amount = entry.find("{*}Amt")
+        reference = detail.findtext("{*}RmtInf/{*}Strd/{*}CdtrRefInf/{*}Ref", "")
+        # Transactions of a batch booking without references of their own are told apart by their position
+        bank_reference = detail.findtext("{*}Refs/{*}AcctSvcrRef") or entry_reference
+        if bank_reference == entry_reference and entry_reference and len(details) > 1:
+            bank_reference = f"{entry_reference}/{position}"
+        yield _transaction(amount, reference, booking_date, bank_reference)
+
+
+def _transaction(amount: Element | None, reference: str, booking_date: datetime.date | None,
+                 bank_reference: str) -> CamtTransaction:
+    """Build a payment from its amount element and references."""
+    if amount is None or not amount.text:
+        error_message = f"Bank file entry {bank_reference or reference!r} has no amount."
+        raise ValueError(error_message)
+    return CamtTransaction(reference=reference.replace(" ", ""), amount=Decimal(amount.text.strip()),
+                           currency=amount.get("Ccy", ""), booking_date=booking_date,
+                           bank_reference=bank_reference)
+
+
+def _date(date_element: Element | None) -> datetime.date | None:
+    """Read a date given either as `Dt` or as `DtTm`."""
+    if date_element is None:
+        return None
+    date = date_element.findtext("{*}Dt") or date_element.findtext("{*}DtTm", "")[:10]
+    return datetime.date.fromisoformat(date) if date else None
+
+
+def _local_name(tag: str) -> str:
+    """Return the tag name without its namespace."""
+    return tag.rpartition("}")[2]
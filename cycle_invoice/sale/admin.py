@@ -1,12 +1,47 @@
 """A module for sale admin."""
 
 from django.contrib import admin
-from simple_history.admin import SimpleHistoryAdmin
+from django.db import models
+from django.http import HttpRequest
+from django.utils.translation import gettext_lazy as _
 
+from cycle_invoice.common.models import BaseModelAdmin
 from cycle_invoice.sale.models import (
     DocumentItem,
     Invoice,
 )
 
-admin.site.register(Invoice, SimpleHistoryAdmin)
-admin.site.register(DocumentItem, SimpleHistoryAdmin)
+
+@admin.register(Invoice)
+class InvoiceAdmin(BaseModelAdmin):
+    """Admin for invoices, searchable by document number and QR reference."""
+
+    list_display = ("document_number", "party_name", "date", "total", "qr_reference")
+    # The party is joined with its concrete types, which have the names
+    list_select_related = ("party__organization", "party__contact")
+    # Exact matches, so the searches use the unique indexes
+    search_fields = ("=document_number", "=qr_reference")
+    readonly_fields = (*BaseModelAdmin.readonly_fields, "total", "item_count", "qr_reference")
+
+    @admin.display(description=_("party"))
+    def party_name(self, obj: Invoice) -> str:
+        """Return the name of the party of the invoice from its joined organization or contact."""
+        party = obj.party
+        return str(getattr(party, "organization", None) or getattr(party, "contact", None) or party)
+
+
+@admin.register(DocumentItem)
+class DocumentItemAdmin(BaseModelAdmin):
+    """Admin for document items, listed without resolving the item types."""
+
+    list_display = ("title", "document__document_number", "price", "quantity", "discount_value", "discount_type")
+    list_select_related = ("document",)
+
+    def get_queryset(self, request: HttpRequest) -> models.QuerySet:
+        """Return the items as rows of `DocumentItem`, so a page of items of any type takes one query."""
+        return super().get_queryset(request).non_polymorphic()
+
+    def get_object(self, request: HttpRequest, object_id: str, from_field: str | None = None) -> DocumentItem | None:
+        """Return the item cast to its actual type, so it is edited and recorded in the history of its type."""
+        item = super().get_object(request, object_id, from_field)
+        return item.get_real_instance() if item is not None else None
@@ -0,0 +1,21 @@
+"""Command to store the QR reference of existing invoices."""
+from django.core.management import CommandParser
+from django.core.management.base import BaseCommand
+
+from cycle_invoice.sale.services.invoice import QR_REFERENCE_BACKFILL_BATCH_SIZE, invoice_qr_reference_backfill
+
+
+class Command(BaseCommand):
+    """Command to store the QR reference of existing invoices."""
+
+    help = "Store the QR reference of all invoices that do not have one yet, in batches"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Add custom arguments to the command."""
+        parser.add_argument("--batch-size", type=int, default=QR_REFERENCE_BACKFILL_BATCH_SIZE,
+                            help="Number of invoices updated per transaction")
+
+    def handle(self, *args, **options) -> None:
+        """Backfill the QR references and report the number of updated invoices."""
+        backfilled = invoice_qr_reference_backfill(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Stored the QR reference of {backfilled} invoices"))
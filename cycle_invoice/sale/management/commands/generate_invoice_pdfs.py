@@ -0,0 +1,43 @@
+"""Command to generate the PDFs of many invoices in parallel."""
+import datetime
+
+from django.core.management import CommandError, CommandParser
+from django.core.management.base import BaseCommand
+
+from cycle_invoice.sale.models import Invoice
+from cycle_invoice.sale.utils.invoice_pdf_batch import generate_invoice_pdfs
+
+
+class Command(BaseCommand):
+    """Command to generate the PDFs of many invoices in parallel."""
+
+    help = "Generate the PDFs of the given invoices across a pool of worker processes"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Add custom arguments to the command."""
+        parser.add_argument("invoice_ids", nargs="*", type=str, help="IDs of the invoices to generate")
+        parser.add_argument("--since", type=datetime.date.fromisoformat,
+                            help="Generate all invoices dated on or after this date (YYYY-MM-DD)")
+        parser.add_argument("--workers", type=int, help="Number of worker processes")
+        parser.add_argument("--force", action="store_true", help="Render the PDFs even if they are up to date")
+
+    def handle(self, *args, **options) -> None:
+        """Generate the PDFs and report the failed invoices."""
+        invoice_ids = list(options["invoice_ids"])
+        if options["since"] is not None:
+            invoice_ids += [
+                str(pk) for pk in Invoice.objects.filter(date__gte=options["since"]).values_list("pk", flat=True)
+            ]
+        if not invoice_ids:
+            error_message = "Pass invoice IDs or --since to select the invoices to generate"
+            raise CommandError(error_message)
+
+        result = generate_invoice_pdfs(invoice_ids, workers=options["workers"], force=options["force"])
+
+        for invoice_id, error in result.failed.items():
+            self.stdout.write(self.style.ERROR(f"Invoice {invoice_id}: {error}"))
+        summary = (f"Generated {len(result.generated)} of {len(invoice_ids)} invoice PDFs, "
+                   f"{len(result.unchanged)} of them were up to date")
+        if not result.ok:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
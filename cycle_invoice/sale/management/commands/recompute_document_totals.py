@@ -0,0 +1,21 @@
+"""Command to recompute the stored totals of documents."""
+from django.core.management import CommandParser
+from django.core.management.base import BaseCommand
+
+from cycle_invoice.sale.services.document import document_totals_recompute
+
+
+class Command(BaseCommand):
+    """Command to recompute the stored totals of documents."""
+
+    help = "Recompute the stored totals and item counts of documents from their items"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Add custom arguments to the command."""
+        parser.add_argument("document_ids", nargs="*", type=str,
+                            help="IDs of the documents to repair, all documents if omitted")
+
+    def handle(self, *args, **options) -> None:
+        """Recompute the totals and report the number of updated documents."""
+        updated = document_totals_recompute(options["document_ids"] or None)
+        self.stdout.write(self.style.SUCCESS(f"Recomputed the totals of {updated} documents"))
@@ -0,0 +1,53 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalinvoice',
+            name='pdf_error',
+            field=models.TextField(blank=True, default='', verbose_name='PDF error'),
+        ),
+        migrations.AddField(
+            model_name='historicalinvoice',
+            name='pdf_file',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='PDF file'),
+        ),
+        migrations.AddField(
+            model_name='historicalinvoice',
+            name='pdf_status',
+            field=models.CharField(choices=[('NONE', 'None'), ('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='NONE', max_length=10, verbose_name='PDF status'),
+        ),
+        migrations.AddField(
+            model_name='historicalinvoice',
+            name='pdf_task_id',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='PDF task ID'),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='pdf_error',
+            field=models.TextField(blank=True, default='', verbose_name='PDF error'),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='pdf_file',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='PDF file'),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='pdf_status',
+            field=models.CharField(choices=[('NONE', 'None'), ('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='NONE', max_length=10, verbose_name='PDF status'),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='pdf_task_id',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='PDF task ID'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0002_invoice_pdf_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalinvoice',
+            name='pdf_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='PDF fingerprint'),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='pdf_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64, verbose_name='PDF fingerprint'),
+        ),
+    ]
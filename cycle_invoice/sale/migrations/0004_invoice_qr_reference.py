@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0003_invoice_pdf_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalinvoice',
+            name='qr_reference',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=27, null=True, verbose_name='QR reference'),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='qr_reference',
+            field=models.CharField(blank=True, editable=False, max_length=27, null=True, unique=True, verbose_name='QR reference'),
+        ),
+    ]
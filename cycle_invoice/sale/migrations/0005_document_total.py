@@ -0,0 +1,43 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0004_invoice_qr_reference'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='item count'),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='total'),
+        ),
+        migrations.AddField(
+            model_name='historicaldocument',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='item count'),
+        ),
+        migrations.AddField(
+            model_name='historicaldocument',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='total'),
+        ),
+        migrations.AddField(
+            model_name='historicalinvoice',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='item count'),
+        ),
+        migrations.AddField(
+            model_name='historicalinvoice',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='total'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:52
+
+import django.db.models.deletion
+import django.db.models.manager
+import simple_history.models
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0005_document_total'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoricalDocumentNumberCounter',
+            fields=[
+                ('uuid', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, verbose_name='UUID')),
+                ('created_at', models.DateTimeField(blank=True, editable=False, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(blank=True, editable=False, verbose_name='updated at')),
+                ('soft_deleted', models.BooleanField(db_index=True, default=False, verbose_name='soft deleted')),
+                ('sequence', models.CharField(max_length=50, verbose_name='sequence')),
+                ('year', models.PositiveSmallIntegerField(help_text='0 for sequences that are not restarted every year.', verbose_name='year')),
+                ('last_number', models.PositiveBigIntegerField(default=0, verbose_name='last number')),
+                ('history_id', models.AutoField(primary_key=True, serialize=False)),
+                ('history_date', models.DateTimeField(db_index=True)),
+                ('history_change_reason', models.CharField(max_length=100, null=True)),
+                ('history_type', models.CharField(choices=[('+', 'Created'), ('~', 'Changed'), ('-', 'Deleted')], max_length=1)),
+                ('created_by', models.ForeignKey(blank=True, db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('history_user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('updated_by', models.ForeignKey(blank=True, db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'historical document number counter',
+                'verbose_name_plural': 'historical document number counters',
+                'ordering': ('-history_date', '-history_id'),
+                'get_latest_by': ('history_date', 'history_id'),
+            },
+            bases=(simple_history.models.HistoricalChanges, models.Model),
+        ),
+        migrations.CreateModel(
+            name='DocumentNumberCounter',
+            fields=[
+                ('uuid', models.UUIDField(db_index=True, default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True, verbose_name='UUID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+                ('soft_deleted', models.BooleanField(db_index=True, default=False, verbose_name='soft deleted')),
+                ('sequence', models.CharField(max_length=50, verbose_name='sequence')),
+                ('year', models.PositiveSmallIntegerField(help_text='0 for sequences that are not restarted every year.', verbose_name='year')),
+                ('last_number', models.PositiveBigIntegerField(default=0, verbose_name='last number')),
+                ('created_by', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_created_by', to=settings.AUTH_USER_MODEL)),
+                ('updated_by', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_updated_by', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('sequence', 'year'), name='unique_document_number_counter')],
+            },
+            managers=[
+                ('objects_with_deleted', django.db.models.manager.Manager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Case, Count, ExpressionWrapper, F, OuterRef, Subquery, Sum, When
+from django.db.models.functions import Abs, Cast, Coalesce, Round
+from django.db.models.lookups import GreaterThan, LessThan
+
+# The expressions below are frozen copies of `line_total_cents` and `amount_from_cents` in
+# `cycle_invoice.sale.models` at the time of this migration, so later changes to them leave it alone.
+
+
+def _cents(field_name):
+    """Return a decimal field with two decimal places as integer cents."""
+    return Cast(Round(F(field_name) * 100), models.BigIntegerField())
+
+
+def _divide_half_even(dividend, divisor):
+    """Divide an integer expression by a positive integer, rounding ties to even."""
+    dividend = ExpressionWrapper(dividend, output_field=models.BigIntegerField())
+    quotient = ExpressionWrapper(dividend / divisor, output_field=models.BigIntegerField())
+    remainder = dividend - quotient * divisor
+    is_odd = Abs(quotient - quotient / 2 * 2)
+    return Case(
+        When(GreaterThan(Abs(remainder) * 2 + is_odd, divisor),
+             then=Case(When(LessThan(dividend, 0), then=quotient - 1), default=quotient + 1)),
+        default=quotient,
+        output_field=models.BigIntegerField(),
+    )
+
+
+def _line_total_cents():
+    """Return a database expression for the total of a document item in cents."""
+    price, quantity, discount_value = (_cents(field) for field in ("price", "quantity", "discount_value"))
+    return Case(
+        When(discount_type="absolute", then=_divide_half_even(price * quantity - discount_value * 100, 100)),
+        default=_divide_half_even(price * quantity * (10000 - discount_value), 1000000),
+        output_field=models.BigIntegerField(),
+    )
+
+
+def _amount_from_cents(cents):
+    """Return a database expression converting integer cents to an amount with two decimal places."""
+    return ExpressionWrapper(cents * Decimal("0.01"), output_field=models.DecimalField(max_digits=14, decimal_places=2))
+
+
+def fill_document_totals(apps, schema_editor):
+    """Fill in the stored totals of the existing documents with the same UPDATE as `document_totals_recompute`."""
+    Document = apps.get_model("sale", "Document")
+    DocumentItem = apps.get_model("sale", "DocumentItem")
+
+    items = (DocumentItem._default_manager.using(schema_editor.connection.alias)
+             .filter(document=OuterRef("pk"), soft_deleted=False).order_by().values("document"))
+    total_cents = Subquery(items.annotate(total_cents=Sum(_line_total_cents())).values("total_cents"))
+    item_count = Subquery(items.annotate(item_count=Count("pk")).values("item_count"))
+    Document._default_manager.using(schema_editor.connection.alias).update(
+        total=_amount_from_cents(Coalesce(total_cents, 0)),
+        item_count=Coalesce(item_count, 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sale', '0006_document_number_counter'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_document_totals, migrations.RunPython.noop),
+    ]
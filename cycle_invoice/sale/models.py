@@ -1,16 +1,47 @@
 """A module for sale models."""
 
+from collections import defaultdict
+from collections.abc import Iterable
 from decimal import Decimal
+from itertools import batched
+from typing import TYPE_CHECKING
+from uuid import UUID
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.expressions import Combinable
+from django.db.models.functions import Abs, Cast, Coalesce, Round
+from django.db.models.lookups import GreaterThan, LessThan
 from django.utils.translation import gettext_lazy as _
 
-from cycle_invoice.common.models import BaseModel, BasePolymorphicModel, DiscountType
+from cycle_invoice.common.models import AUDITED_BULK_BATCH_SIZE, BaseModel, BasePolymorphicModel, DiscountType
+
+if TYPE_CHECKING:
+    from cycle_invoice.common.models import User
+
+# Fields of Document that are maintained by its items and never written by saving the document
+DOCUMENT_TOTAL_FIELDS = ("total", "item_count")
+# Fields of DocumentItem that its share in the totals of its document is computed from
+DOCUMENT_ITEM_SHARE_FIELDS = ("document_id", "price", "quantity", "discount_value", "discount_type", "soft_deleted")
 
 
 class Document(BaseModel):
     """Model representing a document."""
 
+    class DocumentQuerySet(BaseModel.ActiveQuerySet):
+        """Custom QuerySet to compute the totals of documents in the database."""
+
+        def with_invoice_total(self) -> models.QuerySet:
+            """Annotate the sum of the totals of the active items as `invoice_total`, computed from the items."""
+            return self.annotate(invoice_total=amount_from_cents(document_total_cents()))
+
+    class DocumentManager(BaseModel.ActiveManager.from_queryset(DocumentQuerySet)):
+        """Custom Manager to return active records with the totals queryset methods."""
+
+    # Redeclared in the order of BaseModel, which keeps `objects_with_deleted` the default manager
+    objects_with_deleted = models.Manager()
+    objects = DocumentManager()
+
     party = models.ForeignKey(
         "party.Party",
         on_delete=models.CASCADE,
@@ -32,18 +63,129 @@ class Document(BaseModel):
         verbose_name=_("footer text"),
         blank=True
     )
+    total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        verbose_name=_("total"),
+        default=0,
+        editable=False
+    )
+    item_count = models.PositiveIntegerField(
+        verbose_name=_("item count"),
+        default=0,
+        editable=False
+    )
 
     def __str__(self) -> str:
         """Return a string representation of the DocumentInvoice."""
         return f"{self.document_number} - {self.party}"
 
+    def save_base(self, *args, update_fields: list[str] | None = None, **kwargs) -> None:
+        """
+        Override save_base to leave the stored totals to the document items.
+
+        The totals are changed with relative updates whenever an item is saved, so an update of the
+        document itself must not write back the totals it loaded earlier. Saves, soft deletes and
+        recoveries all end up here.
+        """
+        if update_fields is None and not self._state.adding:
+            update_fields = [field.name for field in self._meta.concrete_fields
+                             if not field.primary_key and field.name not in DOCUMENT_TOTAL_FIELDS]
+        super().save_base(*args, update_fields=update_fields, **kwargs)
+
 
 class Invoice(Document):
     """Model representing an invoice."""
 
+    class InvoiceManager(Document.DocumentManager):
+        """Custom Manager to return active records, with audited bulk operations that fill in the QR references."""
+
+        bulk_maintains_save = True
+
+        def bulk_create_audited(self, objs: Iterable["Invoice"], user: "User", *,
+                                batch_size: int = AUDITED_BULK_BATCH_SIZE) -> list["Invoice"]:
+            """Insert many new invoices like `bulk_create_audited` of all models, with their QR references."""
+            objs = list(objs)
+            for invoice in objs:
+                invoice.fill_qr_reference()
+            return super().bulk_create_audited(objs, user, batch_size=batch_size)
+
+        def bulk_update_audited(self, objs: Iterable["Invoice"], fields: list[str], user: "User", *,
+                                batch_size: int = AUDITED_BULK_BATCH_SIZE) -> int:
+            """Update fields of many invoices like `bulk_update_audited` of all models, filling in QR references."""
+            objs = list(objs)
+            filled = [invoice.fill_qr_reference() for invoice in objs]
+            if any(filled):
+                fields = [*fields, "qr_reference"]
+            return super().bulk_update_audited(objs, fields, user, batch_size=batch_size)
+
+        def _bulk_insert(self, objs: list["Invoice"], batch_size: int) -> list["Invoice"]:
+            """
+            Insert the rows of the documents, then the rows of the invoices.
+
+            Django cannot bulk create multi-table inherited models. The document rows are inserted
+            with `bulk_create` and the invoice rows with `_insert`, which `bulk_create` uses itself.
+            """
+            for invoice in objs:
+                invoice.document_ptr_id = invoice.uuid
+            Document.objects_with_deleted.bulk_create(objs, batch_size=batch_size)
+            for batch in batched(objs, batch_size):
+                self._insert(batch, fields=self.model._meta.local_concrete_fields, using=self.db)  # noqa: SLF001
+            return objs
+
+    # Redeclared in the order of BaseModel, which keeps `objects_with_deleted` the default manager
+    objects_with_deleted = models.Manager()
+    objects = InvoiceManager()
+
+    class PDFStatus(models.TextChoices):
+        """Status choices for the PDF generation of an invoice."""
+
+        NONE = "NONE", "None"
+        PENDING = "PENDING", "Pending"
+        RUNNING = "RUNNING", "Running"
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed"
+
     due_date = models.DateField(
         verbose_name=_("due date")
     )
+    pdf_status = models.CharField(
+        verbose_name=_("PDF status"),
+        max_length=10,
+        choices=PDFStatus.choices,
+        default=PDFStatus.NONE,
+    )
+    pdf_file = models.CharField(
+        verbose_name=_("PDF file"),
+        max_length=255,
+        blank=True,
+        default=""
+    )
+    pdf_fingerprint = models.CharField(
+        verbose_name=_("PDF fingerprint"),
+        max_length=64,
+        blank=True,
+        default=""
+    )
+    pdf_task_id = models.CharField(
+        verbose_name=_("PDF task ID"),
+        max_length=255,
+        blank=True,
+        default=""
+    )
+    pdf_error = models.TextField(
+        verbose_name=_("PDF error"),
+        blank=True,
+        default=""
+    )
+    qr_reference = models.CharField(
+        verbose_name=_("QR reference"),
+        max_length=27,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False
+    )
 
     class Meta:
         """Meta-options for the Invoice model."""
@@ -51,15 +193,66 @@ class Invoice(Document):
         verbose_name = "Invoice"
         verbose_name_plural = "Invoices"
 
+    def save(self, *args, **kwargs) -> None:
+        """Override save method to fill in the QR reference of new invoices."""
+        self.fill_qr_reference()
+        super().save(*args, **kwargs)
+
+    def fill_qr_reference(self) -> bool:
+        """Fill in the QR reference derived from the UUID if it is missing, return whether it was."""
+        from cycle_invoice.sale.utils.swiss_qr import invoice_qr_reference  # noqa: PLC0415 (to avoid circular import)
+
+        if self.qr_reference:
+            return False
+        self.qr_reference = invoice_qr_reference(self.uuid)
+        return True
+
     @property
     def total_sum(self) -> Decimal:
-        """The sum of the totals of all DocumentItems belonging to this invoice."""
-        return sum((item.total for item in self.document_item.all()), start=Decimal(0))
+        """The sum of the totals of all DocumentItems belonging to this invoice, as stored on the invoice."""
+        return self.total
 
 
 class DocumentItem(BasePolymorphicModel):
     """Model representing a document item."""
 
+    class DocumentItemQuerySet(BasePolymorphicModel.PolymorphicActiveQuerySet):
+        """Custom Polymorphic QuerySet to compute the totals of document items in the database."""
+
+        def with_line_total(self) -> models.QuerySet:
+            """Annotate the total of every item as `line_total`, equal to `DocumentItem.total`."""
+            return self.annotate(line_total=amount_from_cents(line_total_cents()))
+
+    class DocumentItemManager(BasePolymorphicModel.PolymorphicActiveManager.from_queryset(DocumentItemQuerySet)):
+        """Custom Manager to return active records with the totals queryset methods."""
+
+        bulk_maintains_save = True
+
+        def bulk_create_audited(self, objs: Iterable["DocumentItem"], user: "User", *,
+                                batch_size: int = AUDITED_BULK_BATCH_SIZE) -> list["DocumentItem"]:
+            """Insert many new items like `bulk_create_audited` of all models, adding them to the document totals."""
+            with transaction.atomic():
+                objs = super().bulk_create_audited(objs, user, batch_size=batch_size)
+                document_totals_update([(None, item._document_share()) for item in objs])  # noqa: SLF001
+            for item in objs:
+                item._db_document_share = item._document_share()  # noqa: SLF001
+            return objs
+
+        def bulk_update_audited(self, objs: Iterable["DocumentItem"], fields: list[str], user: "User", *,
+                                batch_size: int = AUDITED_BULK_BATCH_SIZE) -> int:
+            """Update fields of many items like `bulk_update_audited` of all models, moving their document totals."""
+            objs = list(objs)
+            stored_shares = [item._stored_document_share() for item in objs]  # noqa: SLF001
+            with transaction.atomic():
+                updated = super().bulk_update_audited(objs, fields, user, batch_size=batch_size)
+                document_totals_update([(stored_share, item._document_share())  # noqa: SLF001
+                                        for stored_share, item in zip(stored_shares, objs, strict=True)])
+            for item in objs:
+                item._db_document_share = item._document_share()  # noqa: SLF001
+            return updated
+
+    objects = DocumentItemManager()
+
     price = models.DecimalField(
         max_digits=14,
         decimal_places=2,
@@ -127,21 +320,79 @@ class DocumentItem(BasePolymorphicModel):
     @property
     def total(self) -> Decimal:
         """Return the total price considering discount."""
-        price = Decimal(str(self.price))
-        quantity = Decimal(str(self.quantity))
-        discount_value = Decimal(str(self.discount_value))
-
-        if self.discount_type == DiscountType.ABSOLUTE:
-            total = price * quantity - discount_value
-        else:
-            total = price * quantity * (Decimal(1) - discount_value / Decimal(100))
-        return round(total, 2)
+        return line_total(self.price, self.quantity, self.discount_value, self.discount_type)
 
     @property
     def total_str(self) -> str:
         """Return the total price as a string."""
         return f"{self.total:.2f}"
 
+    # Share of the item in the totals of its document as loaded or last written, see `_stored_document_share`
+    _db_document_share: tuple[UUID, Decimal] | None = None
+
+    def save(self, *args, **kwargs) -> None:
+        """Override save method to keep the totals of the documents up to date."""
+        with transaction.atomic():
+            stored_share = self._stored_document_share()
+            super().save(*args, **kwargs)
+            self._update_document_totals(stored_share, self._document_share())
+
+    def delete(self, *args, **kwargs) -> None:
+        """Override delete method to remove the item from the totals of its document."""
+        with transaction.atomic():
+            stored_share = self._stored_document_share()
+            super().delete(*args, **kwargs)
+            self._update_document_totals(stored_share, None)
+
+    def recover(self, user: "User") -> None:
+        """Override recover method to add the item back to the totals of its document."""
+        with transaction.atomic():
+            stored_share = self._stored_document_share()
+            super().recover(user)
+            self._update_document_totals(stored_share, self._document_share())
+
+    @classmethod
+    def from_db(cls, db: str | None, field_names: list[str], values: list) -> "DocumentItem":
+        """Override from_db to remember the share of the item in the totals of its document."""
+        instance = super().from_db(db, field_names, values)
+        if all(field in instance.__dict__ for field in DOCUMENT_ITEM_SHARE_FIELDS):
+            instance._db_document_share = instance._document_share()  # noqa: SLF001
+        return instance
+
+    def _document_share(self) -> tuple[UUID, Decimal] | None:
+        """Return the document this item counts towards with its total, None if it counts towards none."""
+        if self.document_id is None or self.soft_deleted:
+            return None
+        return self.document_id, self.total
+
+    def _stored_document_share(self) -> tuple[UUID, Decimal] | None:
+        """
+        Return the share of the item as stored in the database.
+
+        The share is remembered when the item is loaded and written, so no query is needed. Only items
+        loaded with deferred fields read it from the database.
+        """
+        if self._state.adding:
+            return None
+        if "_db_document_share" in self.__dict__:
+            return self._db_document_share
+        stored = (DocumentItem.objects_with_deleted.filter(pk=self.pk)
+                  .values_list(*DOCUMENT_ITEM_SHARE_FIELDS).first())
+        if stored is None or stored[0] is None or stored[5]:
+            return None
+        return stored[0], line_total(*stored[1:5])
+
+    def _update_document_totals(self, stored_share: tuple[UUID, Decimal] | None,
+                                share: tuple[UUID, Decimal] | None) -> None:
+        """Move the item from the totals of its stored document to the totals of its current document."""
+        self._db_document_share = share
+        changes = document_totals_update([(stored_share, share)])
+        # A document cached on the item is updated in memory as well
+        if DocumentItem.document.is_cached(self) and self.document_id in changes:
+            total, item_count = changes[self.document_id]
+            self.document.total += total
+            self.document.item_count += item_count
+
     @property
     def discount_str(self) -> str:
         """Return the discount percentage as a string."""
@@ -149,3 +400,132 @@ class DocumentItem(BasePolymorphicModel):
         if self.discount_type == DiscountType.ABSOLUTE:
             return f"-{discount_value:.2f}" if discount_value != 0 else ""
         return f"{(100 * discount_value):.2f}%" if discount_value != 0 else ""
+
+
+class DocumentNumberCounter(BaseModel):
+    """Model representing the last allocated number of a document number sequence in a year."""
+
+    sequence = models.CharField(
+        max_length=50,
+        verbose_name=_("sequence")
+    )
+    year = models.PositiveSmallIntegerField(
+        verbose_name=_("year"),
+        help_text=_("0 for sequences that are not restarted every year.")
+    )
+    last_number = models.PositiveBigIntegerField(
+        verbose_name=_("last number"),
+        default=0
+    )
+
+    class Meta:
+        """Meta-options for the DocumentNumberCounter model."""
+
+        constraints = [models.UniqueConstraint(fields=["sequence", "year"], name="unique_document_number_counter")]
+
+    def __str__(self) -> str:
+        """Return a string representation of the DocumentNumberCounter."""
+        return f"{self.sequence} {self.year}: {self.last_number}"
+
+
+def document_totals_update(moves: Iterable[tuple[tuple[UUID, Decimal] | None, tuple[UUID, Decimal] | None]]) \
+        -> dict[UUID, tuple[Decimal, int]]:
+    """
+    Move items from the stored totals of one document to those of another.
+
+    The totals are changed with a single relative update, so concurrent changes to other items of
+    the same documents are not lost.
+
+    :param moves: The share of every item in the totals of a document before and after, None for no document
+    :return: The changes of the total and item count of every changed document
+    """
+    changes: dict[UUID, tuple[Decimal, int]] = defaultdict(lambda: (Decimal(0), 0))
+    for stored_share, share in moves:
+        if stored_share == share:
+            continue
+        if stored_share is not None:
+            total, item_count = changes[stored_share[0]]
+            changes[stored_share[0]] = (total - stored_share[1], item_count - 1)
+        if share is not None:
+            total, item_count = changes[share[0]]
+            changes[share[0]] = (total + share[1], item_count + 1)
+
+    if changes:
+        Document.objects_with_deleted.filter(pk__in=changes).update(
+            total=F("total") + Case(*(When(pk=pk, then=Value(total)) for pk, (total, _) in changes.items()),
+                                    output_field=models.DecimalField(max_digits=14, decimal_places=2)),
+            item_count=F("item_count") + Case(*(When(pk=pk, then=Value(item_count))
+                                                for pk, (_, item_count) in changes.items()),
+                                              output_field=models.IntegerField()),
+        )
+    return dict(changes)
+
+
+def line_total(price: Decimal | float, quantity: Decimal | float, discount_value: Decimal | float,
+               discount_type: str) -> Decimal:
+    """
+    Return the total of a document item considering its discount.
+
+    The total is rounded to two decimal places, ties to even. `line_total_cents` computes the same
+    in the database.
+    """
+    price = Decimal(str(price))
+    quantity = Decimal(str(quantity))
+    discount_value = Decimal(str(discount_value))
+
+    if discount_type == DiscountType.ABSOLUTE:
+        total = price * quantity - discount_value
+    else:
+        total = price * quantity * (Decimal(1) - discount_value / Decimal(100))
+    return round(total, 2)
+
+
+def line_total_cents() -> Case:
+    """
+    Return a database expression for the total of a document item in cents.
+
+    It computes the same as `line_total` with integer arithmetic only, so the results are exact on
+    every database backend and can be summed without rounding errors, as long as price times
+    quantity stays below 92 billion.
+    """
+    price, quantity, discount_value = (_cents(field) for field in ("price", "quantity", "discount_value"))
+    return Case(
+        # Price and quantity in cents give ten thousandths, less the discount value scaled to them
+        When(discount_type=DiscountType.ABSOLUTE,
+             then=_divide_half_even(price * quantity - discount_value * 100, 100)),
+        # A percentage in cents gives another factor of ten thousand
+        default=_divide_half_even(price * quantity * (10000 - discount_value), 1000000),
+        output_field=models.BigIntegerField(),
+    )
+
+
+def document_total_cents() -> Coalesce:
+    """Return a database expression for the sum of the active items of a document in cents."""
+    items = DocumentItem.objects.non_polymorphic().filter(document=OuterRef("pk")).order_by().values("document")
+    return Coalesce(Subquery(items.annotate(total_cents=Sum(line_total_cents())).values("total_cents")), 0)
+
+
+def amount_from_cents(cents: Combinable) -> ExpressionWrapper:
+    """Return a database expression converting integer cents to an amount with two decimal places."""
+    return ExpressionWrapper(cents * Decimal("0.01"), output_field=models.DecimalField(max_digits=14, decimal_places=2))
+
+
+def _cents(field_name: str) -> Cast:
+    """Return a decimal field with two decimal places as integer cents."""
+    return Cast(Round(F(field_name) * 100), models.BigIntegerField())
+
+
+def _divide_half_even(dividend: Combinable, divisor: int) -> Case:
+    """Divide an integer expression by a positive integer, rounding ties to even like `round` on decimals."""
+    dividend = ExpressionWrapper(dividend, output_field=models.BigIntegerField())
+    # Integer division truncates towards zero on every backend
+    quotient = ExpressionWrapper(dividend / divisor, output_field=models.BigIntegerField())
+    remainder = dividend - quotient * divisor
+    is_odd = Abs(quotient - quotient / 2 * 2)
+    # Round away from zero above the half, or at the half if the quotient is odd
+    return Case(
+        When(GreaterThan(Abs(remainder) * 2 + is_odd, divisor),
+             then=Case(When(LessThan(dividend, 0), then=quotient - 1), default=quotient + 1)),
+        default=quotient,
+        output_field=models.BigIntegerField(),
+    )
@@ -0,0 +1 @@
+"""Selectors for sale app."""
@@ -0,0 +1,24 @@
+"""Selectors for document items."""
+from collections.abc import Collection
+from uuid import UUID
+
+from cycle_invoice.sale.models import DocumentItem
+
+
+def document_items_get(document_ids: Collection[UUID], *, subclass_fields: bool = False) -> list[DocumentItem]:
+    """
+    Retrieve the active items of documents in the order they were created.
+
+    The items are read from the table of `DocumentItem` with a single query, however many item types
+    the documents mix, which is all that rendering, reports and totals need. With `subclass_fields`,
+    the items are cast to their actual types with one more query per item type.
+
+    :param document_ids: UUIDs of the documents
+    :param subclass_fields: Whether to load the fields of the item subclasses as well
+    :return: The items of all given documents
+    """
+    items = list(DocumentItem.objects.non_polymorphic().filter(document__in=document_ids)
+                 .order_by("created_at", "pk"))
+    if subclass_fields:
+        return list(DocumentItem.objects.get_real_instances(items))
+    return items
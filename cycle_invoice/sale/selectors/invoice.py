@@ -0,0 +1,29 @@
+"""Selectors for invoices."""
+from collections.abc import Collection, Iterable
+from decimal import Decimal
+from uuid import UUID
+
+from cycle_invoice.sale.models import Invoice
+
+
+def invoice_ids_by_qr_reference(references: Iterable[str]) -> dict[str, UUID]:
+    """
+    Look up the invoices of many QR references with a single indexed query.
+
+    Soft-deleted invoices are included, payments of them still belong to them.
+
+    :param references: QR references without spaces
+    :return: A dictionary with every QR reference that belongs to an invoice as key and its UUID as value
+    """
+    invoices = Invoice.objects_with_deleted.filter(qr_reference__in=set(references))
+    return dict(invoices.values_list("qr_reference", "uuid"))
+
+
+def invoice_totals(invoice_ids: Collection[UUID]) -> dict[UUID, Decimal]:
+    """
+    Retrieve the stored totals of many invoices with a single query, soft-deleted invoices included.
+
+    :param invoice_ids: UUIDs of the invoices
+    :return: A dictionary with the UUID of every given invoice as key and its total as value
+    """
+    return dict(Invoice.objects_with_deleted.filter(pk__in=invoice_ids).values_list("pk", "total"))
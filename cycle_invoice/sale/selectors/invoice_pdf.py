@@ -0,0 +1,62 @@
+"""Selectors for the PDF generation of invoices."""
+import time
+from uuid import UUID
+
+from cycle_invoice.common.selectors import get_object
+from cycle_invoice.sale.models import DocumentItem, Invoice
+from cycle_invoice.sale.selectors.document_item import document_items_get
+
+# Statuses after which the PDF generation of an invoice does not change anymore
+PDF_FINISHED_STATUSES = frozenset({Invoice.PDFStatus.DONE, Invoice.PDFStatus.FAILED})
+
+
+def invoice_pdf_get(invoice_uuid: UUID) -> Invoice:
+    """
+    Retrieve an invoice to poll the status of its PDF generation.
+
+    :param invoice_uuid: UUID of the invoice
+    :return: The invoice with its current `pdf_status`, `pdf_file` and `pdf_error`
+    """
+    invoice = get_object(Invoice, uuid=invoice_uuid)
+    if invoice is None:
+        error_message = f"Invoice with UUID {invoice_uuid} not found."
+        raise ValueError(error_message)
+    return invoice
+
+
+def invoice_pdf_await(invoice_uuid: UUID, *, timeout: float = 60, interval: float = 0.5) -> Invoice:
+    """
+    Wait until the PDF generation of an invoice is done or failed.
+
+    :param invoice_uuid: UUID of the invoice
+    :param timeout: Seconds to wait before giving up
+    :param interval: Seconds between two polls
+    :return: The invoice once its PDF generation is finished
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        invoice = invoice_pdf_get(invoice_uuid)
+        if invoice.pdf_status in PDF_FINISHED_STATUSES:
+            return invoice
+        if time.monotonic() >= deadline:
+            error_message = f"The PDF of invoice {invoice_uuid} was not generated within {timeout} seconds."
+            raise TimeoutError(error_message)
+        time.sleep(interval)
+
+
+def invoice_get_for_pdf(invoice_id: UUID) -> tuple[Invoice, list[DocumentItem]]:
+    """
+    Load an invoice with everything its PDF is rendered from in a fixed number of queries.
+
+    The party is resolved to its concrete type together with its address, and the items are
+    loaded without resolving their subclasses, as the PDF only shows the fields of `DocumentItem`.
+    The number of queries does not depend on the number of items.
+
+    :param invoice_id: UUID of the invoice
+    :return: The invoice with its concrete party and the list of its active document items
+    """
+    invoice = Invoice.objects.select_related("party").get(pk=invoice_id)
+    party_class = invoice.party.get_real_instance_class()
+    invoice.party = party_class.objects_with_deleted.select_related("address").get(pk=invoice.party_id)
+    document_items = document_items_get([invoice.pk])
+    return invoice, document_items
@@ -0,0 +1 @@
+"""Services of the sale app."""
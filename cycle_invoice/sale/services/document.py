@@ -0,0 +1,31 @@
+"""Services for documents."""
+from collections.abc import Collection
+from uuid import UUID
+
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from cycle_invoice.sale.models import Document, DocumentItem, amount_from_cents, document_total_cents
+
+
+def document_totals_recompute(document_ids: Collection[UUID] | None = None) -> int:
+    """
+    Recompute the stored totals and item counts of documents from their active items.
+
+    The totals are kept up to date whenever an item is saved, but bulk operations and manual changes
+    to the database bypass that. All documents are repaired with a single UPDATE, summing the items
+    in the database.
+
+    :param document_ids: UUIDs of the documents to repair, all documents if omitted
+    :return: The number of documents updated
+    """
+    items = DocumentItem.objects.non_polymorphic().filter(document=OuterRef("pk")).order_by().values("document")
+    item_count = Subquery(items.annotate(item_count=Count("pk")).values("item_count"))
+
+    documents = Document.objects_with_deleted.all()
+    if document_ids is not None:
+        documents = documents.filter(pk__in=document_ids)
+    return documents.update(
+        total=amount_from_cents(document_total_cents()),
+        item_count=Coalesce(item_count, 0),
+    )
@@ -0,0 +1,219 @@
+"""
+Services for the allocation of document numbers.
+
+Gapless sequences count up a locked counter row inside the transaction creating the documents, so a
+number is only used if the documents are committed; concurrent creators wait for each other's commit.
+Sequences that may have gaps hand out numbers from blocks every worker process reserves ahead
+(hi-lo). The blocks are reserved in transactions of their own, so parallel workers only meet at the
+counter row once per block and never wait for each other's documents.
+"""
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from constance import config
+from constance.signals import config_updated
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, connection, connections, transaction
+from django.dispatch import receiver
+
+from cycle_invoice.common.models import User
+from cycle_invoice.common.utils import timed_cache
+from cycle_invoice.sale.models import DocumentNumberCounter
+
+INVOICE_NUMBER_SEQUENCE = "invoice"
+
+# Number of seconds the invoice number format is reused before it is loaded from constance again
+INVOICE_NUMBER_FORMAT_CACHE_SECONDS = 60
+
+
+@dataclass(frozen=True)
+class DocumentNumberFormat:
+    """Format of the numbers of a document number sequence."""
+
+    prefix: str
+    padding: int
+    yearly: bool
+    gapless: bool
+
+    def format(self, number: int, year: int) -> str:
+        """Return the document number, e.g. `RE-2026-000042`."""
+        if self.yearly:
+            return f"{self.prefix}{year}-{number:0{self.padding}d}"
+        return f"{self.prefix}{number:0{self.padding}d}"
+
+
+@timed_cache(INVOICE_NUMBER_FORMAT_CACHE_SECONDS)
+def invoice_number_format() -> DocumentNumberFormat:
+    """Load the format of invoice numbers configured in constance, cached for `INVOICE_NUMBER_FORMAT_CACHE_SECONDS`."""
+    return DocumentNumberFormat(
+        prefix=config.INVOICE_NUMBER_PREFIX,
+        padding=config.INVOICE_NUMBER_PADDING,
+        yearly=config.INVOICE_NUMBER_YEARLY,
+        gapless=config.INVOICE_NUMBER_GAPLESS,
+    )
+
+
+@receiver(config_updated)
+def clear_invoice_number_format(sender: object, **kwargs) -> None:  # noqa: ARG001
+    """Reload the format of invoice numbers after a constance setting changed."""
+    invoice_number_format.cache_clear()
+
+
+def invoice_numbers_allocate(*, date: datetime.date, count: int = 1, user: User) -> list[str]:
+    """
+    Allocate numbers for new invoices.
+
+    :param date: Date of the invoices, selects the year of yearly sequences
+    :param count: Number of invoice numbers to allocate
+    :param user: User creating the counter of a new sequence or year
+    :return: The invoice numbers in ascending order
+    """
+    return document_numbers_allocate(INVOICE_NUMBER_SEQUENCE, invoice_number_format(), date=date, count=count,
+                                     user=user)
+
+
+def document_numbers_allocate(sequence: str, number_format: DocumentNumberFormat, *, date: datetime.date,
+                              count: int = 1, user: User) -> list[str]:
+    """
+    Allocate numbers of a document number sequence.
+
+    Numbers of gapless sequences are only reserved by the current transaction, the documents must be
+    created in it. Numbers of other sequences are never handed out twice, even if the transaction is
+    rolled back, and leave a gap then.
+
+    :param sequence: Name of the sequence
+    :param number_format: Format of the numbers of the sequence
+    :param date: Date of the documents, selects the year of yearly sequences
+    :param count: Number of document numbers to allocate
+    :param user: User creating the counter of a new sequence or year
+    :return: The document numbers in ascending order
+    """
+    if count < 1:
+        error_message = "The number of document numbers to allocate must be at least 1."
+        raise ValueError(error_message)
+
+    year = date.year if number_format.yearly else 0
+    if number_format.gapless:
+        first = _counter_reserve(sequence, year, count, user)
+        numbers = range(first, first + count)
+    else:
+        numbers = _blocks.allocate(sequence, year, count, user)
+    return [number_format.format(number, year) for number in numbers]
+
+
+def document_number_blocks_clear() -> None:
+    """Discard the number blocks reserved by this process, e.g. between tests."""
+    _blocks.clear()
+
+
+def _counter_reserve(sequence: str, year: int, count: int, user: User) -> int:
+    """Count the counter of the sequence and year up by `count` and return the first reserved number."""
+    with transaction.atomic():
+        counter = DocumentNumberCounter.objects.select_for_update().filter(sequence=sequence, year=year).first()
+        if counter is None:
+            try:
+                with transaction.atomic():
+                    DocumentNumberCounter(sequence=sequence, year=year).save(user=user)
+            except IntegrityError:
+                # Created by a concurrent transaction in the meantime
+                pass
+            counter = DocumentNumberCounter.objects.select_for_update().get(sequence=sequence, year=year)
+
+        first = counter.last_number + 1
+        counter.last_number += count
+        counter.save(user=user, update_fields=["last_number", "updated_by", "updated_at"])
+    return first
+
+
+def _counter_reserve_committed(sequence: str, year: int, count: int, user: User) -> int:
+    """
+    Reserve numbers like `_counter_reserve`, committed right away even inside a transaction.
+
+    Inside a transaction the reservation runs in a thread of its own, which has a database
+    connection of its own, so the counter row is not locked until the surrounding transaction ends.
+    That connection only sees committed data, so the user must be committed. If the surrounding
+    transaction locked the counter row itself, e.g. by allocating gapless numbers of the same
+    sequence before, the thread would wait for it forever; it gives up after
+    `DOCUMENT_NUMBER_BLOCK_LOCK_TIMEOUT` seconds instead.
+    """
+    if not connection.in_atomic_block:
+        return _counter_reserve(sequence, year, count, user)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(_counter_reserve_in_thread, sequence, year, count, user).result()
+
+
+def _counter_reserve_in_thread(sequence: str, year: int, count: int, user: User) -> int:
+    """Reserve numbers in a worker thread with a lock timeout and close its database connection afterwards."""
+    timeout = settings.DOCUMENT_NUMBER_BLOCK_LOCK_TIMEOUT
+    try:
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                # Local to the transaction, a timeout of 0 would disable it
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT set_config('lock_timeout', %s, true)",
+                                   [f"{max(1, round(timeout * 1000))}ms"])
+            return _counter_reserve(sequence, year, count, user)
+    except OperationalError as error:
+        error_message = (f"Could not reserve a block of {sequence!r} numbers within {timeout} seconds, the counter "
+                         "is probably locked by the transaction allocating them.")
+        raise RuntimeError(error_message) from error
+    finally:
+        connections.close_all()
+
+
+class _NumberBlocks:
+    """Number blocks reserved by this process, per sequence and year."""
+
+    def __init__(self) -> None:
+        """Start without any reserved blocks."""
+        self._blocks: dict[tuple[str, int], list[range]] = {}
+        self._lock = threading.Lock()
+
+    def allocate(self, sequence: str, year: int, count: int, user: User) -> list[int]:
+        """
+        Hand out numbers from the reserved blocks, reserving a new block when they run out.
+
+        The lock only guards the blocks in memory, threads reserving a new block wait for the
+        database without it. Numbers of a rolled back transaction are not handed out again.
+        """
+        key = (sequence, year)
+        numbers = self._take(key, count)
+        if len(numbers) < count:
+            missing = count - len(numbers)
+            size = max(settings.DOCUMENT_NUMBER_BLOCK_SIZE, missing)
+            first = _counter_reserve_committed(sequence, year, size, user)
+            numbers.extend(range(first, first + missing))
+            self._keep(key, range(first + missing, first + size))
+        return numbers
+
+    def clear(self) -> None:
+        """Discard all reserved blocks."""
+        with self._lock:
+            self._blocks.clear()
+
+    def _take(self, key: tuple[str, int], count: int) -> list[int]:
+        """Take up to `count` numbers from the reserved blocks, the lowest first."""
+        numbers: list[int] = []
+        with self._lock:
+            blocks = self._blocks.get(key, [])
+            while blocks and len(numbers) < count:
+                taken = blocks[0][:count - len(numbers)]
+                numbers.extend(taken)
+                blocks[0] = blocks[0][len(taken):]
+                if not blocks[0]:
+                    blocks.pop(0)
+        return numbers
+
+    def _keep(self, key: tuple[str, int], block: range) -> None:
+        """Keep the rest of a reserved block for the next allocations, next to the other blocks."""
+        if not block:
+            return
+        with self._lock:
+            blocks = self._blocks.setdefault(key, [])
+            blocks.append(block)
+            blocks.sort(key=lambda kept: kept.start)
+
+
+_blocks = _NumberBlocks()
@@ -0,0 +1,36 @@
+"""Services for invoices."""
+from django.db import transaction
+
+from cycle_invoice.sale.models import Invoice
+from cycle_invoice.sale.utils.swiss_qr import invoice_qr_reference
+
+# Number of invoices whose QR reference is backfilled per transaction
+QR_REFERENCE_BACKFILL_BATCH_SIZE = 1000
+
+
+def invoice_qr_reference_backfill(*, batch_size: int = QR_REFERENCE_BACKFILL_BATCH_SIZE) -> int:
+    """
+    Store the QR reference of all invoices created before it was persisted.
+
+    The invoices are updated in batches, each in its own transaction, so the backfill can run on a
+    live database and be resumed after an interruption. Soft-deleted invoices are included, as their
+    payments can still arrive.
+
+    :param batch_size: Number of invoices updated per batch
+    :return: The number of invoices that got their QR reference
+    """
+    if batch_size < 1:
+        error_message = f"The batch size must be positive, got {batch_size}."
+        raise ValueError(error_message)
+
+    backfilled = 0
+    while True:
+        with transaction.atomic():
+            invoices = list(Invoice.objects_with_deleted.filter(qr_reference__isnull=True)
+                            .only("uuid").select_for_update()[:batch_size])
+            if not invoices:
+                return backfilled
+            for invoice in invoices:
+                invoice.qr_reference = invoice_qr_reference(invoice.uuid)
+            Invoice.objects_with_deleted.bulk_update(invoices, ["qr_reference"])
+        backfilled += len(invoices)
@@ -0,0 +1,74 @@
+"""Services for the assembly of invoices from open document items."""
+import datetime
+from collections import defaultdict
+from itertools import batched
+from uuid import UUID
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from cycle_invoice.sale.models import DocumentItem, Invoice
+from cycle_invoice.sale.services.document_number import invoice_numbers_allocate
+
+# Number of invoices assembled per transaction
+INVOICE_ASSEMBLY_BATCH_SIZE = 500
+
+
+def invoices_assemble(*, date: datetime.date, due_date: datetime.date, user: get_user_model,
+                      batch_size: int = INVOICE_ASSEMBLY_BATCH_SIZE) -> int:
+    """
+    Collect all open document items into one new invoice per party.
+
+    The parties are assembled in batches, each in its own transaction: the invoices are inserted with
+    their numbers and QR references, and their items are attached and added to their totals, with one
+    bulk statement per table and a bulk insert of the history of each. Items attached concurrently
+    are skipped.
+
+    :param date: Date of the invoices
+    :param due_date: Due date of the invoices
+    :param user: User assembling the invoices
+    :param batch_size: Number of invoices assembled per batch
+    :return: The number of invoices created
+    """
+    if batch_size < 1:
+        error_message = f"The batch size must be positive, got {batch_size}."
+        raise ValueError(error_message)
+
+    party_ids = list(DocumentItem.objects.non_polymorphic().filter(document__isnull=True)
+                     .order_by("party").values_list("party", flat=True).distinct())
+    assembled = 0
+    for parties in batched(party_ids, batch_size):
+        with transaction.atomic():
+            assembled += _invoices_assemble_parties(parties, date=date, due_date=due_date, user=user)
+    return assembled
+
+
+def _invoices_assemble_parties(party_ids: tuple[UUID, ...], *, date: datetime.date, due_date: datetime.date,
+                               user: get_user_model) -> int:
+    """Assemble the invoices of a batch of parties in the current transaction."""
+    # Locked on the base table first, the polymorphic query below loads every item type in one query each
+    item_ids = list(DocumentItem.objects.non_polymorphic().select_for_update()
+                    .filter(party__in=party_ids, document__isnull=True).values_list("pk", flat=True))
+    items_by_party: dict[UUID, list[DocumentItem]] = defaultdict(list)
+    for item in DocumentItem.objects.filter(pk__in=item_ids).order_by("created_at", "pk"):
+        items_by_party[item.party_id].append(item)
+    if not items_by_party:
+        return 0
+
+    numbers = invoice_numbers_allocate(date=date, count=len(items_by_party), user=user)
+    invoices = []
+    for number, (party_id, items) in zip(numbers, items_by_party.items(), strict=True):
+        invoice = Invoice(party_id=party_id, document_number=number, date=date, due_date=due_date)
+        invoices.append(invoice)
+        for item in items:
+            item.document_id = invoice.uuid
+    Invoice.objects.bulk_create_audited(invoices, user)
+
+    # Every item type keeps its own history, attaching the items adds them to the totals of the invoices
+    items_by_model: dict[type[DocumentItem], list[DocumentItem]] = defaultdict(list)
+    for items in items_by_party.values():
+        for item in items:
+            items_by_model[type(item)].append(item)
+    for model, items in items_by_model.items():
+        model.objects.bulk_update_audited(items, ["document"], user)
+    return len(invoices)
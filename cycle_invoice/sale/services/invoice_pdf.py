@@ -0,0 +1,129 @@
+"""Services for the PDF generation of invoices."""
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from cycle_invoice.common.selectors import get_system_user
+from cycle_invoice.common.services import model_update
+from cycle_invoice.sale.models import Invoice
+from cycle_invoice.sale.utils.invoice_pdf_generation import (
+    add_pdf_to_storage,
+    add_qr_bill,
+    generate_invoice_context,
+    invoice_pdf_fingerprint,
+    render_invoice_pdf,
+)
+
+
+def invoice_pdf_render(invoice: Invoice, *, force: bool = False) -> tuple[str, str, bool]:
+    """
+    Render the PDF of an invoice and save it to the default storage, unless the saved PDF is up to date.
+
+    The saved PDF is reused if the fingerprint of the render context matches the one stored on
+    the invoice and the PDF file still exists. The fingerprint is computed before the QR bill is
+    generated, which is only done for PDFs that are rendered. The invoice itself is not saved.
+
+    :param invoice: Invoice to render the PDF for
+    :param force: Render the PDF even if the saved PDF is up to date
+
+    :return: A tuple containing the name of the PDF file, the fingerprint of its render context and a
+        boolean indicating whether it was rendered.
+    """
+    context = generate_invoice_context(invoice.uuid)
+    fingerprint = invoice_pdf_fingerprint(context)
+    if (not force and invoice.pdf_file and invoice.pdf_fingerprint == fingerprint
+            and default_storage.exists(invoice.pdf_file)):
+        return invoice.pdf_file, fingerprint, False
+
+    pdf_file = add_pdf_to_storage(render_invoice_pdf(invoice.uuid, add_qr_bill(context)))
+    return pdf_file, fingerprint, True
+
+
+def invoice_pdf_store(invoice: Invoice, *, force: bool = False) -> tuple[str, bool]:
+    """
+    Render the PDF of an invoice like `invoice_pdf_render` and store its name and fingerprint on the invoice.
+
+    :param invoice: Invoice to store the PDF for
+    :param force: Render the PDF even if the saved PDF is up to date
+
+    :return: A tuple containing the name of the PDF file and a boolean indicating whether it was rendered.
+    """
+    pdf_file, fingerprint, rendered = invoice_pdf_render(invoice, force=force)
+    if rendered:
+        model_update(instance=invoice, fields=["pdf_file", "pdf_fingerprint"],
+                     data={"pdf_file": pdf_file, "pdf_fingerprint": fingerprint}, user=get_system_user())
+    return pdf_file, rendered
+
+
+@transaction.atomic
+def invoice_pdf_request(invoice: Invoice, user: get_user_model, *, force: bool = False) -> Invoice:
+    """
+    Queue the PDF generation of an invoice on the PDF worker queue.
+
+    The task is sent once the transaction commits, its ID is stored on the invoice. The invoice is
+    locked while its status is checked, so concurrent requests queue the generation only once.
+
+    :param invoice: Invoice to generate the PDF for
+    :param user: User requesting the PDF
+    :param force: Render the PDF even if the saved PDF is up to date
+    """
+    invoice = Invoice.objects.select_for_update().get(pk=invoice.pk)
+    if invoice.pdf_status in {Invoice.PDFStatus.PENDING, Invoice.PDFStatus.RUNNING}:
+        error_message = f"The PDF of invoice {invoice.uuid} is already being generated."
+        raise ValueError(error_message)
+
+    task_id = str(uuid.uuid4())
+    invoice, _ = model_update(
+        instance=invoice,
+        fields=["pdf_status", "pdf_task_id", "pdf_error"],
+        data={"pdf_status": Invoice.PDFStatus.PENDING, "pdf_task_id": task_id, "pdf_error": ""},
+        user=user,
+    )
+
+    from cycle_invoice.sale.tasks import invoice_pdf_generate  # noqa: PLC0415 (to avoid circular import)
+
+    invoice_uuid = invoice.uuid
+    transaction.on_commit(lambda: invoice_pdf_generate.apply_async(args=(invoice_uuid,),
+                                                                       kwargs={"force": force}, task_id=task_id))
+    return invoice
+
+
+@transaction.atomic
+def invoice_pdf_running(invoice: Invoice) -> Invoice:
+    """Mark the PDF generation of an invoice as running."""
+    if invoice.pdf_status != Invoice.PDFStatus.PENDING:
+        error_message = f"Cannot run non-pending PDF generations. Current status is {invoice.pdf_status}"
+        raise ValueError(error_message)
+
+    invoice, _ = model_update(instance=invoice, fields=["pdf_status"],
+                              data={"pdf_status": Invoice.PDFStatus.RUNNING}, user=get_system_user())
+    return invoice
+
+
+@transaction.atomic
+def invoice_pdf_done(invoice: Invoice, pdf_file: str, fingerprint: str) -> Invoice:
+    """Mark the PDF generation of an invoice as done and store the name and fingerprint of the PDF file."""
+    if invoice.pdf_status != Invoice.PDFStatus.RUNNING:
+        error_message = f"Cannot finish non-running PDF generations. Current status is {invoice.pdf_status}"
+        raise ValueError(error_message)
+
+    invoice, _ = model_update(instance=invoice, fields=["pdf_status", "pdf_file", "pdf_fingerprint"],
+                              data={"pdf_status": Invoice.PDFStatus.DONE, "pdf_file": pdf_file,
+                                    "pdf_fingerprint": fingerprint},
+                              user=get_system_user())
+    return invoice
+
+
+@transaction.atomic
+def invoice_pdf_failed(invoice: Invoice, error: str) -> Invoice:
+    """Mark the PDF generation of an invoice as failed."""
+    if invoice.pdf_status not in {Invoice.PDFStatus.PENDING, Invoice.PDFStatus.RUNNING}:
+        error_message = f"Cannot fail PDF generations that are not queued. Current status is {invoice.pdf_status}"
+        raise ValueError(error_message)
+
+    invoice, _ = model_update(instance=invoice, fields=["pdf_status", "pdf_error"],
+                              data={"pdf_status": Invoice.PDFStatus.FAILED, "pdf_error": error},
+                              user=get_system_user())
+    return invoice
@@ -1,15 +1,34 @@
 """Tasks from the app sale that Celery runs."""
 import datetime
 import logging
+from itertools import batched
+from typing import Any
+from uuid import UUID
 
+from billiard.einfo import ExceptionInfo
 from celery import shared_task
+from celery.app.task import Task
+from constance import config
 
-from cycle_invoice.common.selectors import get_system_user
+from cycle_invoice.common.models import deferred_history
+from cycle_invoice.common.selectors import get_object, get_system_user
+from cycle_invoice.sale.models import Invoice
+from cycle_invoice.sale.services.invoice_assembly import invoices_assemble
+from cycle_invoice.sale.services.invoice_pdf import (
+    invoice_pdf_done,
+    invoice_pdf_failed,
+    invoice_pdf_render,
+    invoice_pdf_running,
+)
 from cycle_invoice.subscription.models import Subscription
 from cycle_invoice.subscription.services.subscription import subscription_extension
 
 logger = logging.getLogger(__name__)
 
+# Number of subscriptions billed per transaction
+SUBSCRIPTION_BILLING_BATCH_SIZE = 500
+
+
 @shared_task
 def subscription_processing_to_document_items() -> None:
     """
@@ -17,16 +36,81 @@ def subscription_processing_to_document_items() -> None:
 
     Iterates through all active subscriptions and processes those
     whose next_end_billed_date is in bill_days_before_end days or less in the future.
+    The subscriptions are billed in batches, each in one transaction writing its history in bulk.
+    Every subscription is billed in a savepoint of its own, so a failing one is rolled back without
+    the rest of its batch. The task fails after the other subscriptions are billed.
     """
     logger.info("Starting subscription processing task...")
 
     today = datetime.datetime.now(tz=datetime.UTC).date()
-    subs = Subscription.objects.filter(cancelled_date__isnull=True)
-    for sub in subs:
-        next_end = sub.end_billed_date
-        bill_days = sub.plan.bill_days_before_end
-        if next_end and (next_end - today).days <= bill_days:
-            log_message = f"Processing subscription {sub.uuid} with end_billed_date {next_end}"
-            logger.info(log_message)
-            subscription_extension(sub.uuid, user=get_system_user())
+    user = get_system_user()
+    subs = Subscription.objects.filter(cancelled_date__isnull=True).select_related("plan")
+    due_subs = (sub for sub in subs.iterator(chunk_size=SUBSCRIPTION_BILLING_BATCH_SIZE)
+                if sub.end_billed_date and (sub.end_billed_date - today).days <= sub.plan.bill_days_before_end)
+    errors: list[Exception] = []
+    for batch in batched(due_subs, SUBSCRIPTION_BILLING_BATCH_SIZE):
+        with deferred_history():
+            for sub in batch:
+                log_message = f"Processing subscription {sub.uuid} with end_billed_date {sub.end_billed_date}"
+                logger.info(log_message)
+                try:
+                    with deferred_history():
+                        subscription_extension(sub.uuid, user=user)
+                except Exception as error:
+                    logger.exception("Billing subscription %s failed.", sub.uuid)
+                    errors.append(error)
+    if errors:
+        error_message = f"Billing {len(errors)} subscription(s) failed."
+        raise ExceptionGroup(error_message, errors)
     logger.info("Finished subscription processing task.")
+
+
+@shared_task
+def invoice_assembly_from_open_items() -> int:
+    """
+    Collect the open document items into one invoice per party.
+
+    The invoices are dated today and due after the payment term configured in constance.
+    """
+    today = datetime.datetime.now(tz=datetime.UTC).date()
+    due_date = today + datetime.timedelta(days=config.INVOICE_PAYMENT_TERM_DAYS)
+    assembled = invoices_assemble(date=today, due_date=due_date, user=get_system_user())
+    logger.info("Assembled %s invoices from open document items.", assembled)
+    return assembled
+
+
+def _invoice_pdf_generate_failure(  # noqa: PLR0913
+        task: Task,  # noqa:  ARG001
+        exc: Exception,
+        task_id: str | None,  # noqa:  ARG001
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],  # noqa:  ARG001
+        einfo: ExceptionInfo,  # noqa:  ARG001
+) -> None:
+    """Handle a failed invoice PDF generation."""
+    invoice_uuid: UUID = args[0]
+    logger.warning("PDF generation of invoice %s failed: %s", invoice_uuid, exc)
+    invoice = get_object(Invoice, uuid=invoice_uuid)
+    if invoice is None:
+        error_message = f"Invoice with UUID {invoice_uuid} not found."
+        raise ValueError(error_message)
+    invoice_pdf_failed(invoice, f"{type(exc).__name__}: {exc}")
+
+
+@shared_task(on_failure=_invoice_pdf_generate_failure)
+def invoice_pdf_generate(invoice_uuid: UUID, *, force: bool = False) -> str:
+    """
+    Render the PDF of an invoice and save it to the default storage.
+
+    The saved PDF is reused if the invoice did not change since it was rendered. Routed to the
+    dedicated `pdf` queue, so the CPU-heavy rendering runs on its own workers.
+    """
+    invoice = get_object(Invoice, uuid=invoice_uuid)
+    if invoice is None:
+        error_message = f"Invoice with UUID {invoice_uuid} not found."
+        raise ValueError(error_message)
+
+    invoice = invoice_pdf_running(invoice)
+    pdf_file, fingerprint, _ = invoice_pdf_render(invoice, force=force)
+    invoice_pdf_done(invoice, pdf_file, fingerprint)
+    return pdf_file
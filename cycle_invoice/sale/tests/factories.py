@@ -6,7 +6,7 @@ from cycle_invoice.accounting.tests.factories import AccountFactory
 from cycle_invoice.common.tests.factories import BaseFactory
 from cycle_invoice.common.tests.faker import faker
 from cycle_invoice.party.tests.factories import OrganizationFactory
-from cycle_invoice.sale.models import Document, DocumentItem, Invoice
+from cycle_invoice.sale.models import Document, DocumentItem, DocumentNumberCounter, Invoice
 
 
 class DocumentFactory(BaseFactory):
@@ -47,3 +47,16 @@ class DocumentItemFactory(BaseFactory):
     quantity = LazyAttribute(lambda _: faker.pyint(min_value=1, max_value=10))
     party = SubFactory(OrganizationFactory)
     account = SubFactory(AccountFactory)
+
+
+class DocumentNumberCounterFactory(BaseFactory):
+    """Factory for the DocumentNumberCounter model."""
+
+    class Meta:
+        """Metaclass for DocumentNumberCounterFactory."""
+
+        model = DocumentNumberCounter
+
+    sequence = "invoice"
+    year = LazyAttribute(lambda _: faker.pyint(min_value=2000, max_value=2100))
+    last_number = LazyAttribute(lambda _: faker.pyint(max_value=1000))
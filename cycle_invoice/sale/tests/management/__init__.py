@@ -0,0 +1 @@
+"""Tests for the sale management commands."""
@@ -0,0 +1,23 @@
+"""Tests for the management command backfill_invoice_qr_references."""
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from cycle_invoice.sale.models import Invoice
+from cycle_invoice.sale.tests.factories import InvoiceFactory
+
+
+class TestBackfillInvoiceQrReferences(TestCase):
+    """Tests for the management command `backfill_invoice_qr_references`."""
+
+    def test_backfill(self) -> None:
+        """Command should store the missing QR references and report how many were stored."""
+        InvoiceFactory.create_batch(2)
+        Invoice.objects.update(qr_reference=None)
+
+        out = StringIO()
+        call_command("backfill_invoice_qr_references", "--batch-size", "1", stdout=out)
+
+        self.assertFalse(Invoice.objects.filter(qr_reference__isnull=True).exists())
+        self.assertIn("Stored the QR reference of 2 invoices", out.getvalue())
@@ -0,0 +1,52 @@
+"""Tests for the management command generate_invoice_pdfs."""
+import datetime
+from io import StringIO
+from unittest.mock import NonCallableMock, patch
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from cycle_invoice.sale.tests.factories import InvoiceFactory
+from cycle_invoice.sale.utils.invoice_pdf_batch import InvoicePDFBatchResult
+
+
+@patch("cycle_invoice.sale.management.commands.generate_invoice_pdfs.generate_invoice_pdfs")
+class TestGenerateInvoicePdfs(TestCase):
+    """Tests for the management command `generate_invoice_pdfs`."""
+
+    def test_generates_given_invoices(self, mock_generate: NonCallableMock) -> None:
+        """Command should pass the invoice IDs and options to the batch API."""
+        mock_generate.return_value = InvoicePDFBatchResult(generated={"a": "invoice_a.pdf", "b": "invoice_b.pdf"},
+                                                           unchanged={"b"})
+
+        out = StringIO()
+        call_command("generate_invoice_pdfs", "a", "b", "--workers", "8", "--force", stdout=out)
+
+        mock_generate.assert_called_once_with(["a", "b"], workers=8, force=True)
+        self.assertIn("Generated 2 of 2 invoice PDFs, 1 of them were up to date", out.getvalue())
+
+    def test_selects_invoices_since_date(self, mock_generate: NonCallableMock) -> None:
+        """Command should select the invoices dated on or after --since."""
+        recent = InvoiceFactory.create(date=datetime.date(2025, 3, 31))
+        InvoiceFactory.create(date=datetime.date(2025, 2, 28))
+        mock_generate.return_value = InvoicePDFBatchResult(generated={str(recent.pk): "invoice.pdf"})
+
+        call_command("generate_invoice_pdfs", "--since", "2025-03-01", stdout=StringIO())
+
+        mock_generate.assert_called_once_with([str(recent.pk)], workers=None, force=False)
+
+    def test_reports_failed_invoices(self, mock_generate: NonCallableMock) -> None:
+        """Command should list the failed invoices and exit with an error."""
+        mock_generate.return_value = InvoicePDFBatchResult(generated={"a": "invoice_a.pdf"},
+                                                           failed={"b": "ValueError: broken"})
+
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, "Generated 1 of 2 invoice PDFs"):
+            call_command("generate_invoice_pdfs", "a", "b", stdout=out)
+        self.assertIn("Invoice b: ValueError: broken", out.getvalue())
+
+    def test_requires_invoices(self, mock_generate: NonCallableMock) -> None:
+        """Command should fail when no invoices are selected."""
+        with self.assertRaisesMessage(CommandError, "Pass invoice IDs or --since"):
+            call_command("generate_invoice_pdfs", stdout=StringIO())
+        mock_generate.assert_not_called()
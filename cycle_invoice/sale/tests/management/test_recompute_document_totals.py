@@ -0,0 +1,25 @@
+"""Tests for the management command recompute_document_totals."""
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from cycle_invoice.sale.models import Document
+from cycle_invoice.sale.tests.factories import DocumentFactory, DocumentItemFactory
+
+
+class TestRecomputeDocumentTotals(TestCase):
+    """Tests for the management command `recompute_document_totals`."""
+
+    def test_recompute(self) -> None:
+        """Command should repair the totals of the given documents and report how many were updated."""
+        document = DocumentFactory.create()
+        DocumentItemFactory.create(document=document, party=document.party, price=Decimal("4.00"), quantity=2)
+        Document.objects.update(total=0, item_count=0)
+
+        out = StringIO()
+        call_command("recompute_document_totals", str(document.pk), stdout=out)
+
+        self.assertEqual(Document.objects.values_list("total", "item_count").get(), (Decimal("8.00"), 1))
+        self.assertIn("Recomputed the totals of 1 documents", out.getvalue())
@@ -1,8 +1,15 @@
 """Tests for the sale model Document."""
+from decimal import Decimal
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
-from cycle_invoice.sale.tests.factories import DocumentFactory
+from cycle_invoice.accounting.tests.factories import AccountFactory
+from cycle_invoice.common.models import DiscountType
+from cycle_invoice.common.selectors import get_system_user
+from cycle_invoice.sale.models import Document, DocumentItem
+from cycle_invoice.sale.tests.factories import DocumentFactory, DocumentItemFactory
 
 
 class TestDocument(TestCase):
@@ -11,7 +18,120 @@ class TestDocument(TestCase):
     def setUp(self) -> None:
         """Set up the test environment."""
         self.document = DocumentFactory.create()
+        self.system_user = get_system_user()
+
+    def _stored_totals(self, document: Document) -> tuple[Decimal, int]:
+        """Return the total and item count stored in the database."""
+        return Document.objects_with_deleted.values_list("total", "item_count").get(pk=document.pk)
 
     def test_document_str(self) -> None:
         """Test Document.__str__()."""
         self.assertEqual(str(self.document), f"{self.document.document_number} - {self.document.party}")
+
+    def test_document_totals_follow_items(self) -> None:
+        """Test that adding, changing and deleting items updates the stored totals."""
+        item = DocumentItemFactory.create(document=self.document, party=self.document.party,
+                                          price=Decimal("10.00"), quantity=2)
+        DocumentItemFactory.create(document=self.document, party=self.document.party,
+                                   price=Decimal("5.00"), quantity=1)
+        self.assertEqual(self._stored_totals(self.document), (Decimal("25.00"), 2))
+        self.assertEqual((self.document.total, self.document.item_count), (Decimal("25.00"), 2))
+
+        item.discount_value = 50
+        item.discount_type = DiscountType.PERCENT
+        item.save(user=self.system_user)
+        self.assertEqual(self._stored_totals(self.document), (Decimal("15.00"), 2))
+
+        item.delete(user=self.system_user)
+        self.assertEqual(self._stored_totals(self.document), (Decimal("5.00"), 1))
+
+        other_item = DocumentItemFactory.create(document=self.document, party=self.document.party,
+                                                price=Decimal("2.00"), quantity=1)
+        other_item.delete(hard_delete=True)
+        self.assertEqual(self._stored_totals(self.document), (Decimal("5.00"), 1))
+
+    def test_document_totals_follow_recovered_items(self) -> None:
+        """Test that recovering a deleted item adds it back to the stored totals."""
+        item = DocumentItemFactory.create(document=self.document, party=self.document.party,
+                                          price=Decimal("10.00"), quantity=2)
+        item.delete(user=self.system_user)
+        self.assertEqual(self._stored_totals(self.document), (Decimal(0), 0))
+
+        DocumentItem.objects_with_deleted.get(pk=item.pk).recover(user=self.system_user)
+        self.assertEqual(self._stored_totals(self.document), (Decimal("20.00"), 1))
+        self.assertFalse(DocumentItem.objects_with_deleted.get(pk=item.pk).soft_deleted)
+
+    def test_document_totals_without_reading_the_item(self) -> None:
+        """Test that saving a loaded item updates the totals from its loaded values, without reading it again."""
+        DocumentItemFactory.create(document=self.document, party=self.document.party,
+                                   price=Decimal("10.00"), quantity=2)
+        item = DocumentItem.objects.get(document=self.document)
+        item.quantity = 3
+
+        # The savepoint, the item with its history and the document
+        with self.assertNumQueries(5):
+            item.save(user=self.system_user)
+        self.assertEqual(self._stored_totals(self.document), (Decimal("30.00"), 1))
+
+    def test_document_totals_follow_items_with_deferred_fields(self) -> None:
+        """Test that saving an item loaded with deferred fields reads its stored values to update the totals."""
+        DocumentItemFactory.create(document=self.document, party=self.document.party,
+                                   price=Decimal("10.00"), quantity=2)
+        item = DocumentItem.objects.only("pk", "title").get(document=self.document)
+        item.title = "Deferred"
+        item.price = Decimal("5.00")
+        item.save(user=self.system_user)
+        self.assertEqual(self._stored_totals(self.document), (Decimal("10.00"), 1))
+
+        open_item = DocumentItemFactory.create(party=self.document.party, price=Decimal("1.00"), quantity=1)
+        open_item = DocumentItem.objects.only("pk", "document").get(pk=open_item.pk)
+        open_item.document = self.document
+        open_item.save(user=self.system_user)
+        self.assertEqual(self._stored_totals(self.document), (Decimal("11.00"), 2))
+
+    def test_document_totals_follow_bulk_operations(self) -> None:
+        """Test that the audited bulk operations of items update the stored totals with one statement."""
+        other_document = DocumentFactory.create()
+        items = DocumentItemFactory.build_batch(2, document=self.document, party=self.document.party,
+                                                account=AccountFactory.create(), price=Decimal("10.00"), quantity=1)
+        DocumentItem.objects.bulk_create_audited(items, self.system_user)
+        self.assertEqual(self._stored_totals(self.document), (Decimal("20.00"), 2))
+
+        moved_items = list(DocumentItem.objects.filter(document=self.document))
+        moved_items[0].document = other_document
+        moved_items[1].quantity = 3
+        with CaptureQueriesContext(connection) as queries:
+            DocumentItem.objects.bulk_update_audited(moved_items, ["document", "quantity"], self.system_user)
+
+        self.assertEqual(self._stored_totals(self.document), (Decimal("30.00"), 1))
+        self.assertEqual(self._stored_totals(other_document), (Decimal("10.00"), 1))
+        self.assertEqual(len([query for query in queries.captured_queries
+                              if query["sql"].startswith('UPDATE "sale_document"')]), 1)
+
+    def test_document_totals_follow_reassigned_items(self) -> None:
+        """Test that moving an item to another document moves its total as well."""
+        other_document = DocumentFactory.create()
+        item = DocumentItemFactory.create(document=self.document, party=self.document.party,
+                                          price=Decimal("12.50"), quantity=2)
+
+        item.document = other_document
+        item.save(user=self.system_user)
+        self.assertEqual(self._stored_totals(self.document), (Decimal(0), 0))
+        self.assertEqual(self._stored_totals(other_document), (Decimal("25.00"), 1))
+
+        item.document = None
+        item.save(user=self.system_user)
+        self.assertEqual(self._stored_totals(other_document), (Decimal(0), 0))
+
+    def test_document_save_keeps_totals(self) -> None:
+        """Test that saving a document loaded before its items changed does not overwrite the totals."""
+        stale_document = Document.objects.get(pk=self.document.pk)
+        DocumentItemFactory.create(document=self.document, party=self.document.party,
+                                   price=Decimal("10.00"), quantity=1)
+
+        stale_document.header_text = "Updated"
+        stale_document.save(user=self.system_user)
+        stale_document.delete(user=self.system_user)
+
+        self.assertEqual(self._stored_totals(self.document), (Decimal("10.00"), 1))
+        self.assertEqual(Document.objects_with_deleted.get(pk=self.document.pk).header_text, "Updated")
@@ -1,12 +1,21 @@
 """Tests for the sale model DocumentItem."""
+import random
 from decimal import Decimal
 
 from django.test import TestCase
 
+from cycle_invoice.accounting.tests.factories import AccountFactory
 from cycle_invoice.common.models import DiscountType
+from cycle_invoice.party.tests.factories import OrganizationFactory
+from cycle_invoice.sale.models import DocumentItem
 from cycle_invoice.sale.tests.factories import DocumentItemFactory
 
 
+def random_amount(rng: random.Random, maximum: int) -> Decimal:
+    """Return a random amount with two decimal places between zero and the maximum."""
+    return Decimal(rng.randint(0, maximum * 100)) / 100
+
+
 class TestDocumentItem(TestCase):
     """Tests for the sale model DocumentItem."""
 
@@ -14,6 +23,14 @@ class TestDocumentItem(TestCase):
         """Set up the test environment."""
         self.document_item = DocumentItemFactory.build()
 
+    def test_documentitem_save_rejects_deleted(self) -> None:
+        """Test that a soft-deleted item cannot be saved, although its base manager hides it."""
+        item = DocumentItemFactory.create()
+        item.delete(user=item.created_by)
+
+        with self.assertRaisesMessage(ValueError, "Cannot update a soft-deleted object."):
+            item.save(user=item.created_by)
+
     def test_documentitem_price_str(self) -> None:
         """Test the string representation of DocumentItem price."""
         self.document_item.price = 1.2345
@@ -68,3 +85,34 @@ class TestDocumentItem(TestCase):
         self.document_item.discount_value = 1
         self.document_item.discount_type = DiscountType.ABSOLUTE
         self.assertEqual(self.document_item.discount_str, f"-{self.document_item.discount_value:.2f}")
+
+    def test_documentitem_with_line_total_matches_total(self) -> None:
+        """Test that DocumentItem.objects.with_line_total() computes exactly what DocumentItem.total does."""
+        rng = random.Random(20240601)  # noqa: S311
+        # Ties rounded to even, negative totals, full discounts and the largest supported amounts
+        samples = [
+            (Decimal("0.05"), Decimal(1), Decimal(50), DiscountType.PERCENT),
+            (Decimal("0.15"), Decimal(1), Decimal(50), DiscountType.PERCENT),
+            (Decimal("0.05"), Decimal("0.50"), Decimal(0), DiscountType.ABSOLUTE),
+            (Decimal("0.15"), Decimal("0.50"), Decimal(0), DiscountType.ABSOLUTE),
+            (Decimal("10.00"), Decimal(1), Decimal("12.50"), DiscountType.ABSOLUTE),
+            (Decimal("0.05"), Decimal("0.50"), Decimal("0.10"), DiscountType.ABSOLUTE),
+            (Decimal("19.99"), Decimal(3), Decimal(100), DiscountType.PERCENT),
+            (Decimal("999999.99"), Decimal("9999.99"), Decimal("33.33"), DiscountType.PERCENT),
+        ]
+        for _ in range(200):
+            discount_type = rng.choice(DiscountType.values)
+            maximum_discount = 100 if discount_type == DiscountType.PERCENT else 10000
+            samples.append((random_amount(rng, 10000), random_amount(rng, 100), random_amount(rng, maximum_discount),
+                            discount_type))
+
+        party = OrganizationFactory.create()
+        account = AccountFactory.create()
+        items = [DocumentItemFactory.create(price=price, quantity=quantity, discount_value=discount_value,
+                                            discount_type=discount_type, party=party, account=account)
+                 for price, quantity, discount_value, discount_type in samples]
+
+        line_totals = dict(DocumentItem.objects.with_line_total().values_list("pk", "line_total"))
+        for item in items:
+            self.assertEqual(line_totals[item.pk], item.total, (item.price, item.quantity, item.discount_value,
+                                                                item.discount_type))
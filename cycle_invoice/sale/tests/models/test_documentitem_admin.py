@@ -0,0 +1,48 @@
+"""Tests for the sale admin DocumentItemAdmin."""
+from django.contrib import admin
+from django.test import RequestFactory, TestCase
+
+from cycle_invoice.common.selectors import get_system_user
+from cycle_invoice.sale.admin import DocumentItemAdmin
+from cycle_invoice.sale.models import DocumentItem
+from cycle_invoice.subscription.models import SubscriptionDocumentItem
+from cycle_invoice.subscription.tests.factories import SubscriptionDocumentItemFactory
+
+
+class TestDocumentItemAdmin(TestCase):
+    """Tests for the sale admin DocumentItemAdmin."""
+
+    def setUp(self) -> None:
+        """Set up the test environment."""
+        self.admin = DocumentItemAdmin(DocumentItem, admin.site)
+        self.request = RequestFactory().get("/")
+        self.request.user = get_system_user()
+        self.item = SubscriptionDocumentItemFactory.create()
+
+    def test_get_queryset_lists_base_rows(self) -> None:
+        """The change list reads the items without resolving their types."""
+        with self.assertNumQueries(1):
+            items = list(self.admin.get_queryset(self.request))
+
+        self.assertEqual([type(item) for item in items], [DocumentItem])
+
+    def test_get_object_resolves_type(self) -> None:
+        """A single item is edited as its actual type."""
+        item = self.admin.get_object(self.request, str(self.item.pk))
+
+        self.assertIsInstance(item, SubscriptionDocumentItem)
+        self.assertEqual(item.subscription_id, self.item.subscription_id)
+
+    def test_get_object_missing(self) -> None:
+        """An unknown item is not found."""
+        self.assertIsNone(self.admin.get_object(self.request, "4398f182-3c41-480a-afc7-15387ce5511c"))
+
+    def test_save_model_records_user(self) -> None:
+        """Items changed in the admin are saved by the requesting user."""
+        item = self.admin.get_object(self.request, str(self.item.pk))
+        item.title = "Changed"
+
+        self.admin.save_model(self.request, item, form=None, change=True)
+
+        self.assertEqual(item.history.first().title, "Changed")
+        self.assertEqual(item.updated_by, self.request.user)
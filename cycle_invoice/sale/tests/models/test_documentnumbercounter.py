@@ -0,0 +1,14 @@
+"""Tests for the sale model DocumentNumberCounter."""
+from django.test import TestCase
+
+from cycle_invoice.sale.tests.factories import DocumentNumberCounterFactory
+
+
+class TestDocumentNumberCounter(TestCase):
+    """Tests for the sale model DocumentNumberCounter."""
+
+    def test_document_number_counter_str(self) -> None:
+        """Test DocumentNumberCounter.__str__()."""
+        counter = DocumentNumberCounterFactory.build(sequence="invoice", year=2026, last_number=42)
+
+        self.assertEqual(str(counter), "invoice 2026: 42")
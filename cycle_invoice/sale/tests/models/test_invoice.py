@@ -5,7 +5,9 @@ from django.test import TestCase
 
 from cycle_invoice.common.models import DiscountType
 from cycle_invoice.common.selectors import get_system_user
+from cycle_invoice.sale.models import Invoice
 from cycle_invoice.sale.tests.factories import DocumentItemFactory, InvoiceFactory
+from cycle_invoice.sale.utils.swiss_qr import invoice_qr_reference
 
 
 class TestInvoice(TestCase):
@@ -34,3 +36,54 @@ class TestInvoice(TestCase):
         multiplier = Decimal(1) - (Decimal(item.discount_value) / Decimal(100))
         expected = round(item.price * item.quantity * multiplier, 2)
         self.assertEqual(self.invoice.total_sum, expected)
+
+    def test_invoice_qr_reference(self) -> None:
+        """Test that the QR reference is filled in at creation and kept on updates."""
+        self.assertEqual(self.invoice.qr_reference, invoice_qr_reference(self.invoice.uuid))
+        self.invoice.header_text = "Updated"
+        self.invoice.save(user=self.system_user)
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.qr_reference, invoice_qr_reference(self.invoice.uuid))
+
+    def test_invoice_bulk_create_audited(self) -> None:
+        """Test that bulk created invoices are inserted in both tables with their QR references and history."""
+        invoices = InvoiceFactory.build_batch(2, party=self.invoice.party)
+
+        Invoice.objects.bulk_create_audited(invoices, self.system_user)
+
+        for invoice in Invoice.objects.filter(pk__in=[invoice.pk for invoice in invoices]):
+            self.assertEqual(invoice.qr_reference, invoice_qr_reference(invoice.uuid))
+            self.assertEqual((invoice.created_by, invoice.updated_by), (self.system_user, self.system_user))
+            self.assertEqual(list(invoice.history.values_list("history_type", "qr_reference")),
+                             [("+", invoice.qr_reference)])
+
+    def test_invoice_bulk_update_audited_fills_qr_reference(self) -> None:
+        """Test that bulk updated invoices without a QR reference get one, like when they are saved."""
+        Invoice.objects.filter(pk=self.invoice.pk).update(qr_reference=None)
+        invoice = Invoice.objects.get(pk=self.invoice.pk)
+        invoice.header_text = "Updated"
+
+        Invoice.objects.bulk_update_audited([invoice], ["header_text"], self.system_user)
+
+        invoice.refresh_from_db()
+        self.assertEqual((invoice.header_text, invoice.qr_reference),
+                         ("Updated", invoice_qr_reference(invoice.uuid)))
+
+    def test_invoice_save_rejects_deleted(self) -> None:
+        """Test that saving only fields of the invoice table is rejected for a soft-deleted invoice."""
+        self.invoice.delete(user=self.system_user)
+
+        self.invoice.pdf_status = Invoice.PDFStatus.PENDING
+        with self.assertRaisesMessage(ValueError, "Cannot update a soft-deleted object."):
+            self.invoice.save(update_fields=["pdf_status"], user=self.system_user)
+        self.assertEqual(Invoice.objects_with_deleted.get(pk=self.invoice.pk).pdf_status, Invoice.PDFStatus.NONE)
+
+    def test_invoice_with_invoice_total(self) -> None:
+        """Test that Invoice.objects.with_invoice_total() sums the active items in the database."""
+        DocumentItemFactory.create(document=self.invoice, party=self.invoice.party).delete(user=self.system_user)
+        empty_invoice = InvoiceFactory.create()
+
+        with self.assertNumQueries(1):
+            invoice_totals = dict(Invoice.objects.with_invoice_total().values_list("pk", "invoice_total"))
+
+        self.assertEqual(invoice_totals, {self.invoice.pk: self.item_1.total, empty_invoice.pk: Decimal(0)})
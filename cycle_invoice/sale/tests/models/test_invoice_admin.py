@@ -0,0 +1,30 @@
+"""Tests for the sale admin InvoiceAdmin."""
+from django.contrib import admin
+from django.test import RequestFactory, TestCase
+
+from cycle_invoice.common.selectors import get_system_user
+from cycle_invoice.party.tests.factories import ContactFactory
+from cycle_invoice.sale.admin import InvoiceAdmin
+from cycle_invoice.sale.models import Invoice
+from cycle_invoice.sale.tests.factories import InvoiceFactory
+
+
+class TestInvoiceAdmin(TestCase):
+    """Tests for the sale admin InvoiceAdmin."""
+
+    def setUp(self) -> None:
+        """Set up the test environment."""
+        self.admin = InvoiceAdmin(Invoice, admin.site)
+        self.request = RequestFactory().get("/")
+        self.request.user = get_system_user()
+
+    def test_party_name(self) -> None:
+        """The change list shows the names of organizations and contacts without querying each party."""
+        organization_invoice = InvoiceFactory.create(party__name="Buffet IT Services")
+        contact_invoice = InvoiceFactory.create(party=ContactFactory.create(first_name="Anna", last_name="Muster"))
+        changelist = self.admin.get_changelist_instance(self.request)
+
+        with self.assertNumQueries(1):
+            names = {invoice.pk: self.admin.party_name(invoice) for invoice in changelist.get_queryset(self.request)}
+
+        self.assertEqual(names, {organization_invoice.pk: "Buffet IT Services", contact_invoice.pk: "Anna Muster"})
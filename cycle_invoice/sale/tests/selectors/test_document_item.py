@@ -0,0 +1,38 @@
+"""Tests for the document item selectors."""
+from django.test import TestCase
+
+from cycle_invoice.sale.models import DocumentItem
+from cycle_invoice.sale.selectors.document_item import document_items_get
+from cycle_invoice.sale.tests.factories import DocumentItemFactory, InvoiceFactory
+from cycle_invoice.subscription.models import SubscriptionDocumentItem
+from cycle_invoice.subscription.tests.factories import SubscriptionDocumentItemFactory
+
+
+class TestDocumentItemsGet(TestCase):
+    """Tests for the document_items_get selector."""
+
+    def setUp(self) -> None:
+        """Create two invoices mixing plain and subscription items."""
+        self.invoices = InvoiceFactory.create_batch(2)
+        self.items = []
+        for invoice in self.invoices:
+            self.items.append(DocumentItemFactory.create(document=invoice, party=invoice.party))
+            self.items.append(SubscriptionDocumentItemFactory.create(document=invoice, party=invoice.party))
+        DocumentItemFactory.create(document=self.invoices[0], party=self.invoices[0].party, soft_deleted=True)
+        DocumentItemFactory.create(document=InvoiceFactory.create())
+
+    def test_document_items_get(self) -> None:
+        """The active items of all documents are read with one query, whatever their types."""
+        with self.assertNumQueries(1):
+            items = document_items_get([invoice.pk for invoice in self.invoices])
+
+        self.assertEqual([item.pk for item in items], [item.pk for item in self.items])
+        self.assertEqual({type(item) for item in items}, {DocumentItem})
+
+    def test_document_items_get_subclass_fields(self) -> None:
+        """The items are cast to their actual types with one more query per item type."""
+        with self.assertNumQueries(2):
+            items = document_items_get([invoice.pk for invoice in self.invoices], subclass_fields=True)
+
+        self.assertEqual([type(item) for item in items], [DocumentItem, SubscriptionDocumentItem] * 2)
+        self.assertEqual(items[1].subscription_id, self.items[1].subscription_id)
@@ -0,0 +1,44 @@
+"""Tests for the invoice selectors."""
+from decimal import Decimal
+
+from django.test import TestCase
+
+from cycle_invoice.common.selectors import get_system_user
+from cycle_invoice.sale.selectors.invoice import invoice_ids_by_qr_reference, invoice_totals
+from cycle_invoice.sale.tests.factories import DocumentItemFactory, InvoiceFactory
+from cycle_invoice.sale.utils.swiss_qr import generate_qr_reference
+
+
+class TestInvoice(TestCase):
+    """Tests behavior of the invoice selector functions."""
+
+    def test_invoice_ids_by_qr_reference(self) -> None:
+        """The invoices of many QR references are looked up with one query, unknown references are left out."""
+        invoices = InvoiceFactory.create_batch(2)
+        references = [invoice.qr_reference for invoice in invoices]
+
+        with self.assertNumQueries(1):
+            invoice_ids = invoice_ids_by_qr_reference([*references, references[0], generate_qr_reference("42")])
+
+        self.assertEqual(invoice_ids, {invoice.qr_reference: invoice.uuid for invoice in invoices})
+
+    def test_invoice_totals(self) -> None:
+        """The totals of many invoices are summed up with one query, invoices without items total zero."""
+        invoice, empty_invoice = InvoiceFactory.create_batch(2)
+        DocumentItemFactory.create(document=invoice, party=invoice.party, price=Decimal("10.00"), quantity=3)
+        DocumentItemFactory.create(document=invoice, party=invoice.party, price=Decimal("5.50"), quantity=1)
+
+        with self.assertNumQueries(1):
+            totals = invoice_totals({invoice.uuid, empty_invoice.uuid})
+
+        self.assertEqual(totals, {invoice.uuid: Decimal("35.50"), empty_invoice.uuid: Decimal(0)})
+
+    def test_invoice_selectors_include_soft_deleted(self) -> None:
+        """Soft-deleted invoices are still looked up with their totals, payments of them belong to them."""
+        invoice = InvoiceFactory.create()
+        DocumentItemFactory.create(document=invoice, party=invoice.party, price=Decimal("10.00"), quantity=1)
+        invoice.refresh_from_db()
+        invoice.delete(user=get_system_user())
+
+        self.assertEqual(invoice_ids_by_qr_reference([invoice.qr_reference]), {invoice.qr_reference: invoice.uuid})
+        self.assertEqual(invoice_totals({invoice.uuid}), {invoice.uuid: Decimal("10.00")})
@@ -0,0 +1,67 @@
+"""Tests for the invoice PDF selectors."""
+from unittest.mock import NonCallableMock, patch
+
+from django.test import TestCase
+
+from cycle_invoice.party.models import Contact
+from cycle_invoice.party.tests.factories import ContactFactory
+from cycle_invoice.sale.models import Invoice
+from cycle_invoice.sale.selectors.invoice_pdf import invoice_get_for_pdf, invoice_pdf_await, invoice_pdf_get
+from cycle_invoice.sale.tests.factories import DocumentItemFactory, InvoiceFactory
+
+
+class TestInvoicePdf(TestCase):
+    """Tests behavior of the invoice PDF selector functions."""
+
+    def test_invoice_pdf_get(self) -> None:
+        """Polling returns the invoice with its current PDF status."""
+        invoice = InvoiceFactory.create(pdf_status=Invoice.PDFStatus.RUNNING)
+        self.assertEqual(invoice_pdf_get(invoice.uuid).pdf_status, Invoice.PDFStatus.RUNNING)
+
+    def test_invoice_get_for_pdf(self) -> None:
+        """The invoice is loaded with its concrete party, address and active items in a fixed number of queries."""
+        contact = ContactFactory.create()
+        invoice = InvoiceFactory.create(party=contact)
+        items = DocumentItemFactory.create_batch(3, document=invoice, party=contact)
+        DocumentItemFactory.create(document=invoice, party=contact, soft_deleted=True)
+        invoice_get_for_pdf(invoice.uuid)
+
+        with self.assertNumQueries(3):
+            loaded_invoice, document_items = invoice_get_for_pdf(invoice.uuid)
+            self.assertIsInstance(loaded_invoice.party, Contact)
+            self.assertEqual(str(loaded_invoice.party), str(contact))
+            self.assertEqual(loaded_invoice.party.address.city, contact.address.city)
+        self.assertCountEqual([item.uuid for item in document_items], [item.uuid for item in items])
+
+    def test_invoice_pdf_get_missing(self) -> None:
+        """Polling an unknown invoice raises ValueError."""
+        with self.assertRaises(ValueError):
+            invoice_pdf_get("4398f182-3c41-480a-afc7-15387ce5511c")
+
+    @patch("cycle_invoice.sale.selectors.invoice_pdf.time.sleep")
+    def test_invoice_pdf_await(self, mock_sleep: NonCallableMock) -> None:
+        """Awaiting polls until the PDF generation is finished."""
+        invoice = InvoiceFactory.create(pdf_status=Invoice.PDFStatus.RUNNING)
+
+        def finish(_interval: float) -> None:
+            """Finish the PDF generation while the selector sleeps."""
+            Invoice.objects.filter(pk=invoice.pk).update(pdf_status=Invoice.PDFStatus.DONE, pdf_file="invoice.pdf")
+
+        mock_sleep.side_effect = finish
+
+        result = invoice_pdf_await(invoice.uuid, interval=0.1)
+
+        mock_sleep.assert_called_once_with(0.1)
+        self.assertEqual(result.pdf_status, Invoice.PDFStatus.DONE)
+        self.assertEqual(result.pdf_file, "invoice.pdf")
+
+    @patch("cycle_invoice.sale.selectors.invoice_pdf.time.sleep")
+    @patch("cycle_invoice.sale.selectors.invoice_pdf.time.monotonic", side_effect=[0, 0.5, 1.5])
+    def test_invoice_pdf_await_timeout(self, mock_monotonic: NonCallableMock, mock_sleep: NonCallableMock) -> None:
+        """Awaiting gives up after the timeout."""
+        invoice = InvoiceFactory.create(pdf_status=Invoice.PDFStatus.PENDING)
+
+        with self.assertRaises(TimeoutError):
+            invoice_pdf_await(invoice.uuid, timeout=1)
+        self.assertEqual(mock_sleep.call_count, 1)
+        self.assertEqual(mock_monotonic.call_count, 3)
@@ -0,0 +1,45 @@
+"""Tests for the document services."""
+from decimal import Decimal
+
+from django.test import TestCase
+
+from cycle_invoice.common.models import DiscountType
+from cycle_invoice.sale.models import Document
+from cycle_invoice.sale.services.document import document_totals_recompute
+from cycle_invoice.sale.tests.factories import DocumentFactory, DocumentItemFactory
+
+
+class TestDocumentTotalsRecompute(TestCase):
+    """Tests for the document_totals_recompute service."""
+
+    def setUp(self) -> None:
+        """Create documents whose stored totals are out of date."""
+        self.document, self.empty_document = DocumentFactory.create_batch(2)
+        DocumentItemFactory.create(document=self.document, party=self.document.party,
+                                   price=Decimal("10.00"), quantity=3)
+        DocumentItemFactory.create(document=self.document, party=self.document.party, price=Decimal("0.05"),
+                                   quantity=1, discount_value=50, discount_type=DiscountType.PERCENT)
+        DocumentItemFactory.create(document=self.document, party=self.document.party, price=Decimal("9.99"),
+                                   quantity=1, discount_value=Decimal("0.99"), discount_type=DiscountType.ABSOLUTE)
+        deleted_item = DocumentItemFactory.create(document=self.document, party=self.document.party)
+        deleted_item.delete(user=deleted_item.created_by)
+        Document.objects_with_deleted.update(total=Decimal("1.23"), item_count=7)
+
+    def test_document_totals_recompute(self) -> None:
+        """All documents get the sum of their active items, documents without items total zero."""
+        with self.assertNumQueries(1):
+            updated = document_totals_recompute()
+
+        self.assertEqual(updated, 2)
+        # 0.025 is rounded to even like DocumentItem.total does
+        self.assertEqual(dict(Document.objects.values_list("pk", "total")),
+                         {self.document.pk: Decimal("39.02"), self.empty_document.pk: Decimal(0)})
+        self.assertEqual(Document.objects.get(pk=self.document.pk).item_count, 3)
+
+    def test_document_totals_recompute_selected_documents(self) -> None:
+        """Only the given documents are recomputed."""
+        updated = document_totals_recompute([self.empty_document.pk])
+
+        self.assertEqual(updated, 1)
+        self.assertEqual(Document.objects.get(pk=self.document.pk).total, Decimal("1.23"))
+        self.assertEqual(Document.objects.get(pk=self.empty_document.pk).total, Decimal(0))
@@ -0,0 +1,144 @@
+"""Tests for the document number services."""
+import datetime
+from unittest.mock import patch
+
+from constance.test import override_config
+from django.db import transaction
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from cycle_invoice.common.selectors import get_system_user
+from cycle_invoice.sale.models import DocumentNumberCounter
+from cycle_invoice.sale.services.document_number import (
+    DocumentNumberFormat,
+    document_number_blocks_clear,
+    document_numbers_allocate,
+    invoice_numbers_allocate,
+)
+from cycle_invoice.sale.tests.factories import DocumentNumberCounterFactory
+
+DATE = datetime.date(2026, 3, 1)
+
+
+class TestInvoiceNumbersAllocate(TestCase):
+    """Tests for the invoice_numbers_allocate service with the default gapless yearly format."""
+
+    def setUp(self) -> None:
+        """Set up the test environment."""
+        self.user = get_system_user()
+
+    def test_invoice_numbers_allocate(self) -> None:
+        """Numbers count up per year and restart in a new year."""
+        self.assertEqual(invoice_numbers_allocate(date=DATE, count=2, user=self.user),
+                         ["RE-2026-000001", "RE-2026-000002"])
+        self.assertEqual(invoice_numbers_allocate(date=DATE, user=self.user), ["RE-2026-000003"])
+        self.assertEqual(invoice_numbers_allocate(date=datetime.date(2027, 1, 1), user=self.user),
+                         ["RE-2027-000001"])
+
+    def test_invoice_numbers_allocate_gapless_rollback(self) -> None:
+        """Numbers of a rolled back transaction are allocated again."""
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            invoice_numbers_allocate(date=DATE, user=self.user)
+            raise RuntimeError
+
+        self.assertEqual(invoice_numbers_allocate(date=DATE, user=self.user), ["RE-2026-000001"])
+
+    def test_invoice_numbers_allocate_concurrently_created_counter(self) -> None:
+        """A counter created by a concurrent transaction in the meantime is used."""
+        DocumentNumberCounterFactory.create(sequence="invoice", year=2026, last_number=41)
+
+        with patch.object(QuerySet, "first", return_value=None):
+            numbers = invoice_numbers_allocate(date=DATE, user=self.user)
+
+        self.assertEqual(numbers, ["RE-2026-000042"])
+        self.assertEqual(DocumentNumberCounter.objects.count(), 1)
+
+    def test_invoice_numbers_allocate_invalid_count(self) -> None:
+        """At least one number must be allocated."""
+        with self.assertRaisesMessage(ValueError, "The number of document numbers to allocate must be at least 1."):
+            invoice_numbers_allocate(date=DATE, count=0, user=self.user)
+
+
+@override_config(INVOICE_NUMBER_PREFIX="INV", INVOICE_NUMBER_PADDING=4, INVOICE_NUMBER_YEARLY=False,
+                 INVOICE_NUMBER_GAPLESS=False)
+@override_settings(DOCUMENT_NUMBER_BLOCK_SIZE=10)
+class TestInvoiceNumbersAllocateBlocks(TransactionTestCase):
+    """
+    Tests for the invoice_numbers_allocate service with numbers that may have gaps.
+
+    Blocks are reserved on a connection of their own inside transactions, which only sees committed data.
+    """
+
+    serialized_rollback = True
+
+    def setUp(self) -> None:
+        """Start without reserved blocks."""
+        self.user = get_system_user()
+        document_number_blocks_clear()
+        self.addCleanup(document_number_blocks_clear)
+
+    def _last_number(self) -> int:
+        """Return the last number reserved in the database."""
+        return DocumentNumberCounter.objects.get(sequence="invoice", year=0).last_number
+
+    def test_invoice_numbers_allocate_from_block(self) -> None:
+        """Numbers are handed out from a reserved block without querying the database."""
+        self.assertEqual(invoice_numbers_allocate(date=DATE, user=self.user), ["INV0001"])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(invoice_numbers_allocate(date=DATE, count=2, user=self.user), ["INV0002", "INV0003"])
+        self.assertEqual(self._last_number(), 10)
+
+        numbers = invoice_numbers_allocate(date=DATE, count=8, user=self.user)
+        self.assertEqual(numbers, [f"INV{number:04d}" for number in range(4, 12)])
+        self.assertEqual(self._last_number(), 20)
+
+    def test_invoice_numbers_allocate_large_count(self) -> None:
+        """A block is at least as large as the numbers allocated at once."""
+        numbers = invoice_numbers_allocate(date=DATE, count=25, user=self.user)
+
+        self.assertEqual(numbers[-1], "INV0025")
+        self.assertEqual(self._last_number(), 25)
+
+    def test_invoice_numbers_allocate_block_rollback(self) -> None:
+        """A block reserved in a transaction is committed on its own and kept if the transaction is rolled back."""
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.assertEqual(invoice_numbers_allocate(date=DATE, user=self.user), ["INV0001"])
+            raise RuntimeError
+
+        self.assertEqual(self._last_number(), 10)
+        with self.assertNumQueries(0):
+            self.assertEqual(invoice_numbers_allocate(date=DATE, user=self.user), ["INV0002"])
+
+    def test_invoice_numbers_allocate_blocks_in_one_transaction(self) -> None:
+        """Several allocations in one transaction use up the reserved blocks before reserving new ones."""
+        with transaction.atomic():
+            self.assertEqual(invoice_numbers_allocate(date=DATE, user=self.user), ["INV0001"])
+            numbers = invoice_numbers_allocate(date=DATE, count=15, user=self.user)
+
+        self.assertEqual(numbers, [f"INV{number:04d}" for number in range(2, 17)])
+        self.assertEqual(invoice_numbers_allocate(date=DATE, user=self.user), ["INV0017"])
+        self.assertEqual(self._last_number(), 20)
+
+    @override_settings(DOCUMENT_NUMBER_BLOCK_LOCK_TIMEOUT=0.1)
+    def test_invoice_numbers_allocate_block_after_gapless(self) -> None:
+        """Reserving a block fails instead of waiting for a counter the transaction locked with gapless numbers."""
+        gapless_format = DocumentNumberFormat(prefix="INV", padding=4, yearly=False, gapless=True)
+        with (self.assertRaisesMessage(RuntimeError, "Could not reserve a block of 'invoice' numbers within 0.1 "
+                                                     "seconds"),
+              transaction.atomic()):
+            document_numbers_allocate("invoice", gapless_format, date=DATE, user=self.user)
+            invoice_numbers_allocate(date=DATE, user=self.user)
+
+        self.assertFalse(DocumentNumberCounter.objects.exists())
+
+    def test_invoice_numbers_allocate_audited(self) -> None:
+        """Reserving a block updates the counter with its audit fields and history."""
+        invoice_numbers_allocate(date=DATE, user=self.user)
+        document_number_blocks_clear()
+        invoice_numbers_allocate(date=DATE, user=self.user)
+
+        counter = DocumentNumberCounter.objects.get(sequence="invoice", year=0)
+        self.assertEqual(counter.updated_by, self.user)
+        self.assertEqual(list(counter.history.values_list("history_type", "last_number")),
+                         [("~", 20), ("~", 10), ("+", 0)])
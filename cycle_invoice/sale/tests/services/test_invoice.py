@@ -0,0 +1,36 @@
+"""Tests for the invoice services."""
+from django.test import TestCase
+
+from cycle_invoice.sale.models import Invoice
+from cycle_invoice.sale.services.invoice import invoice_qr_reference_backfill
+from cycle_invoice.sale.tests.factories import InvoiceFactory
+from cycle_invoice.sale.utils.swiss_qr import invoice_qr_reference
+
+
+class TestInvoiceQrReferenceBackfill(TestCase):
+    """Tests for the invoice_qr_reference_backfill service."""
+
+    def setUp(self) -> None:
+        """Create invoices as they were before their QR reference was stored."""
+        self.invoices = InvoiceFactory.create_batch(3)
+        self.invoices[2].delete(user=self.invoices[2].created_by)
+        Invoice.objects_with_deleted.update(qr_reference=None)
+
+    def test_invoice_qr_reference_backfill(self) -> None:
+        """All invoices, including soft-deleted ones, get their QR reference in batches."""
+        backfilled = invoice_qr_reference_backfill(batch_size=1)
+
+        self.assertEqual(backfilled, 3)
+        self.assertEqual(dict(Invoice.objects_with_deleted.values_list("uuid", "qr_reference")),
+                         {invoice.uuid: invoice_qr_reference(invoice.uuid) for invoice in self.invoices})
+
+    def test_invoice_qr_reference_backfill_keeps_stored_references(self) -> None:
+        """Invoices that already have a QR reference are not updated again."""
+        invoice_qr_reference_backfill()
+
+        self.assertEqual(invoice_qr_reference_backfill(), 0)
+
+    def test_invoice_qr_reference_backfill_invalid_batch_size(self) -> None:
+        """A batch size below one is rejected."""
+        with self.assertRaises(ValueError):
+            invoice_qr_reference_backfill(batch_size=0)
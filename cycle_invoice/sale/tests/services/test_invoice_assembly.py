@@ -0,0 +1,88 @@
+"""Tests for the invoice assembly services."""
+import datetime
+from decimal import Decimal
+
+from django.test import TestCase
+
+from cycle_invoice.common.selectors import get_system_user
+from cycle_invoice.party.tests.factories import OrganizationFactory
+from cycle_invoice.sale.models import DocumentItem, Invoice
+from cycle_invoice.sale.services.invoice_assembly import _invoices_assemble_parties, invoices_assemble
+from cycle_invoice.sale.tests.factories import DocumentItemFactory, InvoiceFactory
+from cycle_invoice.sale.utils.swiss_qr import invoice_qr_reference
+from cycle_invoice.subscription.models import SubscriptionDocumentItem
+from cycle_invoice.subscription.services.subscription import subscription_extension
+from cycle_invoice.subscription.tests.factories import SubscriptionFactory
+
+DATE = datetime.date(2026, 3, 1)
+DUE_DATE = datetime.date(2026, 3, 31)
+
+
+class TestInvoicesAssemble(TestCase):
+    """Tests for the invoices_assemble service."""
+
+    def setUp(self) -> None:
+        """Create open items of two parties, next to an invoiced and a deleted item."""
+        self.user = get_system_user()
+        self.parties = OrganizationFactory.create_batch(2)
+        self.items = [
+            DocumentItemFactory.create(party=self.parties[0], price=Decimal("10.00"), quantity=2),
+            DocumentItemFactory.create(party=self.parties[0], price=Decimal("5.50"), quantity=1),
+            DocumentItemFactory.create(party=self.parties[1], price=Decimal("7.25"), quantity=4),
+        ]
+        subscription = SubscriptionFactory.create(party=self.parties[0])
+        subscription_extension(subscription.uuid, user=self.user)
+        self.subscription_item = SubscriptionDocumentItem.objects.get(subscription=subscription)
+
+        self.invoiced_item = DocumentItemFactory.create(document=InvoiceFactory.create(), party=self.parties[0])
+        DocumentItemFactory.create(party=self.parties[1]).delete(user=self.user)
+
+    def test_invoices_assemble(self) -> None:
+        """Every party with open items gets one invoice with its items, totals, number and history."""
+        assembled = invoices_assemble(date=DATE, due_date=DUE_DATE, user=self.user, batch_size=1)
+
+        self.assertEqual(assembled, 2)
+        invoices = {invoice.party_id: invoice for invoice in Invoice.objects.filter(date=DATE)}
+        self.assertEqual(set(invoices), {party.uuid for party in self.parties})
+        self.assertEqual(sorted(invoice.document_number for invoice in invoices.values()),
+                         ["RE-2026-000001", "RE-2026-000002"])
+
+        first, second = invoices[self.parties[0].uuid], invoices[self.parties[1].uuid]
+        self.assertEqual((first.total, first.item_count), (Decimal("25.50") + self.subscription_item.total, 3))
+        self.assertEqual((second.total, second.item_count), (Decimal("29.00"), 1))
+        for invoice in (first, second):
+            self.assertEqual(invoice.qr_reference, invoice_qr_reference(invoice.uuid))
+            self.assertEqual((invoice.due_date, invoice.created_by, invoice.updated_by),
+                             (DUE_DATE, self.user, self.user))
+            self.assertEqual(Invoice.objects.with_invoice_total().get(pk=invoice.pk).invoice_total, invoice.total)
+            self.assertEqual(list(invoice.history.values_list("history_type", "history_user")), [("+", self.user.pk)])
+
+        self.assertEqual(set(DocumentItem.objects.filter(document=first).values_list("pk", flat=True)),
+                         {self.items[0].pk, self.items[1].pk, self.subscription_item.pk})
+        self.assertEqual(DocumentItem.objects.get(pk=self.items[2].pk).document_id, second.pk)
+        self.assertNotEqual(DocumentItem.objects.get(pk=self.invoiced_item.pk).document_id, first.pk)
+
+        # Every item type records the change in its own history
+        self.subscription_item.refresh_from_db()
+        self.assertEqual(self.subscription_item.history.first().document_id, first.pk)
+        self.assertEqual(self.subscription_item.history.count(), 2)
+        self.assertEqual(DocumentItem.history.filter(uuid=self.items[0].pk).first().document_id, first.pk)
+
+    def test_invoices_assemble_without_open_items(self) -> None:
+        """Items that are already invoiced are not assembled again."""
+        invoices_assemble(date=DATE, due_date=DUE_DATE, user=self.user)
+
+        self.assertEqual(invoices_assemble(date=DATE, due_date=DUE_DATE, user=self.user), 0)
+        self.assertEqual(Invoice.objects.filter(date=DATE).count(), 2)
+
+    def test_invoices_assemble_concurrently_attached_items(self) -> None:
+        """Parties whose items were attached concurrently get no invoice."""
+        party = OrganizationFactory.create()
+
+        self.assertEqual(_invoices_assemble_parties((party.uuid,), date=DATE, due_date=DUE_DATE, user=self.user), 0)
+        self.assertFalse(Invoice.objects.filter(party=party).exists())
+
+    def test_invoices_assemble_invalid_batch_size(self) -> None:
+        """The batch size must be positive."""
+        with self.assertRaisesMessage(ValueError, "The batch size must be positive, got 0."):
+            invoices_assemble(date=DATE, due_date=DUE_DATE, user=self.user, batch_size=0)
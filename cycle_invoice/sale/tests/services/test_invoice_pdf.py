@@ -0,0 +1,175 @@
+"""Tests for the invoice PDF services."""
+import tempfile
+from unittest.mock import NonCallableMock, patch
+
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from cycle_invoice.common.selectors import get_system_user
+from cycle_invoice.sale.models import Invoice
+from cycle_invoice.sale.services.invoice_pdf import (
+    invoice_pdf_done,
+    invoice_pdf_failed,
+    invoice_pdf_request,
+    invoice_pdf_running,
+    invoice_pdf_store,
+)
+from cycle_invoice.sale.tests.factories import InvoiceFactory
+from cycle_invoice.sale.utils.invoice_pdf_generation import PDFContent
+
+
+class TestInvoicePdf(TestCase):
+    """Tests behavior of the invoice PDF service functions."""
+
+    def setUp(self) -> None:
+        """Create an invoice without a PDF."""
+        self.invoice = InvoiceFactory.create()
+
+    def test_invoice_pdf_request(self) -> None:
+        """Requesting a PDF marks the invoice as pending and queues the task after the commit."""
+        with (patch("cycle_invoice.sale.tasks.invoice_pdf_generate.apply_async") as mock_apply_async,
+              self.captureOnCommitCallbacks(execute=True)):
+            invoice = invoice_pdf_request(self.invoice, user=get_system_user())
+            mock_apply_async.assert_not_called()
+
+        self.assertEqual(invoice.pdf_status, Invoice.PDFStatus.PENDING)
+        self.assertNotEqual(invoice.pdf_task_id, "")
+        mock_apply_async.assert_called_once_with(args=(self.invoice.uuid,), kwargs={"force": False},
+                                                 task_id=invoice.pdf_task_id)
+
+    def test_invoice_pdf_request_again(self) -> None:
+        """A failed PDF can be requested again, which clears the previous error."""
+        invoice = InvoiceFactory.create(pdf_status=Invoice.PDFStatus.FAILED, pdf_error="ValueError: broken")
+
+        invoice = invoice_pdf_request(invoice, user=get_system_user())
+
+        self.assertEqual(invoice.pdf_status, Invoice.PDFStatus.PENDING)
+        self.assertEqual(invoice.pdf_error, "")
+
+    def test_invoice_pdf_request_block_queued(self) -> None:
+        """A PDF cannot be requested while it is already being generated."""
+        invoice = InvoiceFactory.create(pdf_status=Invoice.PDFStatus.RUNNING)
+        with self.assertRaises(ValueError):
+            invoice_pdf_request(invoice, user=get_system_user())
+
+    def test_invoice_pdf_request_locks_invoice(self) -> None:
+        """The status is checked on the locked row, so a stale invoice cannot queue the PDF twice."""
+        stale_invoice = Invoice.objects.get(pk=self.invoice.pk)
+        invoice_pdf_request(self.invoice, user=get_system_user())
+
+        with self.assertRaises(ValueError):
+            invoice_pdf_request(stale_invoice, user=get_system_user())
+
+    def test_invoice_pdf_lifecycle(self) -> None:
+        """A pending PDF generation runs and finishes with the name of the stored PDF."""
+        invoice = InvoiceFactory.create(pdf_status=Invoice.PDFStatus.PENDING)
+
+        invoice = invoice_pdf_running(invoice)
+        self.assertEqual(invoice.pdf_status, Invoice.PDFStatus.RUNNING)
+
+        invoice = invoice_pdf_done(invoice, "invoice_a1b2.pdf", "f" * 64)
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.pdf_status, Invoice.PDFStatus.DONE)
+        self.assertEqual(invoice.pdf_file, "invoice_a1b2.pdf")
+        self.assertEqual(invoice.pdf_fingerprint, "f" * 64)
+        self.assertEqual(invoice.history.count(), 3)
+
+    def test_invoice_pdf_failed(self) -> None:
+        """A running PDF generation can fail with an error."""
+        invoice = InvoiceFactory.create(pdf_status=Invoice.PDFStatus.RUNNING)
+
+        invoice = invoice_pdf_failed(invoice, "ValueError: broken")
+
+        self.assertEqual(invoice.pdf_status, Invoice.PDFStatus.FAILED)
+        self.assertEqual(invoice.pdf_error, "ValueError: broken")
+
+    def test_invoice_pdf_block_wrong_status(self) -> None:
+        """Status changes are only allowed in the order of the PDF generation."""
+        with self.assertRaises(ValueError):
+            invoice_pdf_running(self.invoice)
+        with self.assertRaises(ValueError):
+            invoice_pdf_done(self.invoice, "invoice.pdf", "f" * 64)
+        with self.assertRaises(ValueError):
+            invoice_pdf_failed(self.invoice, "ValueError: broken")
+
+
+@override_settings(STORAGES={
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}
+})
+@patch("cycle_invoice.sale.services.invoice_pdf.render_invoice_pdf")
+@patch("cycle_invoice.sale.services.invoice_pdf.add_qr_bill", return_value={"qr_bill_svg": "<svg>QR</svg>"})
+@patch("cycle_invoice.sale.services.invoice_pdf.generate_invoice_context")
+class TestInvoicePdfStore(TestCase):
+    """Tests behavior of the invoice_pdf_store service function."""
+
+    def setUp(self) -> None:
+        """Create an invoice and store its PDFs in a temporary media root."""
+        self.media_root = tempfile.TemporaryDirectory()
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root.name))
+        self.addCleanup(self.media_root.cleanup)
+        self.invoice = InvoiceFactory.create()
+
+    def _store(self, mock_generate_context: NonCallableMock, mock_render_invoice_pdf: NonCallableMock,
+               total_sum: str = "100.00", *, force: bool = False) -> tuple[str, bool]:
+        """Store the PDF of the invoice for a render context with the given total."""
+        mock_generate_context.return_value = {"invoice_details": {"total_sum": total_sum}}
+        mock_render_invoice_pdf.return_value = PDFContent(b"%PDF", f"invoice_{self.invoice.uuid}.pdf")
+        return invoice_pdf_store(self.invoice, force=force)
+
+    def test_invoice_pdf_store_renders_new(self, mock_generate_context: NonCallableMock,
+                                           mock_add_qr_bill: NonCallableMock,
+                                           mock_render_invoice_pdf: NonCallableMock) -> None:
+        """The first PDF of an invoice is rendered, saved and fingerprinted."""
+        pdf_file, rendered = self._store(mock_generate_context, mock_render_invoice_pdf)
+
+        self.assertTrue(rendered)
+        mock_render_invoice_pdf.assert_called_once_with(self.invoice.uuid, mock_add_qr_bill.return_value)
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.pdf_file, pdf_file)
+        self.assertEqual(len(self.invoice.pdf_fingerprint), 64)
+        with default_storage.open(pdf_file) as file:
+            self.assertEqual(file.read(), b"%PDF")
+
+    def test_invoice_pdf_store_reuses_unchanged(self, mock_generate_context: NonCallableMock,
+                                                mock_add_qr_bill: NonCallableMock,
+                                                mock_render_invoice_pdf: NonCallableMock) -> None:
+        """The saved PDF is reused as long as the render context does not change."""
+        pdf_file, _ = self._store(mock_generate_context, mock_render_invoice_pdf)
+
+        self.assertEqual(self._store(mock_generate_context, mock_render_invoice_pdf), (pdf_file, False))
+        self.assertEqual(mock_render_invoice_pdf.call_count, 1)
+        self.assertEqual(mock_add_qr_bill.call_count, 1)
+
+    def test_invoice_pdf_store_renders_changed(self, mock_generate_context: NonCallableMock,
+                                               mock_add_qr_bill: NonCallableMock,
+                                               mock_render_invoice_pdf: NonCallableMock) -> None:
+        """A changed render context renders the PDF again."""
+        self._store(mock_generate_context, mock_render_invoice_pdf)
+        fingerprint = self.invoice.pdf_fingerprint
+
+        _, rendered = self._store(mock_generate_context, mock_render_invoice_pdf, total_sum="120.00")
+
+        self.assertTrue(rendered)
+        self.assertNotEqual(self.invoice.pdf_fingerprint, fingerprint)
+        self.assertEqual(mock_add_qr_bill.call_count, 2)
+
+    def test_invoice_pdf_store_renders_missing_file(self, mock_generate_context: NonCallableMock,
+                                                    mock_add_qr_bill: NonCallableMock,
+                                                    mock_render_invoice_pdf: NonCallableMock) -> None:
+        """A PDF that vanished from the storage is rendered again."""
+        pdf_file, _ = self._store(mock_generate_context, mock_render_invoice_pdf)
+        default_storage.delete(pdf_file)
+
+        self.assertTrue(self._store(mock_generate_context, mock_render_invoice_pdf)[1])
+        self.assertEqual(mock_add_qr_bill.call_count, 2)
+
+    def test_invoice_pdf_store_force(self, mock_generate_context: NonCallableMock,
+                                     mock_add_qr_bill: NonCallableMock,
+                                     mock_render_invoice_pdf: NonCallableMock) -> None:
+        """Forcing renders the PDF even if the saved PDF is up to date."""
+        self._store(mock_generate_context, mock_render_invoice_pdf)
+
+        self.assertTrue(self._store(mock_generate_context, mock_render_invoice_pdf, force=True)[1])
+        self.assertEqual(mock_render_invoice_pdf.call_count, 2)
+        self.assertEqual(mock_add_qr_bill.call_count, 2)
@@ -1,10 +1,22 @@
 """Tests for sale tasks."""
 import datetime
+from unittest.mock import NonCallableMock, patch
+from uuid import UUID
 
 from dateutil.relativedelta import relativedelta
 from django.test import TestCase
 
-from cycle_invoice.sale.tasks import subscription_processing_to_document_items
+from cycle_invoice.common.models import User
+from cycle_invoice.common.selectors import get_system_user
+from cycle_invoice.sale.models import Invoice
+from cycle_invoice.sale.tasks import (
+    _invoice_pdf_generate_failure,
+    invoice_assembly_from_open_items,
+    invoice_pdf_generate,
+    subscription_processing_to_document_items,
+)
+from cycle_invoice.sale.tests.factories import DocumentItemFactory, InvoiceFactory
+from cycle_invoice.subscription.services.subscription import subscription_extension
 from cycle_invoice.subscription.tests.factories import SubscriptionFactory
 
 
@@ -29,3 +41,103 @@ class TasksTest(TestCase):
         subscription2.refresh_from_db()
         self.assertEqual(today + relativedelta(years=1), subscription1.end_billed_date)
         self.assertEqual(today + relativedelta(months=1), subscription2.end_billed_date)
+
+    def test_subscription_processing_to_document_items_system_user_once(self) -> None:
+        """The system user is resolved once for all subscriptions to bill."""
+        today = datetime.datetime.now(tz=datetime.UTC).date()
+        SubscriptionFactory.create_batch(3, start_date=today, end_billed_date=today)
+
+        with patch("cycle_invoice.sale.tasks.get_system_user", wraps=get_system_user) as mock_get_system_user:
+            subscription_processing_to_document_items.apply()
+
+        mock_get_system_user.assert_called_once_with()
+
+    def test_subscription_processing_to_document_items_batches(self) -> None:
+        """The subscriptions are billed in batches, with the history of every change."""
+        today = datetime.datetime.now(tz=datetime.UTC).date()
+        subscriptions = SubscriptionFactory.create_batch(3, start_date=today, end_billed_date=today)
+
+        with patch("cycle_invoice.sale.tasks.SUBSCRIPTION_BILLING_BATCH_SIZE", 2):
+            subscription_processing_to_document_items.apply()
+
+        for subscription in subscriptions:
+            subscription.refresh_from_db()
+            self.assertEqual(subscription.end_billed_date, today + relativedelta(years=1))
+            self.assertEqual(list(subscription.history.values_list("history_type", flat=True)), ["~", "+"])
+            self.assertEqual(subscription.document_item.get().history.count(), 1)
+
+    def test_subscription_processing_to_document_items_failure(self) -> None:
+        """A failing subscription is logged and rolled back without the others of its batch, then fails the task."""
+        today = datetime.datetime.now(tz=datetime.UTC).date()
+        failing, billed = SubscriptionFactory.create_batch(2, start_date=today, end_billed_date=today)
+
+        def extension(subscription_uuid: UUID, user: User) -> None:
+            subscription_extension(subscription_uuid, user=user)
+            if subscription_uuid == failing.uuid:
+                raise RuntimeError
+
+        with (patch("cycle_invoice.sale.tasks.subscription_extension", side_effect=extension),
+              self.assertLogs("cycle_invoice.sale.tasks", level="ERROR") as logs):
+            result = subscription_processing_to_document_items.apply()
+
+        self.assertTrue(result.failed())
+        self.assertIsInstance(result.result, ExceptionGroup)
+        self.assertEqual(len(result.result.exceptions), 1)
+        self.assertIn(f"Billing subscription {failing.uuid} failed.", logs.output[0])
+        failing.refresh_from_db()
+        billed.refresh_from_db()
+        self.assertEqual(failing.end_billed_date, today)
+        self.assertEqual(list(failing.history.values_list("history_type", flat=True)), ["+"])
+        self.assertEqual(billed.end_billed_date, today + relativedelta(years=1))
+        self.assertEqual(list(billed.history.values_list("history_type", flat=True)), ["~", "+"])
+
+    def test_invoice_assembly_from_open_items(self) -> None:
+        """Test that the task assembles the open items into invoices due after the payment term."""
+        today = datetime.datetime.now(tz=datetime.UTC).date()
+        item = DocumentItemFactory.create()
+
+        with self.assertLogs("cycle_invoice.sale.tasks", level="INFO"):
+            self.assertEqual(invoice_assembly_from_open_items.apply().get(), 1)
+
+        invoice = Invoice.objects.get()
+        self.assertEqual((invoice.party, invoice.date, invoice.due_date),
+                         (item.party, today, today + datetime.timedelta(days=30)))
+
+    @patch("cycle_invoice.sale.tasks.invoice_pdf_render", return_value=("invoice_a1b2.pdf", "f" * 64, True))
+    def test_invoice_pdf_generate(self, mock_invoice_pdf_render: NonCallableMock) -> None:
+        """Test that the task stores the PDF and marks the invoice as done with one save."""
+        invoice = InvoiceFactory.create(pdf_status=Invoice.PDFStatus.PENDING)
+
+        self.assertEqual(invoice_pdf_generate(invoice.uuid, force=True), "invoice_a1b2.pdf")
+
+        self.assertEqual(mock_invoice_pdf_render.call_args.args[0], invoice)
+        self.assertEqual(mock_invoice_pdf_render.call_args.kwargs, {"force": True})
+        invoice.refresh_from_db()
+        self.assertEqual((invoice.pdf_status, invoice.pdf_file, invoice.pdf_fingerprint),
+                         (Invoice.PDFStatus.DONE, "invoice_a1b2.pdf", "f" * 64))
+        self.assertEqual([record.pdf_status for record in invoice.history.all()],
+                         [Invoice.PDFStatus.DONE, Invoice.PDFStatus.RUNNING, Invoice.PDFStatus.PENDING])
+
+    def test_invoice_pdf_generate_fail(self) -> None:
+        """Test that a failing PDF generation marks the invoice as failed."""
+        invoice = InvoiceFactory.create(pdf_status=Invoice.PDFStatus.PENDING)
+
+        with (patch("cycle_invoice.sale.tasks.invoice_pdf_render", side_effect=ValueError("QR reference is invalid")),
+              self.assertLogs("cycle_invoice.sale.tasks", level="WARNING")):
+            result = invoice_pdf_generate.apply(args=(invoice.uuid,))
+
+        self.assertTrue(result.failed())
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.pdf_status, Invoice.PDFStatus.FAILED)
+        self.assertEqual(invoice.pdf_error, "ValueError: QR reference is invalid")
+
+    def test_invoice_pdf_generate_missing_invoice(self) -> None:
+        """Test that the task fails for an unknown invoice."""
+        with self.assertRaises(ValueError):
+            invoice_pdf_generate("4398f182-3c41-480a-afc7-15387ce5511c")
+
+    def test__invoice_pdf_generate_failure_missing_invoice_raises(self) -> None:
+        """If the invoice is not found, ValueError is raised."""
+        with self.assertLogs("cycle_invoice.sale.tasks", level="WARNING"), self.assertRaises(ValueError):
+            _invoice_pdf_generate_failure(None, Exception("render error"), None,
+                                          ("4398f182-3c41-480a-afc7-15387ce5511c",), {}, None)
@@ -0,0 +1,83 @@
+"""Test cases for the local asset fetcher of the PDF generation."""
+import tempfile
+from pathlib import Path
+from unittest.mock import NonCallableMock, patch
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from cycle_invoice.sale.utils.asset_fetcher import LocalAssetFetcher, read_media_asset, read_static_asset
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"}
+}
+
+
+@override_settings(STORAGES=STORAGES)
+class LocalAssetFetcherTest(TestCase):
+    """Test cases for the local asset fetcher of the PDF generation."""
+
+    def setUp(self) -> None:
+        """Start every test with empty asset caches."""
+        read_static_asset.cache_clear()
+        read_media_asset.cache_clear()
+        self.fetcher = LocalAssetFetcher("http://invoices.local/")
+
+    def test_fetch_static_asset_from_finders(self) -> None:
+        """Test that a static asset is read from the static directories when it is not collected."""
+        result = self.fetcher("http://invoices.local/static/sale/images/logo.svg?v=1")
+
+        expected = (Path(settings.BASE_DIR) / "static" / "sale" / "images" / "logo.svg").read_bytes()
+        self.assertEqual(result["string"], expected)
+        self.assertEqual(result["mime_type"], "image/svg+xml")
+        self.assertEqual(result["redirected_url"], "http://invoices.local/static/sale/images/logo.svg?v=1")
+
+    def test_fetch_static_asset_from_static_root(self) -> None:
+        """Test that a collected static asset is read from STATIC_ROOT."""
+        with tempfile.TemporaryDirectory() as static_root:
+            (Path(static_root) / "logo.3f2a.svg").write_bytes(b"<svg>collected</svg>")
+            with override_settings(STATIC_ROOT=static_root):
+                result = self.fetcher("http://invoices.local/static/logo.3f2a.svg")
+
+        self.assertEqual(result["string"], b"<svg>collected</svg>")
+
+    def test_fetch_static_asset_missing(self) -> None:
+        """Test that a missing static asset raises FileNotFoundError."""
+        with self.assertRaisesMessage(FileNotFoundError, "Static file sale/images/missing.svg not found"):
+            self.fetcher("http://invoices.local/static/sale/images/missing.svg")
+
+    def test_fetch_static_asset_cached(self) -> None:
+        """Test that the bytes of a static asset are read only once."""
+        with patch("cycle_invoice.sale.utils.asset_fetcher.finders.find",
+                   return_value=str(Path(settings.BASE_DIR) / "static" / "sale" / "images" / "web.svg")) as mock_find:
+            first = self.fetcher("http://invoices.local/static/sale/images/web.svg")
+            second = LocalAssetFetcher("http://invoices.local/")("http://invoices.local/static/sale/images/web.svg")
+
+        mock_find.assert_called_once_with("sale/images/web.svg")
+        self.assertEqual(first["string"], second["string"])
+
+    def test_fetch_media_asset(self) -> None:
+        """Test that a media asset, e.g. the company logo of constance, is read from the default storage."""
+        with tempfile.TemporaryDirectory() as media_root:
+            (Path(media_root) / "constance").mkdir()
+            (Path(media_root) / "constance" / "company logo.png").write_bytes(b"PNG")
+            with override_settings(MEDIA_URL="/media/", MEDIA_ROOT=media_root):
+                result = LocalAssetFetcher("http://invoices.local/")(
+                    "http://invoices.local/media/constance/company%20logo.png")
+
+        self.assertEqual(result["string"], b"PNG")
+        self.assertEqual(result["mime_type"], "image/png")
+
+    def test_fetch_remote_url_refused(self) -> None:
+        """Test that URLs which do not point to a local asset are not fetched."""
+        with self.assertRaisesMessage(ValueError, "Refusing to fetch https://example.com/logo.svg"):
+            self.fetcher("https://example.com/logo.svg")
+
+    @patch("cycle_invoice.sale.utils.asset_fetcher.default_url_fetcher")
+    def test_fetch_data_url(self, mock_default_url_fetcher: NonCallableMock) -> None:
+        """Test that inline data URLs are decoded by WeasyPrint's default fetcher."""
+        mock_default_url_fetcher.return_value = {"string": b"<svg></svg>"}
+
+        self.assertEqual(self.fetcher("data:image/svg+xml;utf8,%3Csvg%3E%3C/svg%3E"), {"string": b"<svg></svg>"})
+        mock_default_url_fetcher.assert_called_once_with("data:image/svg+xml;utf8,%3Csvg%3E%3C/svg%3E")
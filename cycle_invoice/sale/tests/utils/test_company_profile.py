@@ -0,0 +1,57 @@
+"""Tests for the company profile."""
+import os
+from unittest.mock import patch
+
+from constance import config
+from django.test import TestCase
+
+from cycle_invoice.sale.utils.company_profile import COMPANY_PROFILE_CACHE_SECONDS, get_company_profile
+
+
+class TestCompanyProfile(TestCase):
+    """Tests behavior of the cached company profile."""
+
+    def setUp(self) -> None:
+        """Start every test with an empty cache."""
+        get_company_profile.cache_clear()
+        self.addCleanup(get_company_profile.cache_clear)
+
+    @patch.dict(os.environ, {"COMPANY_NAME": "", "COMPANY_CITY": "Bern"})
+    def test_get_company_profile(self) -> None:
+        """The profile is merged from the environment and constance."""
+        profile = get_company_profile()
+
+        self.assertEqual(profile.name, config.COMPANY_NAME)
+        self.assertEqual(profile.city, "Bern")
+        self.assertEqual(profile.as_context()["company_name"], config.COMPANY_NAME)
+        self.assertEqual(profile.as_context()["city"], "Bern")
+
+    @patch.dict(os.environ, {"COMPANY_NAME": "Velo AG"})
+    def test_get_company_profile_environment_first(self) -> None:
+        """The company name from the environment takes precedence over constance."""
+        self.assertEqual(get_company_profile().name, "Velo AG")
+
+    @patch.dict(os.environ, {"COMPANY_NAME": ""})
+    def test_get_company_profile_cached(self) -> None:
+        """The profile is loaded once and reloaded after a constance setting changed."""
+        profile = get_company_profile()
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_company_profile(), profile)
+
+        config.COMPANY_NAME = "Velo GmbH"
+
+        self.assertEqual(get_company_profile().name, "Velo GmbH")
+
+    @patch.dict(os.environ, {"COMPANY_NAME": ""})
+    def test_get_company_profile_expires(self) -> None:
+        """The profile is loaded again once it expired, so changes made by other processes are picked up."""
+        with patch("cycle_invoice.common.utils.time.monotonic", return_value=1000.0) as mock_monotonic:
+            profile = get_company_profile()
+            # Changed by another process, this one receives no signal
+            with patch("cycle_invoice.sale.utils.company_profile.config") as mock_config:
+                mock_config.COMPANY_NAME = "Velo GmbH"
+                self.assertIs(get_company_profile(), profile)
+
+                mock_monotonic.return_value += COMPANY_PROFILE_CACHE_SECONDS
+                self.assertEqual(get_company_profile().name, "Velo GmbH")
@@ -0,0 +1,128 @@
+"""Test cases for the batch invoice PDF generation."""
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any, Self
+from unittest.mock import MagicMock, NonCallableMock, patch
+
+from django.test import TestCase, override_settings
+
+from cycle_invoice.sale.tests.factories import InvoiceFactory
+from cycle_invoice.sale.utils.invoice_pdf_batch import _init_worker, _render_and_store, generate_invoice_pdfs
+
+
+class SynchronousExecutor:
+    """Stand-in for ProcessPoolExecutor that runs the submitted calls right away."""
+
+    instances: list["SynchronousExecutor"] = []
+
+    def __init__(self, **kwargs) -> None:
+        """Remember the arguments the pool was created with."""
+        self.kwargs = kwargs
+        SynchronousExecutor.instances.append(self)
+
+    def __enter__(self) -> Self:
+        """Enter the executor context."""
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Leave the executor context."""
+
+    def submit(self, fn: Callable[..., Any], *args: object, **kwargs: object) -> Future:
+        """Run the call and return its completed future."""
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as exc:  # noqa: BLE001
+            future.set_exception(exc)
+        return future
+
+
+def render_and_store(invoice_id: str, *, force: bool) -> tuple[str, bool]:
+    """Pretend to render an invoice, failing for the invoice `broken` and reusing the PDF of `b`."""
+    if invoice_id == "broken":
+        error_message = "QR reference is invalid"
+        raise ValueError(error_message)
+    return f"invoice_{invoice_id}.pdf", force or invoice_id != "b"
+
+
+@override_settings(INVOICE_PDF_BATCH_WORKERS=4)
+class InvoicePDFBatchTest(TestCase):
+    """Test cases for the batch invoice PDF generation."""
+
+    def setUp(self) -> None:
+        """Reset the recorded executors."""
+        SynchronousExecutor.instances = []
+
+    @patch("cycle_invoice.sale.utils.invoice_pdf_batch._render_and_store", side_effect=render_and_store)
+    @patch("cycle_invoice.sale.utils.invoice_pdf_batch.ProcessPoolExecutor", SynchronousExecutor)
+    @patch("cycle_invoice.sale.utils.invoice_pdf_batch.connections")
+    def test_generate_invoice_pdfs_process_pool(self, mock_connections: NonCallableMock,
+                                                mock_render_and_store: NonCallableMock) -> None:
+        """Test that the invoices are fanned out to a warmed process pool and failures do not abort the batch."""
+        on_result = MagicMock()
+        mock_connections.all.return_value = [MagicMock(in_atomic_block=False)]
+
+        with self.assertLogs("cycle_invoice.sale.utils.invoice_pdf_batch", level="ERROR"):
+            result = generate_invoice_pdfs(["a", "broken", "b"], on_result=on_result)
+
+        executor = SynchronousExecutor.instances[0]
+        self.assertEqual(executor.kwargs["max_workers"], 4)
+        self.assertIs(executor.kwargs["initializer"], _init_worker)
+        self.assertEqual(executor.kwargs["mp_context"].get_start_method(), "fork")
+        mock_render_and_store.assert_any_call("a", force=False)
+        self.assertEqual(result.generated, {"a": "invoice_a.pdf", "b": "invoice_b.pdf"})
+        self.assertEqual(result.unchanged, {"b"})
+        self.assertEqual(result.failed, {"broken": "ValueError: QR reference is invalid"})
+        self.assertFalse(result.ok)
+        self.assertEqual(on_result.call_count, 3)
+        on_result.assert_any_call("broken", None, "ValueError: QR reference is invalid")
+        mock_connections.close_all.assert_called_once_with()
+
+    @patch("cycle_invoice.sale.utils.invoice_pdf_batch.ProcessPoolExecutor", SynchronousExecutor)
+    def test_generate_invoice_pdfs_process_pool_in_transaction(self) -> None:
+        """Test that no process pool is started inside a transaction, whose connection would be closed."""
+        with self.assertRaisesMessage(ValueError, "cannot be generated in worker processes inside a transaction"):
+            generate_invoice_pdfs(["a"])
+
+        self.assertEqual(SynchronousExecutor.instances, [])
+
+    @patch("cycle_invoice.sale.utils.invoice_pdf_batch._render_and_store", side_effect=render_and_store)
+    @patch("cycle_invoice.sale.utils.invoice_pdf_batch.ProcessPoolExecutor", SynchronousExecutor)
+    def test_generate_invoice_pdfs_single_worker(self, mock_render_and_store: NonCallableMock) -> None:
+        """Test that a single worker renders the invoices in the current process."""
+        with self.assertLogs("cycle_invoice.sale.utils.invoice_pdf_batch", level="ERROR") as logs:
+            result = generate_invoice_pdfs(["a", "broken"], workers=1)
+
+        self.assertEqual(SynchronousExecutor.instances, [])
+        mock_render_and_store.assert_any_call("a", force=False)
+        self.assertEqual(result.generated, {"a": "invoice_a.pdf"})
+        self.assertEqual(result.failed, {"broken": "ValueError: QR reference is invalid"})
+        self.assertIn("Failed to generate the PDF of invoice broken", logs.output[0])
+
+    @patch("cycle_invoice.sale.utils.invoice_pdf_batch._render_and_store", side_effect=render_and_store)
+    def test_generate_invoice_pdfs_ok(self, mock_render_and_store: NonCallableMock) -> None:
+        """Test that a batch without failures is ok and forcing renders up-to-date PDFs again."""
+        result = generate_invoice_pdfs(["b"], workers=1, force=True)
+        mock_render_and_store.assert_called_once_with("b", force=True)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.unchanged, set())
+
+    @patch("cycle_invoice.sale.utils.invoice_pdf_batch.HTML")
+    def test_init_worker(self, mock_html: NonCallableMock) -> None:
+        """Test that the worker initializer renders a warm-up document."""
+        _init_worker()
+        mock_html.return_value.write_pdf.assert_called_once_with()
+
+    @patch("cycle_invoice.sale.utils.invoice_pdf_batch.invoice_pdf_store", return_value=("invoice_x1.pdf", True))
+    def test_render_and_store(self, mock_invoice_pdf_store: NonCallableMock) -> None:
+        """Test that an invoice is stored through the cached PDF service."""
+        invoice = InvoiceFactory.create()
+
+        self.assertEqual(_render_and_store(str(invoice.uuid), force=False), ("invoice_x1.pdf", True))
+        self.assertEqual(mock_invoice_pdf_store.call_args.args[0], invoice)
+        self.assertEqual(mock_invoice_pdf_store.call_args.kwargs, {"force": False})
+
+    def test_render_and_store_missing_invoice(self) -> None:
+        """Test that an unknown invoice raises ValueError."""
+        with self.assertRaisesMessage(ValueError, "Invoice 4398f182-3c41-480a-afc7-15387ce5511c not found."):
+            _render_and_store("4398f182-3c41-480a-afc7-15387ce5511c", force=False)
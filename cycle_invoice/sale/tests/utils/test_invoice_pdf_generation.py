@@ -2,10 +2,10 @@
 import hashlib
 import os
 from io import BytesIO
-from typing import Any
+from typing import IO, Any
 from unittest.mock import NonCallableMock, patch
 
-from django.http import HttpRequest
+from django.core.files.base import File
 from django.test import TestCase, override_settings
 from pypdf import PdfReader
 from reportlab.lib.pagesizes import A4
@@ -13,16 +13,28 @@ from reportlab.pdfgen import canvas
 
 from cycle_invoice.common.selectors import get_system_user
 from cycle_invoice.sale.tests.factories import DocumentItemFactory, InvoiceFactory
+from cycle_invoice.sale.utils.asset_fetcher import LocalAssetFetcher
+from cycle_invoice.sale.utils.company_profile import CompanyProfile, get_company_profile
 from cycle_invoice.sale.utils.invoice_pdf_generation import (
     PDFContent,
+    _invoice_template_digest,
     add_page_numbers_to_pdf,
     add_pdf_to_storage,
+    build_invoice_pdf,
     generate_content,
     generate_html_invoice,
+    generate_html_invoice_document,
     generate_html_qr_page,
     generate_invoice_pdf,
     generate_pdf_from_html,
+    invoice_pdf_fingerprint,
 )
+from cycle_invoice.sale.utils.swiss_qr import invoice_qr_reference
+
+
+def write_pdf(_html_content: str, target: IO[bytes]) -> None:
+    """Pretend to render a PDF into the target stream."""
+    target.write(b"%PDF")
 
 
 @override_settings(STORAGES={
@@ -97,6 +109,9 @@ class InvoicePDFGenerationTest(TestCase):
         os.environ["COMPANY_CITY"] = "Zurich"
         os.environ["COMPANY_COUNTRY"] = "Switzerland"
         os.environ["COMPANY_BANK_ACCOUNT"] = "CH12 3456 7890 1234 5678 9"
+        # Load the company profile from the environment above
+        get_company_profile.cache_clear()
+        self.addCleanup(get_company_profile.cache_clear)
 
         self.user = get_system_user()
 
@@ -110,8 +125,9 @@ class InvoicePDFGenerationTest(TestCase):
     def test_generate_content(self, mock_qr: object) -> None:
         """Test that prepare_invoice_context returns the expected dictionary."""
 
-        def _mock_generate_qr(ctx: dict[str, Any]) -> None:
+        def _mock_generate_qr(ctx: dict[str, Any], company: CompanyProfile) -> None:
             """Setzt das erwartete qr_bill_svg im übergebenen Kontext."""
+            self.assertEqual(company, get_company_profile())
             ctx.update({"qr_bill_svg": "<svg>QR</svg>"})
 
         mock_qr.side_effect = _mock_generate_qr
@@ -133,6 +149,7 @@ class InvoicePDFGenerationTest(TestCase):
         self.assertEqual(context["invoice_details"]["total_sum"], str(self.invoice.total_sum))
         self.assertEqual(context["invoice_details"]["invoice_number"], self.invoice.document_number)
         self.assertEqual(context["invoice_details"]["invoice_primary_key"], self.invoice.pk)
+        self.assertEqual(context["invoice_details"]["qr_reference"], invoice_qr_reference(self.invoice.uuid))
         self.assertEqual(context["invoice_details"]["created_date"], self.invoice.date.strftime("%d.%m.%Y"))
         self.assertEqual(context["invoice_details"]["due_date"], self.invoice.due_date.strftime("%d.%m.%Y"))
         self.assertEqual(context["invoice_details"]["header_text"], self.invoice.header_text)
@@ -160,13 +177,26 @@ class InvoicePDFGenerationTest(TestCase):
         self.assertFalse(context["show_page_number"])
         self.assertEqual("<svg>QR</svg>", context["qr_bill_svg"])
 
+    @patch("cycle_invoice.sale.utils.invoice_pdf_generation.generate_swiss_qr")
+    def test_generate_content_query_count(self, mock_qr: NonCallableMock) -> None:
+        """Test that generate_content needs the same number of queries however many items an invoice has."""
+        generate_content(self.invoice.pk)
+        DocumentItemFactory.create_batch(20, document=self.invoice, party=self.invoice.party)
+
+        with self.assertNumQueries(3):
+            context = generate_content(self.invoice.pk)
+
+        self.assertEqual(len(context["invoice_items"]), 22)
+        self.assertEqual(context["invoice_details"]["total_sum"], str(self.invoice.total_sum))
+        self.assertEqual(mock_qr.call_count, 2)
+
     def test_generate_html_invoice(self) -> None:
         """Test that generate_html_invoice renders the invoice HTML template with context."""
         html = generate_html_invoice(self.context)
         html_hash = hashlib.sha256(html.encode()).hexdigest()
         self.assertIsInstance(html, str)
         self.assertTrue(html.startswith("<!DOCTYPE html>"))
-        self.assertEqual("f359a8bdb72a7e54cc7c3ff7eddbb875a89e5ab49d288f47b76bf393dd872985", html_hash)
+        self.assertEqual("0daaeb37d7b3a672154bae44d8c0a7fa87c0f0195d4b70d0b30e8541ec52ac62", html_hash)
 
     def test_generate_html_qr_page(self) -> None:
         """Test that generate_html_qr_page returns the expected HTML for the QR bill."""
@@ -174,7 +204,49 @@ class InvoicePDFGenerationTest(TestCase):
         html_hash = hashlib.sha256(html.encode()).hexdigest()
         self.assertIsInstance(html, str)
         self.assertTrue(html.startswith("<!DOCTYPE html>"))
-        self.assertEqual("e6aa4a5590a7734fd58148e214bee49285d4d3199482dab18241c85855bcf160", html_hash)
+        self.assertEqual("3bf1d51f7103c99d2555f0088076e5f8f223dd35324579b7db7b3ddfbc2db31b", html_hash)
+
+    def test_generate_html_invoice_document(self) -> None:
+        """Test that generate_html_invoice_document renders the invoice with the QR page appended."""
+        html = generate_html_invoice_document(self.context)
+        html_hash = hashlib.sha256(html.encode()).hexdigest()
+        self.assertIsInstance(html, str)
+        self.assertTrue(html.startswith("<!DOCTYPE html>"))
+        self.assertIn('<div class="qr-page">', html)
+        self.assertIn('<div class="qr-slip"><svg>QR</svg></div>', html)
+        self.assertEqual("224632a548c1e1609e5849f3024734e7da46c208961c4945fbcf4b91d072eb23", html_hash)
+
+    def test_invoice_pdf_fingerprint(self) -> None:
+        """Test that the fingerprint depends on the content of the context only."""
+        reordered = dict(reversed(self.context.items()))
+        changed = {**self.context, "invoice_details": {**self.context["invoice_details"], "total_sum": "0.00"}}
+
+        fingerprint = invoice_pdf_fingerprint(self.context)
+        self.assertEqual(len(fingerprint), 64)
+        self.assertEqual(fingerprint, invoice_pdf_fingerprint(reordered))
+        self.assertNotEqual(fingerprint, invoice_pdf_fingerprint(changed))
+
+    def test_invoice_pdf_fingerprint_layout_version(self) -> None:
+        """Test that bumping the layout version changes the fingerprint."""
+        fingerprint = invoice_pdf_fingerprint(self.context)
+        self.addCleanup(_invoice_template_digest.cache_clear)
+
+        _invoice_template_digest.cache_clear()
+        with patch("cycle_invoice.sale.utils.invoice_pdf_generation.INVOICE_PDF_LAYOUT_VERSION", 2):
+            self.assertNotEqual(fingerprint, invoice_pdf_fingerprint(self.context))
+
+    def test_generate_html_invoice_without_qr_page(self) -> None:
+        """Test that generate_html_invoice does not append the QR page."""
+        html = generate_html_invoice(self.context)
+        self.assertNotIn('<div class="qr-page">', html)
+
+    def test_generate_html_invoice_css_page_numbers(self) -> None:
+        """Test that the invoice template sets the page numbers with CSS counters when requested."""
+        html = generate_html_invoice({**self.context, "show_page_number": True})
+        self.assertIn("@bottom-right", html)
+        self.assertIn("target-counter(url(#invoice-end), page)", html)
+        self.assertIn('<div id="invoice-end"></div>', html)
+        self.assertNotIn("@bottom-right", generate_html_invoice(self.context))
 
     def test_generate_pdf_from_html(self) -> None:
         """Test that generate_pdf_from_html returns PDF bytes for valid HTML input."""
@@ -185,6 +257,19 @@ class InvoicePDFGenerationTest(TestCase):
         self.assertGreater(len(pdf_bytes), 100)  # Should be a non-trivial PDF
         self.assertTrue(pdf_bytes.startswith(b"%PDF"))
 
+    @override_settings(INVOICE_PDF_BASE_URL="http://invoices.local/")
+    @patch("cycle_invoice.sale.utils.invoice_pdf_generation.HTML")
+    def test_generate_pdf_from_html_local_assets(self, mock_html: NonCallableMock) -> None:
+        """Test that generate_pdf_from_html reads the assets through the local asset fetcher."""
+        mock_html.return_value.render.return_value.write_pdf.return_value = b"%PDF"
+
+        self.assertEqual(generate_pdf_from_html("<html></html>"), b"%PDF")
+
+        kwargs = mock_html.call_args.kwargs
+        self.assertEqual(kwargs["base_url"], "http://invoices.local/")
+        self.assertIsInstance(kwargs["url_fetcher"], LocalAssetFetcher)
+        self.assertEqual(kwargs["url_fetcher"].static_url, "http://invoices.local/static/")
+
     def test_add_page_numbers_to_pdf(self) -> None:
         """Test that add_page_numbers_to_pdf adds page numbers to a PDF."""
         buffer = BytesIO()
@@ -210,6 +295,113 @@ class InvoicePDFGenerationTest(TestCase):
         self.assertIn("Seite 1 von 2", text_page1)
         self.assertIn("Seite 2 von 2", text_page2)
 
+    def test_add_page_numbers_to_pdf_unnumbered_trailing_pages(self) -> None:
+        """Test that add_page_numbers_to_pdf neither numbers nor counts trailing pages."""
+        buffer = BytesIO()
+        c = canvas.Canvas(buffer, pagesize=A4)
+        for text in ("Invoice 1", "Invoice 2", "QR"):
+            c.drawString(100, 750, text)
+            c.showPage()
+        c.save()
+
+        numbered_pdf_stream = add_page_numbers_to_pdf(buffer.getvalue(), unnumbered_trailing_pages=1)
+        reader = PdfReader(numbered_pdf_stream)
+        self.assertEqual(len(reader.pages), 3)
+        self.assertIn("Seite 1 von 2", reader.pages[0].extract_text())
+        self.assertIn("Seite 2 von 2", reader.pages[1].extract_text())
+        self.assertNotIn("Seite", reader.pages[2].extract_text())
+
+    def test_add_page_numbers_to_pdf_stream(self) -> None:
+        """Test that add_page_numbers_to_pdf reads a PDF stream and writes into the given target."""
+        buffer = BytesIO()
+        c = canvas.Canvas(buffer, pagesize=A4)
+        c.drawString(100, 750, "Invoice")
+        c.save()
+        target = BytesIO()
+
+        numbered_pdf_stream = add_page_numbers_to_pdf(buffer, target=target)
+
+        self.assertIs(numbered_pdf_stream, target)
+        self.assertEqual(target.tell(), 0)
+        self.assertIn("Seite 1 von 1", PdfReader(target).pages[0].extract_text())
+
+    @patch("cycle_invoice.sale.utils.invoice_pdf_generation.add_pdf_to_storage")
+    @patch("cycle_invoice.sale.utils.invoice_pdf_generation.generate_content")
+    @patch("cycle_invoice.sale.utils.invoice_pdf_generation.generate_html_invoice_document")
+    @patch("cycle_invoice.sale.utils.invoice_pdf_generation.generate_pdf_from_html")
+    @patch("cycle_invoice.sale.utils.invoice_pdf_generation.add_page_numbers_to_pdf")
+    def test_generate_invoice_pdf_single_pass(self, mock_add_page_numbers: NonCallableMock,
+                                              mock_generate_pdf_from_html: NonCallableMock,
+                                              mock_generate_html_invoice_document: NonCallableMock,
+                                              mock_generate_content: NonCallableMock,
+                                              mock_add_pdf_to_storage: NonCallableMock) -> None:
+        """Test that generate_invoice_pdf renders the invoice and the QR page with a single WeasyPrint pass."""
+        mock_generate_content.return_value = {"qr_bill_svg": "<svg>QR</svg>"}
+        mock_generate_html_invoice_document.return_value = "<html>Invoice and QR</html>"
+        mock_generate_pdf_from_html.side_effect = write_pdf
+
+        generate_invoice_pdf(42)
+
+        mock_generate_content.assert_called_once_with(42)
+        mock_generate_html_invoice_document.assert_called_once_with(
+            {"qr_bill_svg": "<svg>QR</svg>", "show_page_number": True})
+        self.assertEqual(mock_generate_pdf_from_html.call_args.args, ("<html>Invoice and QR</html>",))
+        # Page numbers are set during layout, the rendered PDF is streamed to the storage as is
+        mock_add_page_numbers.assert_not_called()
+        pdf_content = mock_add_pdf_to_storage.call_args[0][0]
+        self.assertIs(pdf_content.content, mock_generate_pdf_from_html.call_args.kwargs["target"])
+        pdf_content.content.seek(0)
+        self.assertEqual(pdf_content.content.read(), b"%PDF")
+        self.assertEqual(pdf_content.filename, "invoice_42.pdf")
+
+    @patch("cycle_invoice.sale.utils.invoice_pdf_generation.add_pdf_to_storage")
+    @patch("cycle_invoice.sale.utils.invoice_pdf_generation.generate_content")
+    @patch("cycle_invoice.sale.utils.invoice_pdf_generation.generate_html_invoice_document")
+    @patch("cycle_invoice.sale.utils.invoice_pdf_generation.generate_pdf_from_html")
+    @patch("cycle_invoice.sale.utils.invoice_pdf_generation.add_page_numbers_to_pdf")
+    def test_generate_invoice_pdf_overlay_page_numbers(self, mock_add_page_numbers: NonCallableMock,
+                                                       mock_generate_pdf_from_html: NonCallableMock,
+                                                       mock_generate_html_invoice_document: NonCallableMock,
+                                                       mock_generate_content: NonCallableMock,
+                                                       mock_add_pdf_to_storage: NonCallableMock) -> None:
+        """Test that generate_invoice_pdf stamps the page numbers onto the PDF when the overlay is requested."""
+        mock_generate_content.return_value = {"qr_bill_svg": "<svg>QR</svg>"}
+        mock_generate_html_invoice_document.return_value = "<html>Invoice and QR</html>"
+        mock_generate_pdf_from_html.side_effect = write_pdf
+        mock_add_page_numbers.return_value = BytesIO(b"%PDF numbered")
+
+        generate_invoice_pdf(42, overlay_page_numbers=True)
+
+        mock_generate_html_invoice_document.assert_called_once_with(
+            {"qr_bill_svg": "<svg>QR</svg>", "show_page_number": False})
+        rendered_stream = mock_generate_pdf_from_html.call_args.kwargs["target"]
+        self.assertIs(mock_add_page_numbers.call_args.args[0], rendered_stream)
+        self.assertEqual(mock_add_page_numbers.call_args.kwargs["unnumbered_trailing_pages"], 1)
+        # The rendered PDF is released as soon as the numbered copy exists
+        self.assertTrue(rendered_stream.closed)
+        pdf_content = mock_add_pdf_to_storage.call_args[0][0]
+        self.assertEqual(pdf_content.content.getvalue(), b"%PDF numbered")
+        self.assertEqual(pdf_content.filename, "invoice_42.pdf")
+
+    @patch("cycle_invoice.sale.utils.invoice_pdf_generation.generate_content")
+    @patch("cycle_invoice.sale.utils.invoice_pdf_generation.generate_html_invoice_document")
+    @patch("cycle_invoice.sale.utils.invoice_pdf_generation.generate_pdf_from_html")
+    def test_build_invoice_pdf(self, mock_generate_pdf_from_html: NonCallableMock,
+                               mock_generate_html_invoice_document: NonCallableMock,
+                               mock_generate_content: NonCallableMock) -> None:
+        """Test that build_invoice_pdf returns the rendered invoice without saving it."""
+        mock_generate_content.return_value = {"qr_bill_svg": "<svg>QR</svg>"}
+        mock_generate_html_invoice_document.return_value = "<html>Invoice and QR</html>"
+        mock_generate_pdf_from_html.side_effect = write_pdf
+
+        with patch("cycle_invoice.sale.utils.invoice_pdf_generation.default_storage") as mock_default_storage:
+            pdf_content = build_invoice_pdf(42)
+
+        mock_default_storage.save.assert_not_called()
+        self.assertEqual(pdf_content.filename, "invoice_42.pdf")
+        pdf_content.content.seek(0)
+        self.assertEqual(pdf_content.content.read(), b"%PDF")
+
     @patch("cycle_invoice.sale.utils.invoice_pdf_generation.generate_content")
     @patch("cycle_invoice.sale.utils.invoice_pdf_generation.generate_html_invoice")
     @patch("cycle_invoice.sale.utils.invoice_pdf_generation.generate_html_qr_page")
@@ -248,17 +440,9 @@ class InvoicePDFGenerationTest(TestCase):
         mock_generate_pdf_from_html.side_effect = [valid_pdf_invoice, valid_pdf_qr]
         mock_add_page_numbers.return_value = BytesIO(valid_pdf_invoice)
 
-        # Prepare request
-        request = HttpRequest()
-
-        def build_absolute_uri(path: str = "/") -> str:
-            """Simulate a request to the test server with the given path."""
-            return f"https://testserver{path}"
-
-        request.build_absolute_uri = build_absolute_uri
-
         # Call the function
-        generate_invoice_pdf(request, 42)
+        with patch("cycle_invoice.sale.utils.invoice_pdf_generation.add_pdf_to_storage") as mock_add_pdf_to_storage:
+            generate_invoice_pdf(42, single_pass=False, overlay_page_numbers=True)
 
         # Check mocks called as expected
         mock_generate_content.assert_called_once_with(42)
@@ -266,6 +450,26 @@ class InvoicePDFGenerationTest(TestCase):
         mock_generate_html_qr_page.assert_called_once()
         self.assertEqual(mock_generate_pdf_from_html.call_count, 2)
         mock_add_page_numbers.assert_called_once()
+        pdf_content = mock_add_pdf_to_storage.call_args[0][0]
+        pdf_content.content.seek(0)
+        self.assertEqual(len(PdfReader(pdf_content.content).pages), 2)
+
+    @patch("cycle_invoice.sale.utils.invoice_pdf_generation.default_storage")
+    def test_add_pdf_to_storage_stream(self, mock_default_storage: NonCallableMock) -> None:
+        """Test that add_pdf_to_storage hands a PDF stream to the storage without copying it and closes it."""
+        stream = BytesIO(b"PDFDATA")
+        stream.seek(3)
+
+        def save(name: str, content: File) -> str:
+            """Check the stream is passed through, rewound to its start."""
+            self.assertIs(content.file, stream)
+            self.assertEqual(content.read(), b"PDFDATA")
+            return name
+
+        mock_default_storage.save.side_effect = save
+
+        self.assertEqual(add_pdf_to_storage(PDFContent(stream, "test_invoice.pdf")), "test_invoice.pdf")
+        self.assertTrue(stream.closed)
 
     @patch("cycle_invoice.sale.utils.invoice_pdf_generation.default_storage")
     @patch("cycle_invoice.sale.utils.invoice_pdf_generation.ContentFile")
@@ -274,8 +478,10 @@ class InvoicePDFGenerationTest(TestCase):
         """Test that add_pdf_to_storage saves the PDF to default storage with correct filename and content."""
         # Prepare PDFContent
         pdf_content = PDFContent(content=b"PDFDATA", filename="test_invoice.pdf")
+        mock_default_storage.save.return_value = "test_invoice_a1b2c3.pdf"
         # Call the function
-        add_pdf_to_storage(pdf_content)
+        name = add_pdf_to_storage(pdf_content)
+        self.assertEqual(name, "test_invoice_a1b2c3.pdf")
         # Check ContentFile called with correct content
         mock_content_file.assert_called_once_with(b"PDFDATA")
         # Check default_storage.save called with correct filename and ContentFile
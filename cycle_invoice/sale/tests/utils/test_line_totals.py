@@ -0,0 +1,76 @@
+"""Tests for the integer-cents totals engine."""
+import random
+from decimal import Decimal
+
+from django.test import TestCase
+
+from cycle_invoice.accounting.tests.factories import AccountFactory
+from cycle_invoice.common.models import DiscountType
+from cycle_invoice.party.tests.factories import OrganizationFactory
+from cycle_invoice.sale.models import DocumentItem
+from cycle_invoice.sale.tests.factories import DocumentItemFactory, InvoiceFactory
+from cycle_invoice.sale.tests.models.test_documentitem import random_amount
+from cycle_invoice.sale.utils.line_totals import cash_round, compute_document_totals, compute_line_totals, format_cents
+
+
+class TestLineTotals(TestCase):
+    """Tests for the integer-cents totals engine."""
+
+    def test_compute_line_totals_matches_properties(self) -> None:
+        """The formatted line totals equal the string properties and totals of the items."""
+        rng = random.Random(20240615)  # noqa: S311
+        samples = [
+            (Decimal("0.05"), Decimal(1), Decimal(50), DiscountType.PERCENT),
+            (Decimal("0.15"), Decimal("0.50"), Decimal(0), DiscountType.ABSOLUTE),
+            (Decimal("10.00"), Decimal(1), Decimal("12.50"), DiscountType.ABSOLUTE),
+            (Decimal("19.99"), Decimal(3), Decimal(100), DiscountType.PERCENT),
+        ]
+        for _ in range(200):
+            discount_type = rng.choice(DiscountType.values)
+            maximum_discount = 100 if discount_type == DiscountType.PERCENT else 10000
+            samples.append((random_amount(rng, 10000), random_amount(rng, 100), random_amount(rng, maximum_discount),
+                            discount_type))
+        party = OrganizationFactory.create()
+        account = AccountFactory.create()
+        for price, quantity, discount_value, discount_type in samples:
+            DocumentItemFactory.create(price=price, quantity=quantity, discount_value=discount_value,
+                                       discount_type=discount_type, party=party, account=account)
+        items = list(DocumentItem.objects.all())
+
+        totals = compute_line_totals(items)
+
+        for item, line in zip(items, totals.lines, strict=True):
+            self.assertEqual((line.quantity, line.price, line.discount, line.total),
+                             (item.quantity_str, item.price_str, item.discount_str, item.total_str))
+        self.assertEqual(Decimal(totals.total), sum(item.total for item in items))
+
+    def test_compute_line_totals_empty(self) -> None:
+        """A document without items sums to zero."""
+        totals = compute_line_totals([])
+
+        self.assertEqual(totals.lines, [])
+        self.assertEqual((totals.total, totals.cash_rounded_total), ("0.00", "0.00"))
+
+    def test_compute_document_totals(self) -> None:
+        """The items of many documents are summed per document."""
+        invoices = InvoiceFactory.create_batch(2)
+        for invoice, prices in zip(invoices, (["10.01", "0.01"], ["7.50"]), strict=True):
+            for price in prices:
+                DocumentItemFactory.create(document=invoice, party=invoice.party, price=Decimal(price), quantity=1)
+
+        totals = compute_document_totals(DocumentItem.objects.order_by("price"))
+
+        self.assertEqual({document_id: (document_totals.total, document_totals.cash_rounded_total)
+                          for document_id, document_totals in totals.items()},
+                         {invoices[0].uuid: ("10.02", "10.00"), invoices[1].uuid: ("7.50", "7.50")})
+        self.assertEqual([line.price for line in totals[invoices[0].uuid].lines], ["0.01", "10.01"])
+
+    def test_cash_round(self) -> None:
+        """Cents are rounded to the nearest 0.05, also for credits."""
+        self.assertEqual([cash_round(cents) for cents in (1001, 1002, 1003, 1007, 1008, -1002, -1003)],
+                         [1000, 1000, 1005, 1005, 1010, -1000, -1005])
+
+    def test_format_cents(self) -> None:
+        """Cents are formatted with two decimal places like a decimal amount."""
+        self.assertEqual([format_cents(cents) for cents in (0, 5, 123456, -5, -1250)],
+                         ["0.00", "0.05", "1234.56", "-0.05", "-12.50"])
@@ -0,0 +1,99 @@
+"""Tests for the stage timing of the invoice PDF generation."""
+from io import BytesIO
+from unittest.mock import NonCallableMock, patch
+
+from django.test import TestCase, override_settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from cycle_invoice.sale.utils.invoice_pdf_generation import add_page_numbers_to_pdf, generate_pdf_from_html
+from cycle_invoice.sale.utils.pdf_metrics import PDFStageMetric, pdf_stage
+
+SINK = f"{__name__}.collect_metric"
+collected_metrics: list[PDFStageMetric] = []
+
+
+def collect_metric(metric: PDFStageMetric) -> None:
+    """Metrics sink collecting the stage metrics of a test."""
+    collected_metrics.append(metric)
+
+
+def failing_sink(_metric: PDFStageMetric) -> None:
+    """Metrics sink that is broken."""
+    error_message = "Sink unavailable"
+    raise ConnectionError(error_message)
+
+
+@override_settings(INVOICE_PDF_METRICS_SINK=SINK)
+class TestPdfStage(TestCase):
+    """Tests behavior of the pdf_stage context manager."""
+
+    def setUp(self) -> None:
+        """Start every test with an empty sink."""
+        collected_metrics.clear()
+
+    def test_pdf_stage(self) -> None:
+        """A stage is logged and handed to the sink with its duration and size."""
+        with self.assertLogs("cycle_invoice.sale.utils.pdf_metrics", level="DEBUG") as logs, \
+                pdf_stage("layout") as stage:
+            stage.size = 1024
+
+        self.assertEqual(collected_metrics, [stage])
+        self.assertGreater(stage.duration, 0)
+        self.assertFalse(stage.failed)
+        self.assertIn("Invoice PDF stage layout finished", logs.output[0])
+        self.assertIn("(1024 bytes)", logs.output[0])
+
+    def test_pdf_stage_failed(self) -> None:
+        """A stage that raises is recorded as failed and the error is propagated."""
+        with self.assertRaises(ValueError), pdf_stage("storage"):
+            raise ValueError
+
+        self.assertEqual(len(collected_metrics), 1)
+        self.assertTrue(collected_metrics[0].failed)
+        self.assertIsNone(collected_metrics[0].size)
+
+    @override_settings(INVOICE_PDF_METRICS_SINK="")
+    def test_pdf_stage_without_sink(self) -> None:
+        """Without a sink the stages are only logged."""
+        with self.assertLogs("cycle_invoice.sale.utils.pdf_metrics", level="DEBUG") as logs, pdf_stage("merge"):
+            pass
+
+        self.assertEqual(collected_metrics, [])
+        self.assertIn("(unknown bytes)", logs.output[0])
+
+    @override_settings(INVOICE_PDF_METRICS_SINK=f"{__name__}.failing_sink")
+    def test_pdf_stage_sink_failure(self) -> None:
+        """A broken sink is logged and does not break the PDF generation."""
+        with self.assertLogs("cycle_invoice.sale.utils.pdf_metrics", level="ERROR") as logs, pdf_stage("html"):
+            pass
+
+        self.assertIn("Invoice PDF metrics sink", logs.output[0])
+
+    def test_add_page_numbers_to_pdf_stage(self) -> None:
+        """Page numbering reports the size of the numbered PDF."""
+        buffer = BytesIO()
+        c = canvas.Canvas(buffer, pagesize=A4)
+        c.drawString(100, 750, "Invoice")
+        c.save()
+
+        numbered_pdf_stream = add_page_numbers_to_pdf(buffer.getvalue())
+
+        self.assertEqual([metric.stage for metric in collected_metrics], ["page_numbers"])
+        self.assertEqual(collected_metrics[0].size, len(numbered_pdf_stream.getvalue()))
+
+    @patch("cycle_invoice.sale.utils.invoice_pdf_generation.HTML")
+    def test_generate_pdf_from_html_stages(self, mock_html: NonCallableMock) -> None:
+        """Layout and PDF serialization are measured separately, the size is taken from the target stream."""
+        target = BytesIO()
+
+        def write_pdf(target: BytesIO) -> None:
+            """Pretend to serialize the PDF into the target stream."""
+            target.write(b"%PDF-1.7")
+
+        mock_html.return_value.render.return_value.write_pdf.side_effect = write_pdf
+
+        generate_pdf_from_html("<html></html>", target=target)
+
+        self.assertEqual([metric.stage for metric in collected_metrics], ["layout", "write_pdf"])
+        self.assertEqual(collected_metrics[1].size, 8)
@@ -1,14 +1,51 @@
 """Test cases for the Swiss QR utils."""
 import hashlib
+import random
+from unittest.mock import patch
+from uuid import UUID
 
 from django.test import TestCase
+from qrbill import QRBill
 
-from cycle_invoice.sale.utils.swiss_qr import generate_qr_reference, generate_swiss_qr, modulo10_recursive
+from cycle_invoice.sale.utils.company_profile import CompanyProfile
+from cycle_invoice.sale.utils.swiss_qr import (
+    MODULO10_TABLE,
+    generate_qr_reference,
+    generate_qr_references,
+    generate_swiss_qr,
+    invoice_qr_reference,
+    modulo10_recursive,
+    render_qr_bill_svg,
+    validate_qr_reference,
+    validate_qr_references,
+)
 
 
 class SwissQRTest(TestCase):
     """Test cases for the Swiss QR utils."""
 
+    def setUp(self) -> None:
+        """Start every test with an empty QR bill cache."""
+        render_qr_bill_svg.cache_clear()
+        self.company = CompanyProfile(name="Test AG", address="Teststrasse 1", registration_id=None, email=None,
+                                      phone=None, website=None, zip_code="8000", city="Zürich", country="Schweiz",
+                                      bank_account="CH4431999123000889012")
+        self.context_data = {
+            "customer": {
+                "name": "Max Mustermann",
+                "street": "Musterweg 2",
+                "postal_code": "4000",
+                "city": "Basel",
+                "country": "Schweiz",
+            },
+            "invoice_details": {
+                "invoice_number": "2024-001",
+                "invoice_primary_key": "12345",
+                "qr_reference": generate_qr_reference("12345"),
+                "total_sum": "123.45",
+            },
+        }
+
     def test_modulo10_recursive_basic(self) -> None:
         """Test the modulo10_recursive function with standard examples from the Swiss QR Standard Annex B and others."""
         self.assertEqual(modulo10_recursive("21000000000313947143000901"), "7")
@@ -16,6 +53,7 @@ class SwissQRTest(TestCase):
         self.assertEqual(modulo10_recursive("12345600010388500100001918"), "8")
         self.assertEqual(modulo10_recursive("21000000000313947143000901"), "7")
         self.assertEqual(modulo10_recursive("00000000000000000000012345"), "7")
+        self.assertEqual(modulo10_recursive(""), "0")
 
     def test_generate_qr_reference_length_and_check(self) -> None:
         """Test that generate_qr_reference returns a reference of length 27 and that the check digit is correct."""
@@ -25,36 +63,59 @@ class SwissQRTest(TestCase):
         self.assertTrue(ref.__contains__(base))
         self.assertEqual(ref[-1], modulo10_recursive(ref[:-1]))
 
+    def test_modulo10_recursive_matches_digit_by_digit(self) -> None:
+        """Test that the chunked carry table gives the same check digits as the digit by digit algorithm."""
+        for length in range(1, 31):
+            number = "".join(random.choices("0123456789", k=length))  # noqa: S311
+            carry = 0
+            for digit in number:
+                carry = MODULO10_TABLE[(int(digit) + carry) % 10]
+            self.assertEqual(modulo10_recursive(number), str((10 - carry) % 10), number)
+
+    def test_modulo10_recursive_rejects_non_digits(self) -> None:
+        """Test that modulo10_recursive only accepts ASCII digits."""
+        for number in ["12a4", "12_34", "+1234", "\uff11\uff12\uff13"]:
+            with self.assertRaises(ValueError):
+                modulo10_recursive(number)
+
+    def test_generate_qr_references(self) -> None:
+        """Test that generate_qr_references generates the references in the order of the base numbers."""
+        base_numbers = ["12345", 42, "21000000000313947143000901"]
+        references = generate_qr_references(base_numbers)
+        self.assertEqual(references, [generate_qr_reference(base) for base in base_numbers])
+        self.assertEqual(references[2], "210000000003139471430009017")
+
+    def test_validate_qr_references(self) -> None:
+        """Test that validate_qr_references accepts valid references and rejects malformed ones."""
+        references = [
+            "210000000003139471430009017",
+            "21 00000 00003 13947 14300 09017",
+            "210000000003139471430009018",
+            "21000000000313947143000901",
+            "2100000000031394714300090177",
+            "21000000000313947143000901a",
+            "21000000000313947143000_017",
+            "\uff12\uff110000000003139471430009017",
+        ]
+        self.assertEqual(validate_qr_references(references), [True, True, False, False, False, False, False, False])
+        self.assertTrue(all(validate_qr_references(generate_qr_references(range(0, 10**26, 10**21 + 7)))))
+
+    def test_invoice_qr_reference(self) -> None:
+        """Test that invoice_qr_reference builds a valid reference from the lowest 26 digits of the UUID."""
+        invoice_id = UUID("4398f182-3c41-480a-afc7-15387ce5511c")
+        reference = invoice_qr_reference(invoice_id)
+        self.assertEqual(reference[:-1], str(invoice_id.int)[-26:])
+        self.assertTrue(validate_qr_reference(reference))
+        self.assertEqual(invoice_qr_reference(UUID(int=42)), generate_qr_reference("42"))
+
     def test_generate_swiss_qr(self) -> None:
         """Test the generate_swiss_qr function to ensure it adds a valid SVG QR bill to the context data."""
-        context_data = {
-            "company_info": {
-                "company_bank_account": "CH4431999123000889012",
-                "company_name": "Test AG",
-                "company_address": "Teststrasse 1",
-                "zip": "8000",
-                "city": "Zürich",
-                "country": "Schweiz",
-            },
-            "customer": {
-                "name": "Max Mustermann",
-                "street": "Musterweg 2",
-                "postal_code": "4000",
-                "city": "Basel",
-                "country": "Schweiz",
-            },
-            "invoice_details": {
-                "invoice_number": "2024-001",
-                "invoice_primary_key": "12345",
-                "total_sum": "123.45",
-            },
-        }
-        result = generate_swiss_qr(context_data.copy())
+        result = generate_swiss_qr(self.context_data.copy(), self.company)
 
         # Check if the result contains an SVG
         self.assertIn("qr_bill_svg", result)
         self.assertIsInstance(result["qr_bill_svg"], str)
-        self.assertTrue(result["qr_bill_svg"].__contains__("<svg"))
+        self.assertTrue(result["qr_bill_svg"].startswith("<svg"))
 
         # Check if the SVG contains the expected information
         self.assertIn("CH44 3199 9123 0008 8901 2", result["qr_bill_svg"])
@@ -70,4 +131,18 @@ class SwissQRTest(TestCase):
 
         # Check if the SVG hash matches the expected value
         hashed_result = hashlib.sha256(result["qr_bill_svg"].encode("utf-8")).hexdigest()
-        self.assertEqual("77ddae4e783e2c358e4cef6026c02e78c6d7fa7887129af85acfab2af5d77d9a", hashed_result)
+        self.assertEqual("bccc6f11b389848d04c571bf1acfd36b831602dc08e79fd6195f116556be4b2d", hashed_result)
+
+    def test_generate_swiss_qr_cached(self) -> None:
+        """Test that a QR bill is rendered once per payload and re-rendered if the payload changes."""
+        with patch("cycle_invoice.sale.utils.swiss_qr.QRBill", wraps=QRBill) as mock_qr_bill:
+            first = generate_swiss_qr(self.context_data.copy(), self.company)["qr_bill_svg"]
+            reminder = generate_swiss_qr(self.context_data.copy(), self.company)["qr_bill_svg"]
+            self.assertEqual(mock_qr_bill.call_count, 1)
+
+            self.context_data["invoice_details"]["total_sum"] = "100.00"
+            changed = generate_swiss_qr(self.context_data.copy(), self.company)["qr_bill_svg"]
+            self.assertEqual(mock_qr_bill.call_count, 2)
+
+        self.assertEqual(first, reminder)
+        self.assertNotEqual(first, changed)
@@ -0,0 +1,78 @@
+"""
+Company profile printed on invoices and QR bills.
+
+The company details come from the `COMPANY_*` environment variables, the name falls back to constance.
+They are cached for `COMPANY_PROFILE_CACHE_SECONDS`, so other processes pick up a changed constance
+setting within that time, and reloaded right away in the process that changed it.
+"""
+import os
+from dataclasses import dataclass
+
+from constance import config
+from constance.signals import config_updated
+from django.dispatch import receiver
+
+from cycle_invoice.common.utils import timed_cache
+
+# Number of seconds the company profile is reused before it is loaded again
+COMPANY_PROFILE_CACHE_SECONDS = 60
+
+
+@dataclass(frozen=True)
+class CompanyProfile:
+    """Snapshot of the company details printed on invoices and QR bills."""
+
+    name: str | None
+    address: str | None
+    registration_id: str | None
+    email: str | None
+    phone: str | None
+    website: str | None
+    zip_code: str | None
+    city: str | None
+    country: str | None
+    bank_account: str | None
+
+    def as_context(self) -> dict[str, str | None]:
+        """Return the company details as the `company_info` of the invoice templates."""
+        return {
+            "company_name": self.name,
+            "company_address": self.address,
+            "company_registration_id": self.registration_id,
+            "company_email": self.email,
+            "company_phone": self.phone,
+            "company_website": self.website,
+            "zip": self.zip_code,
+            "city": self.city,
+            "country": self.country,
+            "company_bank_account": self.bank_account,
+        }
+
+
+@timed_cache(COMPANY_PROFILE_CACHE_SECONDS)
+def get_company_profile() -> CompanyProfile:
+    """
+    Load the company profile, cached for `COMPANY_PROFILE_CACHE_SECONDS`.
+
+    Environment variables take precedence, the company name falls back to constance.
+
+    :return: The cached company profile
+    """
+    return CompanyProfile(
+        name=os.getenv("COMPANY_NAME") or config.COMPANY_NAME,
+        address=os.getenv("COMPANY_ADDRESS"),
+        registration_id=os.getenv("COMPANY_REGISTRATION_ID"),
+        email=os.getenv("COMPANY_EMAIL"),
+        phone=os.getenv("COMPANY_PHONE"),
+        website=os.getenv("COMPANY_WEBSITE"),
+        zip_code=os.getenv("COMPANY_ZIP"),
+        city=os.getenv("COMPANY_CITY"),
+        country=os.getenv("COMPANY_COUNTRY"),
+        bank_account=os.getenv("COMPANY_BANK_ACCOUNT"),
+    )
+
+
+@receiver(config_updated)
+def clear_company_profile(sender: object, **kwargs) -> None:  # noqa: ARG001
+    """Reload the company profile after a constance setting changed."""
+    get_company_profile.cache_clear()
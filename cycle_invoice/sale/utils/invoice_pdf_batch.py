@@ -0,0 +1,128 @@
+"""
+Batch generation of invoice PDFs.
+
+Rendering is CPU bound, so the invoices of a batch are fanned out across a pool of worker
+processes. Each worker warms WeasyPrint and fontconfig once, then renders its invoices and
+saves every PDF to the default storage as soon as it is done.
+"""
+import logging
+import multiprocessing
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from uuid import UUID
+
+from django.conf import settings
+from django.db import connections
+from weasyprint import HTML
+
+from cycle_invoice.common.selectors import get_object
+from cycle_invoice.sale.models import Invoice
+from cycle_invoice.sale.services.invoice_pdf import invoice_pdf_store
+
+logger = logging.getLogger(__name__)
+
+type InvoiceId = UUID | str
+type ResultCallback = Callable[[InvoiceId, str | None, str | None], None]
+
+
+@dataclass
+class InvoicePDFBatchResult:
+    """Outcome of a batch PDF generation."""
+
+    generated: dict[InvoiceId, str] = field(default_factory=dict)  # invoice id -> storage name
+    unchanged: set[InvoiceId] = field(default_factory=set)  # generated invoices whose saved PDF was reused
+    failed: dict[InvoiceId, str] = field(default_factory=dict)  # invoice id -> error message
+
+    @property
+    def ok(self) -> bool:
+        """Return True if all invoices of the batch were generated."""
+        return not self.failed
+
+
+def generate_invoice_pdfs(invoice_ids: Iterable[InvoiceId], *, workers: int | None = None, force: bool = False,
+                          on_result: ResultCallback | None = None) -> InvoicePDFBatchResult:
+    """
+    Generate the PDFs of many invoices across a pool of worker processes.
+
+    A failing invoice is recorded in the result and does not abort the batch. Invoices that did
+    not change since their PDF was saved are not rendered again, so re-running a batch after a
+    partial failure only renders the invoices that failed or changed.
+
+    Args:
+        invoice_ids: The IDs of the invoices to generate
+        workers (int): Number of worker processes, defaults to `INVOICE_PDF_BATCH_WORKERS`.
+            With a single worker the invoices are rendered in the current process. More workers
+            cannot be used inside a transaction, as the database connections are closed for them.
+        force (bool): Render the PDFs even if the saved PDFs are up to date
+        on_result: Called with the invoice ID, the storage name and the error message as soon as
+            an invoice is finished
+
+    Returns:
+        InvoicePDFBatchResult: The generated and the failed invoices
+
+    """
+    workers = workers or settings.INVOICE_PDF_BATCH_WORKERS
+    result = InvoicePDFBatchResult()
+
+    if workers <= 1:
+        for invoice_id in invoice_ids:
+            try:
+                stored = _render_and_store(invoice_id, force=force)
+            except Exception as exc:  # noqa: BLE001
+                _record(result, invoice_id, None, exc, on_result)
+            else:
+                _record(result, invoice_id, stored, None, on_result)
+        return result
+
+    # Forked workers must not share the database connections of the parent, which are closed before forking
+    if any(connection.in_atomic_block for connection in connections.all(initialized_only=True)):
+        error_message = "Invoice PDFs cannot be generated in worker processes inside a transaction."
+        raise ValueError(error_message)
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+                             initializer=_init_worker) as executor:
+        futures: dict[Future, InvoiceId] = {
+            executor.submit(_render_and_store, invoice_id, force=force): invoice_id for invoice_id in invoice_ids
+        }
+        for future in as_completed(futures):
+            invoice_id = futures[future]
+            try:
+                stored = future.result()
+            except Exception as exc:  # noqa: BLE001
+                _record(result, invoice_id, None, exc, on_result)
+            else:
+                _record(result, invoice_id, stored, None, on_result)
+    return result
+
+
+def _init_worker() -> None:
+    """Warm WeasyPrint and fontconfig once per worker process before the first invoice."""
+    HTML(string='<p style="font-family: Helvetica, sans-serif">0</p>').write_pdf()
+
+
+def _render_and_store(invoice_id: InvoiceId, *, force: bool) -> tuple[str, bool]:
+    """Render the PDF of an invoice and save it to the default storage, unless the saved PDF is up to date."""
+    invoice = get_object(Invoice, search_id=invoice_id)
+    if invoice is None:
+        error_message = f"Invoice {invoice_id} not found."
+        raise ValueError(error_message)
+    return invoice_pdf_store(invoice, force=force)
+
+
+def _record(result: InvoicePDFBatchResult, invoice_id: InvoiceId, stored: tuple[str, bool] | None,
+            exc: Exception | None, on_result: ResultCallback | None) -> None:
+    """Record the outcome of a single invoice of the batch."""
+    name = None
+    if exc is None:
+        name, rendered = stored
+        result.generated[invoice_id] = name
+        if not rendered:
+            result.unchanged.add(invoice_id)
+        error = None
+    else:
+        error = f"{type(exc).__name__}: {exc}"
+        result.failed[invoice_id] = error
+        logger.error("Failed to generate the PDF of invoice %s: %s", invoice_id, error)
+    if on_result is not None:
+        on_result(invoice_id, name, error)
@@ -4,34 +4,52 @@ PDF generation utilities for invoices.
 This module provides functions for generating PDF invoices with page numbers,
 QR codes, and other features required for Swiss invoicing standards.
 """
+import hashlib
+import json
 import os
+import uuid
 from dataclasses import dataclass
+from functools import cache
 from io import BytesIO
-from typing import Any
-from urllib.parse import quote
+from tempfile import SpooledTemporaryFile
+from typing import IO, Any
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.base import ContentFile, File
 from django.core.files.storage import default_storage
-from django.http import HttpRequest
-from django.template.loader import render_to_string
+from django.template.loader import get_template, render_to_string
 from pypdf import PdfReader, PdfWriter
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from weasyprint import HTML
 
-from cycle_invoice.sale.models import DocumentItem, Invoice
-from cycle_invoice.sale.utils.swiss_qr import generate_swiss_qr
+from cycle_invoice.sale.selectors.invoice_pdf import invoice_get_for_pdf
+from cycle_invoice.sale.utils.asset_fetcher import LocalAssetFetcher
+from cycle_invoice.sale.utils.company_profile import CompanyProfile, get_company_profile
+from cycle_invoice.sale.utils.line_totals import compute_line_totals
+from cycle_invoice.sale.utils.pdf_metrics import pdf_stage
+from cycle_invoice.sale.utils.swiss_qr import generate_swiss_qr, invoice_qr_reference
+
+# Templates the invoice PDF is rendered from
+INVOICE_PDF_TEMPLATES = ("sale/invoice.html", "sale/qr_code.html")
+
+# Bump to invalidate all stored invoice PDFs, e.g. after changing the static assets or the rendering code
+INVOICE_PDF_LAYOUT_VERSION = 1
+
+# Rendered PDFs larger than this are spooled to a temporary file instead of being kept in memory
+INVOICE_PDF_SPOOL_MAX_SIZE = 8 * 1024 * 1024
 
 
 @dataclass
 class PDFContent:
     """Class for storing PDF content and metadata."""
 
-    content: bytes
+    content: bytes | IO[bytes]
     filename: str
     mime_type: str = "application/pdf"
 
-def generate_content(invoice_id: int) -> dict[str, Any]:
+
+def generate_content(invoice_id: uuid.UUID) -> dict[str, Any]:
     """
     Prepare the context data for invoice rendering.
 
@@ -39,38 +57,63 @@ def generate_content(invoice_id: int) -> dict[str, Any]:
         dict: The dictionary containing all necessary data for rendering the invoice
 
     """
-    invoice = Invoice.objects.get(pk=invoice_id)
+    return add_qr_bill(generate_invoice_context(invoice_id))
+
+
+def generate_invoice_context(invoice_id: uuid.UUID) -> dict[str, Any]:
+    """
+    Prepare the context data for invoice rendering without the QR bill.
+
+    The QR bill is generated from this context alone, so it is all the fingerprint of the PDF needs.
+
+    Returns:
+        dict: The dictionary containing the data for rendering the invoice except the QR bill
+
+    """
+    with pdf_stage("content"):
+        return _invoice_context(invoice_id, get_company_profile())
+
+
+def add_qr_bill(context_data: dict[str, Any]) -> dict[str, Any]:
+    """
+    Generate the QR bill of an invoice and add it to its context data.
+
+    Args:
+        context_data (dict): The context data prepared by `generate_invoice_context`
+
+    Returns:
+        dict: The context data with the QR bill
+
+    """
+    with pdf_stage("qr"):
+        generate_swiss_qr(context_data, get_company_profile())
+    return context_data
+
 
-    document_items = DocumentItem.objects.filter(document=invoice)
+def _invoice_context(invoice_id: uuid.UUID, company: CompanyProfile) -> dict[str, Any]:
+    """Query the invoice, its items and its party and build the render context without the QR bill."""
+    invoice, document_items = invoice_get_for_pdf(invoice_id)
+    # Summed from the loaded items, `Invoice.total_sum` would query them again
+    totals = compute_line_totals(document_items)
     invoice_items = [
         {
             "product_name": item.title,
             "product_description": item.description,
-            "quantity": item.quantity_str,
-            "price_single": item.price_str,
-            "discount": item.discount_str,
-            "price_total": item.total_str,
+            "quantity": line.quantity,
+            "price_single": line.price,
+            "discount": line.discount,
+            "price_total": line.total,
         }
-        for item in document_items
+        for item, line in zip(document_items, totals.lines, strict=True)
     ]
 
-    context_data = {
-        "company_info": {
-            "company_name": os.getenv("COMPANY_NAME"),
-            "company_address": os.getenv("COMPANY_ADDRESS"),
-            "company_registration_id": os.getenv("COMPANY_REGISTRATION_ID"),
-            "company_email": os.getenv("COMPANY_EMAIL"),
-            "company_phone": os.getenv("COMPANY_PHONE"),
-            "company_website": os.getenv("COMPANY_WEBSITE"),
-            "zip": os.getenv("COMPANY_ZIP"),
-            "city": os.getenv("COMPANY_CITY"),
-            "country": os.getenv("COMPANY_COUNTRY"),
-            "company_bank_account": os.getenv("COMPANY_BANK_ACCOUNT"),
-        },
+    return {
+        "company_info": company.as_context(),
         "invoice_details": {
-            "total_sum": invoice.total_sum.__str__(),
+            "total_sum": totals.total,
             "invoice_number": invoice.document_number,
             "invoice_primary_key": invoice_id,
+            "qr_reference": invoice.qr_reference or invoice_qr_reference(invoice.uuid),
             "created_date": invoice.date.strftime("%d.%m.%Y"),
             "due_date": invoice.due_date.strftime("%d.%m.%Y"),
             "header_text": invoice.header_text,
@@ -88,11 +131,6 @@ def generate_content(invoice_id: int) -> dict[str, Any]:
         "invoice_items": invoice_items
     }
 
-    # Generate the QR bill and add it to the context
-    generate_swiss_qr(context_data)
-
-    return context_data
-
 
 def generate_html_invoice(context_data: dict[str, Any]) -> str:
     """
@@ -105,7 +143,7 @@ def generate_html_invoice(context_data: dict[str, Any]) -> str:
         str: The rendered HTML
 
     """
-    return render_to_string("sale/invoice.html", context_data)
+    return _render_html("sale/invoice.html", context_data)
 
 
 def generate_html_qr_page(context_data: dict[str, Any]) -> str:
@@ -119,79 +157,160 @@ def generate_html_qr_page(context_data: dict[str, Any]) -> str:
         str: The rendered HTML
 
     """
-    svg_content = quote(context_data["qr_bill_svg"])
-    return render_to_string("sale/qr_code.html", {**context_data, "svg_content": svg_content})
+    return _render_html("sale/qr_code.html", context_data)
 
 
-def generate_pdf_from_html(html_content: str, base_url: str) -> bytes:
+def generate_html_invoice_document(context_data: dict[str, Any]) -> str:
+    """
+    Generate the HTML content for the invoice with the qr page appended as its last page.
+
+    Both parts are laid out as one document, so WeasyPrint needs a single layout pass
+    and a single PDF serialization per invoice.
+
+    Args:
+        context_data (dict): The context data for rendering
+
+    Returns:
+        str: The rendered HTML
+
+    """
+    return _render_html("sale/invoice.html", {**context_data, "include_qr_page": True})
+
+
+def _render_html(template_name: str, context_data: dict[str, Any]) -> str:
+    """Render a template of the invoice PDF as a measured stage."""
+    with pdf_stage("html") as stage:
+        html_content = render_to_string(template_name, context_data)
+        stage.size = len(html_content)
+    return html_content
+
+
+def generate_pdf_from_html(html_content: str, base_url: str | None = None,
+                           target: IO[bytes] | None = None) -> bytes | None:
     """
     Generate a PDF from HTML content using WeasyPrint.
 
+    Static and media assets are read from local storage instead of being fetched over HTTP.
+
     Args:
         html_content (str): The HTML content to convert to PDF
-        base_url (str, optional): The base URL for resolving relative URLs
+        base_url (str, optional): The base URL for resolving relative URLs, defaults to `INVOICE_PDF_BASE_URL`
+        target (IO, optional): A binary stream the PDF is written to instead of being returned
 
     Returns:
-        bytes: The generated PDF as bytes
+        bytes: The generated PDF as bytes, or None if it was written to `target`
 
     """
-    document = HTML(string=html_content, base_url=base_url, encoding="utf-8").render()
-    return document.write_pdf()
+    base_url = base_url or settings.INVOICE_PDF_BASE_URL
+    with pdf_stage("layout"):
+        document = HTML(string=html_content, base_url=base_url, encoding="utf-8",
+                        url_fetcher=LocalAssetFetcher(base_url)).render()
 
+    with pdf_stage("write_pdf") as stage:
+        pdf_data = document.write_pdf(target=target)
+        stage.size = len(pdf_data) if pdf_data is not None else target.tell()
+    return pdf_data
 
-def add_page_numbers_to_pdf(pdf_data: bytes) -> BytesIO:
+
+def add_page_numbers_to_pdf(pdf_data: bytes | IO[bytes], unnumbered_trailing_pages: int = 0,
+                            target: IO[bytes] | None = None) -> IO[bytes]:
     """
     Add page numbers to each page of a PDF.
 
     Args:
-        pdf_data (bytes): The original PDF data
+        pdf_data (bytes | IO): The original PDF data or a binary stream containing it
+        unnumbered_trailing_pages (int): Number of pages at the end that are neither numbered nor counted
+        target (IO, optional): A binary stream the PDF with page numbers is written to, defaults to a new BytesIO
 
     Returns:
-        BytesIO: A BytesIO object containing the PDF with page numbers
-
-    """
-    input_pdf = PdfReader(BytesIO(pdf_data))
-    output_pdf = PdfWriter()
-
-    for page_num, page in enumerate(input_pdf.pages, start=1):
-        # Create overlay with page number
-        packet = BytesIO()
-        can = canvas.Canvas(packet, pagesize=A4)
-        can.setFont("Helvetica", 22)
-        can.setFillColorRGB(1, 1, 1)
-        can.drawRightString(530, 20, f"Seite {page_num} von {len(input_pdf.pages)}")
-        can.save()
-        packet.seek(0)
-
-        # Merge overlay with the current page
-        overlay_pdf = PdfReader(packet)
-        page.merge_page(overlay_pdf.pages[0])
-        output_pdf.add_page(page)
-
-    # Write the final PDF to a BytesIO stream
-    output_stream = BytesIO()
-    output_pdf.write(output_stream)
-    output_stream.seek(0)
+        IO: The stream containing the PDF with page numbers, positioned at its start
+
+    """
+    with pdf_stage("page_numbers") as stage:
+        input_pdf = PdfReader(BytesIO(pdf_data) if isinstance(pdf_data, bytes) else pdf_data)
+        output_pdf = PdfWriter()
+        numbered_pages = len(input_pdf.pages) - unnumbered_trailing_pages
+
+        for page_num, page in enumerate(input_pdf.pages, start=1):
+            if page_num > numbered_pages:
+                output_pdf.add_page(page)
+                continue
+
+            # Create overlay with page number
+            packet = BytesIO()
+            can = canvas.Canvas(packet, pagesize=A4)
+            can.setFont("Helvetica", 22)
+            can.setFillColorRGB(1, 1, 1)
+            can.drawRightString(530, 20, f"Seite {page_num} von {numbered_pages}")
+            can.save()
+            packet.seek(0)
+
+            # Merge overlay with the current page
+            overlay_pdf = PdfReader(packet)
+            page.merge_page(overlay_pdf.pages[0])
+            output_pdf.add_page(page)
+
+        # Write the final PDF to the target stream
+        output_stream = target if target is not None else BytesIO()
+        output_pdf.write(output_stream)
+        stage.size = output_stream.tell()
+        output_stream.seek(0)
     return output_stream
 
-def add_pdf_to_storage(invoice_pdf: PDFContent) -> None:
+
+def add_pdf_to_storage(invoice_pdf: PDFContent) -> str:
     """
     Save the generated PDF invoice to the default storage.
 
+    A stream is handed to the storage backend as is, so it is uploaded in chunks (multipart
+    on S3) without another copy of the PDF in memory. The stream is closed afterwards.
+
     :param invoice_pdf: PDFContent object containing the PDF data and filename
+    :return: The name under which the storage saved the PDF
     """
     pdf_content = invoice_pdf.content
+    with pdf_stage("storage") as stage:
+        if isinstance(pdf_content, bytes):
+            stage.size = len(pdf_content)
+            return default_storage.save(invoice_pdf.filename, ContentFile(pdf_content))
 
-    default_storage.save(invoice_pdf.filename, ContentFile(pdf_content))
+        with pdf_content:
+            stage.size = pdf_content.seek(0, os.SEEK_END)
+            pdf_content.seek(0)
+            return default_storage.save(invoice_pdf.filename, File(pdf_content, name=invoice_pdf.filename))
 
 
-def generate_invoice_pdf(request: HttpRequest, invoice_id: int) -> None:
+def generate_invoice_pdf(invoice_id: uuid.UUID, *, single_pass: bool = True,
+                         overlay_page_numbers: bool = False) -> None:
     """
-    Generate a PDF invoice using WeasyPrint with manual page numbering.
+    Generate a PDF invoice using WeasyPrint and save it to the default storage.
 
     Args:
-        request: The HTTP request object
-        invoice_id (int): The ID of the invoice to generate
+        invoice_id (uuid.UUID): The UUID of the invoice to generate
+        single_pass (bool): Lay out the invoice and the QR page as one document instead of
+            rendering and merging two separate PDFs
+        overlay_page_numbers (bool): Stamp the page numbers onto the rendered PDF instead of
+            setting them during layout
+
+    """
+    add_pdf_to_storage(build_invoice_pdf(invoice_id, single_pass=single_pass,
+                                         overlay_page_numbers=overlay_page_numbers))
+
+
+def build_invoice_pdf(invoice_id: uuid.UUID, *, single_pass: bool = True,
+                      overlay_page_numbers: bool = False) -> PDFContent:
+    """
+    Render the PDF of an invoice.
+
+    Page numbers are set by CSS paged-media counters during layout. The reportlab/pypdf
+    overlay is only used as a fallback when `overlay_page_numbers` is set.
+
+    Args:
+        invoice_id (uuid.UUID): The UUID of the invoice to render
+        single_pass (bool): Lay out the invoice and the QR page as one document instead of
+            rendering and merging two separate PDFs
+        overlay_page_numbers (bool): Stamp the page numbers onto the rendered PDF instead of
+            setting them during layout
 
     Returns:
         PDFContent: Object containing PDF content and metadata
@@ -199,28 +318,106 @@ def generate_invoice_pdf(request: HttpRequest, invoice_id: int) -> None:
     """
     # Prepare the content including qr code for the invoice
     content = generate_content(invoice_id)
+    return render_invoice_pdf(invoice_id, content, single_pass=single_pass, overlay_page_numbers=overlay_page_numbers)
+
+
+def render_invoice_pdf(invoice_id: uuid.UUID, content: dict[str, Any], *, single_pass: bool = True,
+                       overlay_page_numbers: bool = False) -> PDFContent:
+    """
+    Render the PDF of an invoice from the context prepared by `generate_content`.
+
+    Args:
+        invoice_id (uuid.UUID): The UUID of the invoice to render
+        content (dict): The context data for rendering
+        single_pass (bool): Lay out the invoice and the QR page as one document instead of
+            rendering and merging two separate PDFs
+        overlay_page_numbers (bool): Stamp the page numbers onto the rendered PDF instead of
+            setting them during layout
+
+    Returns:
+        PDFContent: Object containing PDF content and metadata
+
+    """
+    content = {**content, "show_page_number": not overlay_page_numbers}
+
+    if single_pass:
+        pdf_data = _render_invoice_single_pass(content, overlay_page_numbers=overlay_page_numbers)
+    else:
+        pdf_data = _render_invoice_two_pass(content, overlay_page_numbers=overlay_page_numbers)
+
+    return PDFContent(pdf_data, f"invoice_{invoice_id}.pdf")
+
+
+def invoice_pdf_fingerprint(context_data: dict[str, Any]) -> str:
+    """
+    Compute the fingerprint of the PDF rendered from the given context data.
+
+    The fingerprint covers the context and the invoice templates, so it changes whenever
+    the rendered PDF would change.
+
+    Args:
+        context_data (dict): The context data for rendering, as prepared by `generate_invoice_context`
+
+    Returns:
+        str: The SHA-256 hex digest of the context and the templates
+
+    """
+    canonical_context = json.dumps(context_data, sort_keys=True, separators=(",", ":"), default=str)
+    digest = hashlib.sha256(_invoice_template_digest().encode())
+    digest.update(canonical_context.encode())
+    return digest.hexdigest()
+
+
+@cache
+def _invoice_template_digest() -> str:
+    """Return a digest of the invoice templates and the PDF layout version."""
+    digest = hashlib.sha256(str(INVOICE_PDF_LAYOUT_VERSION).encode())
+    for template_name in INVOICE_PDF_TEMPLATES:
+        digest.update(get_template(template_name).template.source.encode())
+    return digest.hexdigest()
+
+
+def _render_invoice_single_pass(content: dict[str, Any], *, overlay_page_numbers: bool) -> IO[bytes]:
+    """Render the invoice and its QR page with one WeasyPrint layout pass."""
+    html_document = generate_html_invoice_document(content)
+    pdf_stream = _pdf_spool()
+    generate_pdf_from_html(html_document, target=pdf_stream)
+
+    if overlay_page_numbers:
+        # The QR page is the last page of the document and carries no page number
+        with pdf_stream:
+            return add_page_numbers_to_pdf(pdf_stream, unnumbered_trailing_pages=1, target=_pdf_spool())
+    return pdf_stream
+
 
+def _render_invoice_two_pass(content: dict[str, Any], *, overlay_page_numbers: bool) -> IO[bytes]:
+    """Render the invoice and its QR page separately and merge both PDFs."""
     # Render the HTML content
     html_invoice = generate_html_invoice(content)
     html_qr_page = generate_html_qr_page(content)
 
     # Generate the PDF from the HTML content
-    pdf_data_invoice = generate_pdf_from_html(html_invoice, request.build_absolute_uri("/"))
-    pdf_data_qr_page = generate_pdf_from_html(html_qr_page, request.build_absolute_uri("/"))
+    pdf_data_invoice = generate_pdf_from_html(html_invoice)
+    pdf_data_qr_page = generate_pdf_from_html(html_qr_page)
 
     # Add Page numbers to the PDF
-    pdf_data_invoice = add_page_numbers_to_pdf(pdf_data_invoice)
+    if overlay_page_numbers:
+        pdf_data_invoice = add_page_numbers_to_pdf(pdf_data_invoice).getvalue()
 
     # Build the final PDF by merging the invoice and QR code pages
-    output_pdf = PdfWriter()
-    for page in PdfReader(pdf_data_invoice).pages:
-        output_pdf.add_page(page)
-    output_pdf.add_page(PdfReader(BytesIO(pdf_data_qr_page)).pages[0])
-
-    # Write the final PDF to a BytesIO stream
-    final_stream = BytesIO()
-    output_pdf.write(final_stream)
-    final_stream.seek(0)
-
-    # Create and return the PDF content
-    add_pdf_to_storage(PDFContent(final_stream.getvalue(), f"invoice_{invoice_id}.pdf"))
+    with pdf_stage("merge") as stage:
+        output_pdf = PdfWriter()
+        for page in PdfReader(BytesIO(pdf_data_invoice)).pages:
+            output_pdf.add_page(page)
+        output_pdf.add_page(PdfReader(BytesIO(pdf_data_qr_page)).pages[0])
+
+        # Write the final PDF to a spooled stream
+        final_stream = _pdf_spool()
+        output_pdf.write(final_stream)
+        stage.size = final_stream.tell()
+    return final_stream
+
+
+def _pdf_spool() -> IO[bytes]:
+    """Return a stream for a rendered PDF that stays in memory up to INVOICE_PDF_SPOOL_MAX_SIZE bytes."""
+    return SpooledTemporaryFile(max_size=INVOICE_PDF_SPOOL_MAX_SIZE, mode="w+b")
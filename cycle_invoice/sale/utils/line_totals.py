@@ -0,0 +1,140 @@
+"""
+Integer-cents totals engine for document items.
+
+The amounts of the items are converted to integer cents (Rappen) once, then the line totals, the
+subtotal and the Swiss cash rounding are computed with integer arithmetic in a single pass and
+formatted for the invoice templates. The results equal `DocumentItem.total` and the string
+properties of `DocumentItem`, without constructing decimals on every access.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from cycle_invoice.common.models import DiscountType
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from decimal import Decimal
+    from uuid import UUID
+
+    from cycle_invoice.sale.models import DocumentItem
+
+# Smallest coin in Swiss francs, in cents
+CASH_ROUNDING_CENTS = 5
+
+
+@dataclass(frozen=True)
+class LineTotal:
+    """Amounts of a document item, formatted for the invoice templates."""
+
+    quantity: str
+    price: str
+    discount: str
+    total: str
+    total_cents: int
+
+
+@dataclass(frozen=True)
+class DocumentTotals:
+    """Line totals and sum of the items of a document."""
+
+    lines: list[LineTotal]
+    total_cents: int
+
+    @property
+    def total(self) -> str:
+        """Return the sum of the line totals, formatted."""
+        return format_cents(self.total_cents)
+
+    @property
+    def cash_rounded_cents(self) -> int:
+        """Return the sum of the line totals rounded to 0.05 for cash payments."""
+        return cash_round(self.total_cents)
+
+    @property
+    def cash_rounded_total(self) -> str:
+        """Return the sum of the line totals rounded to 0.05 for cash payments, formatted."""
+        return format_cents(self.cash_rounded_cents)
+
+
+def compute_line_totals(items: Iterable[DocumentItem]) -> DocumentTotals:
+    """
+    Compute the line totals and the sum of the items of one document.
+
+    :param items: Document items in the order of the document
+    :return: The formatted line totals and their sum
+    """
+    lines = [_line_total(item) for item in items]
+    return DocumentTotals(lines=lines, total_cents=sum(line.total_cents for line in lines))
+
+
+def compute_document_totals(items: Iterable[DocumentItem]) -> dict[UUID, DocumentTotals]:
+    """
+    Compute the line totals and sums of the items of many documents, e.g. for a report export.
+
+    :param items: Document items of any number of documents
+    :return: A dictionary with the UUID of every document as key and the totals of its items as value
+    """
+    lines_by_document: dict[UUID, list[LineTotal]] = defaultdict(list)
+    for item in items:
+        lines_by_document[item.document_id].append(_line_total(item))
+    return {document_id: DocumentTotals(lines=lines, total_cents=sum(line.total_cents for line in lines))
+            for document_id, lines in lines_by_document.items()}
+
+
+def to_cents(amount: Decimal) -> int:
+    """Convert an amount with two decimal places to integer cents."""
+    return int(amount.scaleb(2))
+
+
+def format_cents(cents: int) -> str:
+    """Format integer cents as an amount with two decimal places, like `f"{amount:.2f}"`."""
+    sign = "-" if cents < 0 else ""
+    units, fraction = divmod(abs(cents), 100)
+    return f"{sign}{units}.{fraction:02d}"
+
+
+def cash_round(cents: int) -> int:
+    """Round integer cents to the nearest 0.05, the smallest Swiss coin."""
+    return _divide_half_even(cents, CASH_ROUNDING_CENTS) * CASH_ROUNDING_CENTS
+
+
+def _line_total(item: DocumentItem) -> LineTotal:
+    """Compute and format the amounts of a document item."""
+    price = to_cents(item.price)
+    quantity = to_cents(item.quantity)
+    discount_value = to_cents(item.discount_value)
+
+    if item.discount_type == DiscountType.ABSOLUTE:
+        # Price and quantity in cents give ten thousandths
+        total = _divide_half_even(price * quantity - discount_value * 100, 100)
+        discount = f"-{format_cents(discount_value)}" if discount_value else ""
+    else:
+        # A percentage in cents gives another factor of ten thousand
+        total = _divide_half_even(price * quantity * (10000 - discount_value), 1000000)
+        discount = f"{discount_value}.00%" if discount_value else ""  # like `DocumentItem.discount_str`
+
+    return LineTotal(
+        quantity=_format_quantity(quantity),
+        price=format_cents(price),
+        discount=discount,
+        total=format_cents(total),
+        total_cents=total,
+    )
+
+
+def _format_quantity(quantity: int) -> str:
+    """Format a quantity in hundredths without trailing zeros, like `DocumentItem.quantity_str`."""
+    if quantity % 100 == 0:
+        return str(quantity // 100)
+    return format_cents(quantity).rstrip("0")
+
+
+def _divide_half_even(dividend: int, divisor: int) -> int:
+    """Divide integers, rounding ties to even like `round` on decimals."""
+    quotient, remainder = divmod(dividend, divisor)
+    if remainder * 2 > divisor or (remainder * 2 == divisor and quotient % 2):
+        quotient += 1
+    return quotient
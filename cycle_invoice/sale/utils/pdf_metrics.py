@@ -0,0 +1,72 @@
+"""
+Stage timing for the invoice PDF generation.
+
+Each stage of the PDF pipeline runs inside `pdf_stage`, which measures its duration and, where
+known, the size of its output. Measurements are logged on the debug level and handed to the
+metrics sink configured in `INVOICE_PDF_METRICS_SINK`.
+"""
+import logging
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PDFStageMetric:
+    """Duration and output size of one stage of the invoice PDF generation."""
+
+    stage: str
+    duration: float = 0.0
+    size: int | None = None
+    failed: bool = False
+
+
+@contextmanager
+def pdf_stage(stage: str) -> Iterator[PDFStageMetric]:
+    """
+    Measure a stage of the invoice PDF generation.
+
+    The stage sets `size` on the yielded metric to report the number of bytes it produced.
+    Stages that raise are recorded as failed and the exception is propagated.
+
+    :param stage: Name of the stage, e.g. `layout` or `storage`
+    """
+    metric = PDFStageMetric(stage)
+    start = time.perf_counter()
+    try:
+        yield metric
+    except BaseException:
+        metric.failed = True
+        raise
+    finally:
+        metric.duration = time.perf_counter() - start
+        _record(metric)
+
+
+def _record(metric: PDFStageMetric) -> None:
+    """Log a stage metric and hand it to the configured metrics sink."""
+    logger.debug("Invoice PDF stage %s %s after %.1f ms (%s bytes)", metric.stage,
+                 "failed" if metric.failed else "finished", metric.duration * 1000,
+                 "unknown" if metric.size is None else metric.size)
+
+    sink_path = settings.INVOICE_PDF_METRICS_SINK
+    if not sink_path:
+        return
+    try:
+        _load_sink(sink_path)(metric)
+    except Exception:
+        # Metrics must never break the PDF generation
+        logger.exception("Invoice PDF metrics sink %s failed", sink_path)
+
+
+@cache
+def _load_sink(sink_path: str) -> Callable[[PDFStageMetric], None]:
+    """Import the metrics sink from its dotted path."""
+    return import_string(sink_path)
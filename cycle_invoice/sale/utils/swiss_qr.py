@@ -4,19 +4,52 @@ Swiss QR bill generation utilities.
 This module provides functionality for generating Swiss QR bills
 compliant with the Swiss payment standards.
 """
+from collections.abc import Iterable
+from dataclasses import dataclass
 from decimal import Decimal
+from functools import cache, lru_cache
 from io import StringIO
 from typing import Any
+from uuid import UUID
 
 from qrbill import QRBill
 
+from cycle_invoice.sale.utils.company_profile import CompanyProfile
 
-def generate_swiss_qr(context_data: dict[str, Any]) -> dict[str, Any]:
+# Carry after a digit of the recursive Modulo 10 algorithm, indexed by `(carry + digit) % 10`
+MODULO10_TABLE = (0, 9, 4, 6, 8, 2, 7, 1, 3, 5)
+
+# Number of digits looked up at once in the carry table, which has 10 rows of CARRY_CHUNK_SIZE carries
+CARRY_CHUNK_DIGITS = 4
+CARRY_CHUNK_SIZE = 10 ** CARRY_CHUNK_DIGITS
+
+# Number of digits of a QR reference without and with its check digit
+QR_REFERENCE_BASE_LENGTH = 26
+QR_REFERENCE_LENGTH = 27
+
+# Number of rendered QR bills kept in memory per process
+QR_BILL_CACHE_SIZE = 256
+
+
+@dataclass(frozen=True)
+class QRBillPayload:
+    """Everything a QR bill is rendered from, the key of the rendered QR bill cache."""
+
+    account: str | None
+    creditor: tuple[str | None, str | None, str, str | None]
+    debtor: tuple[str, str, str, str]
+    amount: Decimal
+    additional_information: str
+    reference: str
+
+
+def generate_swiss_qr(context_data: dict[str, Any], company: CompanyProfile) -> dict[str, Any]:
     """
     Generate a Swiss QR bill and add it to the context data.
 
     Args:
-        context_data: Dictionary containing invoice and company information
+        context_data: Dictionary containing invoice and customer information
+        company: The company profile the bill is payable to
     Returns:
         Updated context data with QR bill information
 
@@ -24,33 +57,58 @@ def generate_swiss_qr(context_data: dict[str, Any]) -> dict[str, Any]:
     # Format the invoice amount to 2 decimal places
     formatted_amount = Decimal(context_data["invoice_details"]["total_sum"]).quantize(Decimal("0.00"))
 
+    payload = QRBillPayload(
+        account=company.bank_account,
+        creditor=(company.name, company.address, f"{company.zip_code} {company.city}", company.country),
+        debtor=(
+            context_data["customer"]["name"],
+            context_data["customer"]["street"],
+            f"{context_data["customer"]["postal_code"]} {context_data["customer"]["city"]}",
+            context_data["customer"]["country"],
+        ),
+        amount=formatted_amount,
+        additional_information=f"Rechnung {context_data["invoice_details"]["invoice_number"]}",
+        reference=context_data["invoice_details"]["qr_reference"],
+    )
+
+    # Add the SVG content to the context data
+    context_data["qr_bill_svg"] = render_qr_bill_svg(payload)
+
+    return context_data
+
+
+@lru_cache(maxsize=QR_BILL_CACHE_SIZE)
+def render_qr_bill_svg(payload: QRBillPayload) -> str:
+    """
+    Render a QR bill as an SVG element, once per payload.
+
+    Reminders and duplicates of an invoice have the same payload and reuse the rendered QR bill.
+
+    Args:
+        payload: The creditor, debtor, amount and reference of the QR bill
+    Returns the SVG element without XML declaration, to be embedded into the HTML of the invoice.
+
+    """
     qr_bill = QRBill(
-        account=context_data["company_info"]["company_bank_account"],
-        creditor={
-            "name": context_data["company_info"]["company_name"],
-            "line1": context_data["company_info"]["company_address"],
-            "line2": f"{context_data["company_info"]["zip"]} {context_data["company_info"]["city"]}",
-            "country": context_data["company_info"]["country"],
-        }, debtor={
-            "name": context_data["customer"]["name"],
-            "line1": context_data["customer"]["street"],
-            "line2": f"{context_data["customer"]["postal_code"]} {context_data["customer"]["city"]}",
-            "country": context_data["customer"]["country"],
-        }, amount=formatted_amount,
+        account=payload.account,
+        creditor=_qr_bill_address(payload.creditor),
+        debtor=_qr_bill_address(payload.debtor),
+        amount=payload.amount,
         language="de",
-        additional_information=f"Rechnung {context_data["invoice_details"]["invoice_number"]}",
-        reference_number=generate_qr_reference(context_data["invoice_details"]["invoice_primary_key"]),
+        additional_information=payload.additional_information,
+        reference_number=payload.reference,
     )
 
     # Generate QR bill as SVG string
     svg_buffer = StringIO()
     qr_bill.as_svg(svg_buffer)
     svg_content = svg_buffer.getvalue()
+    return svg_content[svg_content.index("<svg"):]
 
-    # Add the SVG content to the context data
-    context_data["qr_bill_svg"] = svg_content
 
-    return context_data
+def _qr_bill_address(address: tuple[str | None, ...]) -> dict[str, str | None]:
+    """Return an address of a QR bill payload in the form expected by `QRBill`."""
+    return dict(zip(("name", "line1", "line2", "country"), address, strict=True))
 
 
 def modulo10_recursive(number: str) -> str:
@@ -62,12 +120,11 @@ def modulo10_recursive(number: str) -> str:
     Returns the check digit as a string.
 
     """
-    table = [0, 9, 4, 6, 8, 2, 7, 1, 3, 5]
-    carry = 0
-    for digit in number:
-        carry = table[(int(digit) + carry) % 10]
-    check_digit = (10 - carry) % 10
-    return str(check_digit)
+    # An empty string has the check digit 0, like a string of zeros
+    if number and not (number.isascii() and number.isdigit()):
+        error_message = f"Cannot calculate the check digit of {number!r}, it must only contain digits."
+        raise ValueError(error_message)
+    return str((10 - _modulo10_carry(number)) % 10)
 
 
 def generate_qr_reference(base_number: str) -> str:
@@ -77,6 +134,86 @@ def generate_qr_reference(base_number: str) -> str:
     - 26 numeric characters (padded with leading zeros)
     - Check digit using recursive Modulo 10 (Annex B)
     """
-    base = str(base_number).zfill(26)
+    base = str(base_number).zfill(QR_REFERENCE_BASE_LENGTH)
     check_digit = modulo10_recursive(base)
     return base + check_digit
+
+
+def invoice_qr_reference(invoice_id: UUID) -> str:
+    """
+    Return the QR reference of an invoice.
+
+    The reference is built from the lowest 26 decimal digits of the invoice UUID, so payments can be
+    matched back to the invoice without storing a separate number.
+    """
+    return generate_qr_reference(str(invoice_id.int % 10 ** QR_REFERENCE_BASE_LENGTH))
+
+
+def generate_qr_references(base_numbers: Iterable[str | int]) -> list[str]:
+    """
+    Generate the QR references of many base numbers, e.g. the keys of all invoices of a billing run.
+
+    Args:
+        base_numbers: Base numbers of up to 26 digits
+    Returns the QR references in the order of the base numbers.
+
+    """
+    return [generate_qr_reference(base_number) for base_number in base_numbers]
+
+
+def validate_qr_reference(reference: str) -> bool:
+    """
+    Check that a QR reference has 27 digits and a valid check digit.
+
+    Spaces, as in the grouped notation printed on QR bills, are ignored.
+    """
+    reference = reference.replace(" ", "")
+    if len(reference) != QR_REFERENCE_LENGTH or not (reference.isascii() and reference.isdigit()):
+        return False
+    # Appending the check digit to a number brings the carry back to zero
+    table = _carry_table()
+    return not table[table[table[table[table[table[table[
+        int(reference[0:3])]
+        * CARRY_CHUNK_SIZE + int(reference[3:7])]
+        * CARRY_CHUNK_SIZE + int(reference[7:11])]
+        * CARRY_CHUNK_SIZE + int(reference[11:15])]
+        * CARRY_CHUNK_SIZE + int(reference[15:19])]
+        * CARRY_CHUNK_SIZE + int(reference[19:23])]
+        * CARRY_CHUNK_SIZE + int(reference[23:27])]
+
+
+def validate_qr_references(references: Iterable[str]) -> list[bool]:
+    """
+    Validate many QR references, e.g. all references parsed from a bank statement.
+
+    Args:
+        references: QR references, optionally grouped with spaces
+    Returns whether each reference is valid, in the order of the references.
+
+    """
+    return [validate_qr_reference(reference) for reference in references]
+
+
+def _modulo10_carry(digits: str) -> int:
+    """Return the carry of the recursive Modulo 10 algorithm after the given digits."""
+    table = _carry_table()
+    # Leading zeros keep the carry at zero, so a short first chunk is looked up as if it was padded
+    start = len(digits) % CARRY_CHUNK_DIGITS
+    carry = table[int(digits[:start])] if start else 0
+    for end in range(start + CARRY_CHUNK_DIGITS, len(digits) + 1, CARRY_CHUNK_DIGITS):
+        carry = table[carry * CARRY_CHUNK_SIZE + int(digits[end - CARRY_CHUNK_DIGITS:end])]
+    return carry
+
+
+@cache
+def _carry_table() -> bytes:
+    """
+    Return the carry after a chunk of digits, indexed by `carry * CARRY_CHUNK_SIZE + chunk`.
+
+    The carry after a digit `d` followed by `n` is the carry after `n` starting from the carry after `d`,
+    so the rows of a chunk are concatenated from the rows of the chunk one digit shorter.
+    """
+    rows = [bytes([carry]) for carry in range(10)]
+    for _ in range(CARRY_CHUNK_DIGITS):
+        rows = [b"".join(rows[MODULO10_TABLE[(carry + digit) % 10]] for digit in range(10)) for carry in range(10)]
+    return b"".join(rows)
@@ -1,12 +1,13 @@
 """Factories for subscription app models."""
 
-from factory import LazyAttribute, SubFactory
+from factory import LazyAttribute, SelfAttribute, SubFactory
 
 from cycle_invoice.common.tests.factories import BaseFactory
 from cycle_invoice.common.tests.faker import faker
 from cycle_invoice.party.tests.factories import OrganizationFactory
 from cycle_invoice.product.tests.factories import ProductFactory
-from cycle_invoice.subscription.models import Subscription, SubscriptionPlan
+from cycle_invoice.sale.tests.factories import DocumentItemFactory
+from cycle_invoice.subscription.models import Subscription, SubscriptionDocumentItem, SubscriptionPlan
 
 
 class SubscriptionPlanFactory(BaseFactory):
@@ -33,3 +34,14 @@ class SubscriptionFactory(BaseFactory):
     plan = SubFactory(SubscriptionPlanFactory)
     party = SubFactory(OrganizationFactory)
     start_date = LazyAttribute(lambda _: faker.past_date())
+
+
+class SubscriptionDocumentItemFactory(DocumentItemFactory):
+    """Factory for the SubscriptionDocumentItem model."""
+
+    class Meta:
+        """Metaclass for SubscriptionDocumentItemFactory."""
+
+        model = SubscriptionDocumentItem
+
+    subscription = SubFactory(SubscriptionFactory, party=SelfAttribute("..party"))